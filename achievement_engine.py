@@ -0,0 +1,88 @@
+from bisect import bisect_right
+from typing import Dict, Any, List, Iterable, Optional
+
+class AchievementRule:
+    """Achievement declared as data: awarded once `metric` reaches `threshold`"""
+
+    def __init__(self, achievement_id: str, metric: str, threshold: float):
+        self.achievement_id = achievement_id
+        self.metric = metric
+        self.threshold = threshold
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert rule to dictionary"""
+        return {
+            'achievement_id': self.achievement_id,
+            'metric': self.metric,
+            'threshold': self.threshold
+        }
+
+# Achievement catalogue - add new achievements here
+ACHIEVEMENT_RULES = [
+    AchievementRule('first_week', 'current_streak', 7),
+    AchievementRule('monthly_champion', 'current_streak', 30),
+    AchievementRule('journey_complete', 'journey_completion', 100.0),
+    AchievementRule('consistent_learner', 'total_days_completed', 14),
+]
+
+# Shown in the user's notification when an achievement is awarded
+ACHIEVEMENT_MESSAGES = {
+    'first_week': "7 days in a row - your first week streak!",
+    'monthly_champion': "30 days in a row - monthly champion!",
+    'journey_complete': "You completed your journey!",
+    'consistent_learner': "14 days of reflections - consistent learner!",
+}
+
+class AchievementEngine:
+    """Rules engine that indexes achievements by the metric they depend on.
+
+    Rules for each metric are kept sorted by threshold, so evaluating a changed
+    metric is a binary search plus a walk over the rules it satisfies. Metrics
+    whose value did not change are skipped entirely.
+    """
+
+    def __init__(self, rules: Iterable[AchievementRule] = ()):
+        # metric -> (sorted thresholds, achievement ids in the same order)
+        self.index: Dict[str, tuple] = {}
+        for rule in rules:
+            self.add_rule(rule)
+
+    def add_rule(self, rule: AchievementRule):
+        """Add a rule to the metric index"""
+        thresholds, ids = self.index.setdefault(rule.metric, ([], []))
+        position = bisect_right(thresholds, rule.threshold)
+        thresholds.insert(position, rule.threshold)
+        ids.insert(position, rule.achievement_id)
+
+    def metrics(self) -> List[str]:
+        """Get the metrics any rule depends on"""
+        return list(self.index.keys())
+
+    def evaluate(self, metrics: Dict[str, Any], awarded: Iterable[str] = (),
+                 previous: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Get achievement ids newly earned by the given metric values.
+
+        Only metrics that differ from `previous` are evaluated; pass
+        `previous=None` to evaluate every indexed metric.
+        """
+        awarded = set(awarded)
+        earned = []
+
+        for metric, value in metrics.items():
+            entry = self.index.get(metric)
+            if entry is None or value is None:
+                continue
+            if previous is not None and previous.get(metric) == value:
+                continue
+
+            thresholds, ids = entry
+            satisfied = bisect_right(thresholds, value)
+            for achievement_id in ids[:satisfied]:
+                if achievement_id not in awarded:
+                    awarded.add(achievement_id)
+                    earned.append(achievement_id)
+
+        return earned
+
+# Global achievement engine instance
+achievement_engine = AchievementEngine(ACHIEVEMENT_RULES)
@@ -0,0 +1,148 @@
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, List, Optional
+from utils.clock import clock
+
+TASK_COMPLETED = 'task'
+REFLECTED = 'reflection'
+ANY_ACTIVITY = 'any'
+
+ACTIVITY_KINDS = [TASK_COMPLETED, REFLECTED]
+
+def to_date(value: Any) -> Optional[date]:
+    """Convert a datetime, ISO string or date to a server-local date (see Clock.today)"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return clock.local_date(value)
+    if isinstance(value, date):
+        return value
+    text = str(value)
+    if len(text) == 10:
+        return date.fromisoformat(text)  # Already a day, e.g. a calendar start date
+    return clock.local_date(datetime.fromisoformat(text))
+
+class ActivityCalendar:
+    """Per-user day-activity bitsets relative to the journey start.
+
+    Bit N of each bitset is day N of the journey (day 0 = start date). Runs are
+    maintained incrementally on every mark, so current/longest streak lookups
+    are O(1). Serialised, a year of activity is at most 2 x 46 bytes of bits.
+    """
+
+    def __init__(self, user_id: str, start_date: date, bits: Dict[str, int] = None,
+                 runs: Dict[str, List[int]] = None):
+        self.user_id = user_id
+        self.start_date = start_date
+        self.bits = {kind: 0 for kind in ACTIVITY_KINDS}
+        self.bits.update(bits or {})
+        # kind -> [last day of current run, current run length, longest run]
+        self.runs = {kind: [-2, 0, 0] for kind in ACTIVITY_KINDS + [ANY_ACTIVITY]}
+        self.runs.update(runs or {})
+
+    def day_index(self, day: date) -> int:
+        """Get journey-relative index for a date"""
+        return (day - self.start_date).days
+
+    def is_active(self, day_index: int, kind: str = ANY_ACTIVITY) -> bool:
+        """Check if there is activity of a kind on a day"""
+        return bool(self._kind_bits(kind) >> day_index & 1) if day_index >= 0 else False
+
+    def mark(self, kind: str, day: date) -> bool:
+        """Record activity of a kind on a day; returns False if already recorded"""
+        index = self.day_index(day)
+        if index < 0 or self.is_active(index, kind):
+            return False
+
+        was_active = self.is_active(index, ANY_ACTIVITY)
+        self.bits[kind] |= 1 << index
+        self._extend_run(kind, index)
+        if not was_active:
+            self._extend_run(ANY_ACTIVITY, index)
+        return True
+
+    def current_streak(self, kind: str = ANY_ACTIVITY, today: date = None) -> int:
+        """Get streak ending today or yesterday"""
+        today_index = self.day_index(today or clock.today())
+        last_day, length, _ = self.runs[kind]
+        return length if 0 <= today_index - last_day <= 1 else 0
+
+    def longest_streak(self, kind: str = ANY_ACTIVITY) -> int:
+        """Get the longest streak recorded"""
+        return self.runs[kind][2]
+
+    def missed_days(self, today: date = None, kind: str = ANY_ACTIVITY) -> List[int]:
+        """Get journey days before today with no activity of a kind"""
+        today_index = self.day_index(today or clock.today())
+        if today_index <= 0:
+            return []
+        missed = ~self._kind_bits(kind) & ((1 << today_index) - 1)
+        days = []
+        while missed:
+            lowest = missed & -missed
+            days.append(lowest.bit_length() - 1)
+            missed ^= lowest
+        return days
+
+    def heatmap(self, today: date = None) -> List[Dict[str, Any]]:
+        """Get one calendar cell per journey day up to today"""
+        today_index = self.day_index(today or clock.today())
+        task_bits, reflection_bits = self.bits[TASK_COMPLETED], self.bits[REFLECTED]
+        return [{
+            'day': index + 1,
+            'date': (self.start_date + timedelta(days=index)).isoformat(),
+            'task_completed': bool(task_bits >> index & 1),
+            'reflected': bool(reflection_bits >> index & 1),
+            'level': (task_bits >> index & 1) + (reflection_bits >> index & 1)
+        } for index in range(max(today_index + 1, 0))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert calendar to a compact storable dictionary"""
+        return {
+            'user_id': self.user_id,
+            'start_date': self.start_date.isoformat(),
+            'bits': {kind: value.to_bytes((value.bit_length() + 7) // 8, 'little')
+                     for kind, value in self.bits.items()},
+            'runs': {kind: list(run) for kind, run in self.runs.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ActivityCalendar':
+        """Load calendar from its stored dictionary"""
+        return cls(
+            user_id=data['user_id'],
+            start_date=to_date(data['start_date']),
+            bits={kind: int.from_bytes(value, 'little') for kind, value in data.get('bits', {}).items()},
+            runs={kind: list(run) for kind, run in data.get('runs', {}).items()}
+        )
+
+    def _kind_bits(self, kind: str) -> int:
+        """Get the bitset for a kind ('any' is the union)"""
+        if kind == ANY_ACTIVITY:
+            return self.bits[TASK_COMPLETED] | self.bits[REFLECTED]
+        return self.bits[kind]
+
+    def _extend_run(self, kind: str, index: int):
+        """Update run bookkeeping after setting a bit"""
+        run = self.runs[kind]
+        if index == run[0] + 1:
+            run[0], run[1] = index, run[1] + 1
+        elif index > run[0] + 1:
+            run[0], run[1] = index, 1
+        else:
+            # Back-filled an earlier day - rescan the bitset once
+            self.runs[kind] = run = self._scan_runs(self._kind_bits(kind))
+        run[2] = max(run[2], run[1])
+
+    @staticmethod
+    def _scan_runs(bits: int) -> List[int]:
+        """Recompute run bookkeeping from a bitset"""
+        last_day, length, longest = -2, 0, 0
+        index = 0
+        while bits:
+            if bits & 1:
+                length = length + 1 if index == last_day + 1 else 1
+                last_day = index
+                longest = max(longest, length)
+            bits >>= 1
+            index += 1
+        return [last_day, length, longest]
@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Dict, Any, Optional
+from utils.clock import clock as default_clock
+from utils.activity_calendar import ActivityCalendar, to_date, ANY_ACTIVITY, TASK_COMPLETED, REFLECTED
+
+class ActivityService:
+    """Service for per-user activity calendars and streaks"""
+
+    def __init__(self, db, clock=None):
+        self.db = db
+        self.clock = clock or default_clock
+
+    def get_calendar(self, user_id: str, user: Optional[Dict[str, Any]] = None) -> Optional[ActivityCalendar]:
+        """Load a user's calendar, building it from their history the first time"""
+        stored = self.db.get_activity(user_id)
+        if stored:
+            return ActivityCalendar.from_dict(stored)
+
+        user = user or self.db.get_user(user_id)
+        if not user:
+            return None
+        start_date = to_date(user.get('created_at')) or self.clock.today()
+        calendar = ActivityCalendar(user_id, start_date)
+        if self.backfill(calendar):
+            self.db.save_activity(user_id, calendar.to_dict())
+        return calendar
+
+    def backfill(self, calendar: ActivityCalendar) -> int:
+        """Mark the days of completed tasks and stored reflections; returns days marked.
+
+        Users who were active before calendars existed have only tasks and
+        reflections. Their calendar is built from those once, on first use,
+        and saved so later reads never rescan the history.
+        """
+        tasks = self.db.get_user_tasks(calendar.user_id, ['completed', 'completed_at'])
+        reflections = self.db.get_user_reflections(calendar.user_id, ['created_at'])
+        days = sorted([(to_date(task['completed_at']), TASK_COMPLETED)
+                       for task in tasks if task.get('completed') and task.get('completed_at')] +
+                      [(to_date(reflection['created_at']), REFLECTED)
+                       for reflection in reflections if reflection.get('created_at')])
+        # In date order, so runs extend incrementally instead of rescanning
+        return sum(1 for day, kind in days if calendar.mark(kind, day))
+
+    def record(self, user_id: str, kind: str, when: datetime = None) -> Optional[ActivityCalendar]:
+        """Record activity of a kind and persist the calendar"""
+        calendar = self.get_calendar(user_id)
+        if calendar is None:
+            return None
+
+        day = to_date(when) if when else self.clock.today()
+        if calendar.mark(kind, day):
+            self.db.save_activity(user_id, calendar.to_dict())
+        return calendar
+
+    def current_streak(self, user_id: str, kind: str = ANY_ACTIVITY, user: Optional[Dict[str, Any]] = None) -> int:
+        """Get current streak for a kind of activity"""
+        calendar = self.get_calendar(user_id, user)
+        return calendar.current_streak(kind, self.clock.today()) if calendar else 0
+
+    def get_calendar_summary(self, user_id: str, user: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Get heatmap, streaks and missed days for a user"""
+        calendar = self.get_calendar(user_id, user)
+        if calendar is None:
+            return None
+
+        today = self.clock.today()
+        return {
+            'start_date': calendar.start_date.isoformat(),
+            'days': calendar.heatmap(today),
+            'current_streak': calendar.current_streak(today=today),
+            'longest_streak': calendar.longest_streak(),
+            'missed_days': [day + 1 for day in calendar.missed_days(today)]
+        }
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from config import Config
+from prompts.task_prompts import MockAI
+from utils.cache import LRUCache, content_hash
+from utils.metrics import metrics
+
+READ_CHUNK = 16 * 1024
+
+class AIClient:
+    """Non-blocking client for an OpenAI-style chat completions provider.
+
+    Calls run as coroutines on one background event loop, so Flask handlers
+    never hold a worker while a model thinks: they submit a prompt and wait
+    on the returned future with their own deadline. On that loop:
+
+    - a semaphore caps concurrent provider calls at AI_MAX_CONCURRENCY,
+    - identical prompts already in flight share one provider call,
+    - responses are cached (LRU) by a hash of model + rendered prompt,
+    - timeouts, HTTP errors and a missing AI_PROVIDER_URL fall back to
+      MockAI (or None with fallback=False); fallback text is never cached.
+
+    The blocking HTTP request itself runs on a small thread pool sized to
+    the semaphore, so no more threads exist than allowed concurrent calls.
+    The timeout is enforced on the HTTP request, not around it: a slot is
+    released only when its thread has actually finished, so calls that
+    time out cannot leave the pool busy while new ones are admitted.
+    """
+
+    def __init__(self, provider_url: str = None, api_key: str = None, model: str = None,
+                 timeout: float = None, max_concurrency: int = None, cache_size: int = None):
+        self.provider_url = provider_url if provider_url is not None else Config.AI_PROVIDER_URL
+        self.api_key = api_key if api_key is not None else Config.AI_API_KEY
+        self.model = model or Config.AI_MODEL
+        self.timeout = timeout or Config.AI_TIMEOUT
+        self.max_concurrency = max_concurrency or Config.AI_MAX_CONCURRENCY
+        self.cache = LRUCache('ai_response', cache_size or Config.AI_CACHE_SIZE)
+        self.stats = {'requests': 0, 'provider_calls': 0, 'coalesced': 0, 'timeouts': 0, 'errors': 0, 'fallbacks': 0}
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+        self._loop = None
+        self._semaphore = None
+        self._executor = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a real provider is configured"""
+        return bool(self.provider_url)
+
+    def submit(self, prompt: str, fallback: bool = True) -> Future:
+        """Schedule a prompt on the client loop; returns a concurrent Future with the text"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.agenerate(prompt, fallback), loop)
+
+    def generate(self, prompt: str, timeout: float = None, fallback: bool = True) -> Optional[str]:
+        """Blocking helper: wait for a response (MockAI text, or None without fallback, if it fails)"""
+        future = self.submit(prompt, fallback)
+        try:
+            return future.result(timeout or self.timeout + 1)
+        except Exception:
+            self.stats['fallbacks'] += 1
+            return MockAI.generate_response(prompt) if fallback else None
+
+    def generate_many(self, prompts: List[str], timeout: float = None) -> List[str]:
+        """Send prompts concurrently and wait for all of them"""
+        futures = [self.submit(prompt) for prompt in prompts]
+        deadline = time.monotonic() + (timeout or self.timeout + 1)
+        results = []
+        for prompt, future in zip(prompts, futures):
+            try:
+                results.append(future.result(max(deadline - time.monotonic(), 0)))
+            except Exception:
+                self.stats['fallbacks'] += 1
+                results.append(MockAI.generate_response(prompt))
+        return results
+
+    async def agenerate(self, prompt: str, fallback: bool = True) -> Optional[str]:
+        """Get a response for a prompt; must run on the client loop (see submit)"""
+        self.stats['requests'] += 1
+        key = content_hash(self.model, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        shared = self._inflight.get(key)
+        if shared is not None:
+            self.stats['coalesced'] += 1
+            metrics.inc('clearnext_ai_requests_total', (('outcome', 'coalesced'),))
+        else:
+            shared = self._inflight[key] = asyncio.ensure_future(self._call(key, prompt))
+            shared.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        text = await asyncio.shield(shared)
+        if text is None and fallback:
+            return MockAI.generate_response(prompt)
+        return text
+
+    async def _call(self, key: bytes, prompt: str) -> Optional[str]:
+        """One provider call under the concurrency limit; None if it failed"""
+        if not self.provider_url:
+            return self._fallback('fallback')
+
+        async with self._semaphore:
+            self.stats['provider_calls'] += 1
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            try:
+                text = await loop.run_in_executor(self._executor, self._post, prompt)
+            except TimeoutError:
+                self.stats['timeouts'] += 1
+                return self._fallback('timeout')
+            except Exception:
+                self.stats['errors'] += 1
+                return self._fallback('error')
+            finally:
+                metrics.observe('clearnext_ai_request_duration_seconds', time.perf_counter() - started)
+
+        metrics.inc('clearnext_ai_requests_total', (('outcome', 'ok'),))
+        self.cache.set(key, text)
+        return text
+
+    def _post(self, prompt: str) -> str:
+        """Blocking HTTP request to the provider (runs on the executor); TimeoutError past self.timeout"""
+        deadline = time.monotonic() + self.timeout
+        body = json.dumps({'model': self.model, 'messages': [{'role': 'user', 'content': prompt}]}).encode()
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.provider_url, data=body, headers=headers, method='POST')
+        try:
+            # The socket timeout bounds connecting and each read; the deadline bounds a slow trickle
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                chunks = []
+                while chunk := response.read1(READ_CHUNK):
+                    if time.monotonic() > deadline:
+                        raise TimeoutError('provider response exceeded the timeout')
+                    chunks.append(chunk)
+        except urllib.error.URLError as exc:
+            if isinstance(exc.reason, TimeoutError):
+                raise TimeoutError(str(exc.reason)) from exc
+            raise
+        payload = json.loads(b''.join(chunks))
+        return payload['choices'][0]['message']['content']
+
+    def _fallback(self, outcome: str) -> None:
+        """Record a failed or skipped provider call"""
+        self.stats['fallbacks'] += 1
+        metrics.inc('clearnext_ai_requests_total', (('outcome', outcome),))
+        return None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop on first use"""
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='ai-http')
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    threading.Thread(target=loop.run_forever, name='ai-client', daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get call counters and cache figures"""
+        return {**self.stats, 'in_flight': len(self._inflight), 'cache': self.cache.stats()}
+
+# Global AI client instance
+ai_client = AIClient()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+ClearNext AI Stub Provider
+Local OpenAI-style chat completions server with configurable latency, for offline AI throughput tests
+
+Usage:
+    python ai_stub_server.py --port 8089 --latency 0.4 --jitter 0.1
+    AI_PROVIDER_URL=http://127.0.0.1:8089/v1/chat/completions python app.py
+"""
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from prompts.task_prompts import MockAI
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers chat completion requests with MockAI text after a simulated delay"""
+
+    latency = 0.3
+    jitter = 0.0
+    error_rate = 0.0
+    calls = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        StubHandler.calls += 1
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        if random.random() < self.error_rate:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        prompt = (body.get('messages') or [{}])[-1].get('content', '')
+        payload = json.dumps({
+            'id': f"stub-{StubHandler.calls}",
+            'model': body.get('model', 'stub'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': MockAI.generate_response(prompt)}}]
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    """Main stub server function"""
+    parser = argparse.ArgumentParser(description='ClearNext AI stub provider')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.3, help='Seconds per completion')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- seconds added to latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    StubHandler.latency, StubHandler.jitter, StubHandler.error_rate = args.latency, args.jitter, args.error_rate
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"🤖 AI stub listening on http://{args.host}:{args.port}/v1/chat/completions "
+          f"(latency {args.latency}s ± {args.jitter}s, errors {args.error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
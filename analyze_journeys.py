@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+ClearNext Journey Analysis
+Streams every finished journey through the reflection analyzer and writes one JSON line per user
+
+Usage:
+    python analyze_journeys.py --output journey_feedback.jsonl
+    python analyze_journeys.py --batch-size 1000 --limit 5000
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from utils.database import db
+from services.reflection_analyzer import ReflectionAnalyzer
+
+def main():
+    """Main analysis function"""
+    parser = argparse.ArgumentParser(description='ClearNext journey analysis batch job')
+    parser.add_argument('--batch-size', type=int, default=500, help='Users per reflections query')
+    parser.add_argument('--limit', type=int, default=0, help='Stop after this many users (0 = all)')
+    parser.add_argument('--output', help='JSON lines output path (default: stdout)')
+    args = parser.parse_args()
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    analyzer = ReflectionAnalyzer(db)
+    started = time.perf_counter()
+    processed = 0
+
+    print("📊 ClearNext Journey Analysis", file=sys.stderr)
+    try:
+        for feedback in analyzer.analyze_completed_journeys(batch_size=args.batch_size):
+            out.write(json.dumps(feedback, default=str) + '\n')
+            processed += 1
+            if processed % args.batch_size == 0:
+                rate = processed / (time.perf_counter() - started)
+                print(f"   {processed:,} journeys analyzed ({rate:,.0f}/s)", file=sys.stderr)
+            if args.limit and processed >= args.limit:
+                break
+    finally:
+        if args.output:
+            out.close()
+
+    print(f"✅ {processed:,} journeys analyzed in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
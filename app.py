@@ -1,14 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
 from datetime import datetime
+import math
 import os
 import sys
+import threading
+import time
 
 # Add project root to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import Config
 from utils.database import db
+from utils.events import event_bus
+from utils.metrics import metrics
+from utils.profiling import request_profiler
+from utils.rate_limit import rate_limiter, client_ip
+from utils.sse_hub import sse_hub
 from utils.validators import (
     validate_user_data, validate_reflection_data, 
     validate_journey_duration, validate_task_window,
@@ -28,16 +36,137 @@ def create_app():
     return app
 
 app = create_app()
+started_at = time.time()
 
 # Import routes after app creation
 from controllers.user_controller import user_bp
 from controllers.task_controller import task_bp
 from controllers.reflection_controller import reflection_bp
+from controllers.dashboard_controller import dashboard_bp
+from controllers.daily_check_controller import daily_check_bp
+from controllers.task_rules_controller import task_rules_bp
 
 # Register blueprints
 app.register_blueprint(user_bp, url_prefix='/api/users')
 app.register_blueprint(task_bp, url_prefix='/api/tasks')
 app.register_blueprint(reflection_bp, url_prefix='/api/reflections')
+app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(daily_check_bp, url_prefix='/api/daily-check')
+app.register_blueprint(task_rules_bp, url_prefix='/api/task-rules')
+
+# Register event consumers and start the background dispatcher
+from services.event_consumers import register_consumers
+from services.reminder_scheduler import ReminderScheduler
+from services.task_rules_service import TaskRulesService
+from services.reflection_service import ReflectionService
+reminder_scheduler = ReminderScheduler(db)
+register_consumers(event_bus, db, reminder_scheduler)
+event_bus.start()
+
+def live_channel_events(user_id):
+    """First events for a new live connection; None refuses unknown users"""
+    user = db.get_user(user_id)
+    return TaskRulesService(db).push_events(user) if user else None
+
+metrics.gauge('clearnext_event_queue_depth', 'Domain event deliveries waiting to be dispatched', event_bus.pending)
+metrics.gauge('clearnext_event_dead_letters', 'Domain event deliveries that exhausted retries',
+              lambda: len(event_bus.dead_letters))
+metrics.gauge('clearnext_http_in_flight', 'Requests holding an admission slot', lambda: rate_limiter.admission.in_flight)
+if db.write_behind:
+    metrics.gauge('clearnext_write_behind_pending', 'Coalesced updates waiting to be written', lambda: len(db.write_behind.pending))
+metrics.gauge('clearnext_sse_connections', 'Open live event connections', lambda: sse_hub.stats['connections'])
+
+# Always served, even when clients are over their limits or the server is saturated
+RATE_LIMIT_EXEMPT = ('/api/health', '/api/metrics')
+
+@app.before_request
+def start_request_metrics():
+    """Start timing the request and counting its DB calls"""
+    g.request_started_at = time.perf_counter()
+    metrics.begin_request()
+    
+    if request_profiler.should_profile(request.headers):
+        g.profiler = request_profiler.start()
+
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background_services():
+    """Start the SSE listener, the reminder scheduler and the near-duplicate index load, once per process"""
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    ReflectionService(db).build_near_duplicate_index()
+    if Config.SSE_ENABLED:
+        sse_hub.start(live_channel_events)
+    if Config.REMINDERS_ENABLED:
+        reminder_scheduler.start()
+
+@app.before_request
+def start_live_channel():
+    """Start background services in the process that serves requests (not the reloader parent)"""
+    if not _background_started:
+        start_background_services()
+
+def rate_limited_users():
+    """Users a request acts for: user_id in the path, query or JSON body, else the owners of the tasks it names"""
+    view_args = request.view_args or {}
+    body = request.get_json(silent=True) if request.is_json else None
+    body = body if isinstance(body, dict) else {}
+    
+    user_id = view_args.get('user_id') or request.args.get('user_id') or body.get('user_id')
+    if isinstance(user_id, str) and user_id:
+        return [user_id]
+    
+    if view_args.get('task_id'):
+        task = db.get_task(view_args['task_id'], ['user_id'])
+        return [task['user_id']] if task else []
+    completions = body.get('completions')
+    if isinstance(completions, list):
+        task_ids = [item.get('task_id') for item in completions[:Config.MAX_BATCH_SIZE] if isinstance(item, dict)]
+        return sorted({task['user_id'] for task in db.get_tasks([task_id for task_id in task_ids if isinstance(task_id, str)])})
+    return []
+
+@app.before_request
+def apply_rate_limits():
+    """Reject clients over their token bucket (429) and shed load when saturated (503)"""
+    if not rate_limiter.enabled or request.method == 'OPTIONS' or request.path in RATE_LIMIT_EXEMPT:
+        return None
+    
+    # IP bucket and admission first: they cost no DB work, so rejected traffic stays cheap
+    client = client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    rejection = rate_limiter.check_ip(client) or rate_limiter.admit()
+    if rejection is None:
+        g.admitted = True  # Released in teardown even if the user check below rejects
+        rejection = rate_limiter.check_users(rate_limited_users())
+        if rejection is None:
+            return None
+    
+    status, reason, retry_after = rejection
+    message = "Too many requests, please slow down" if status == 429 else "Server is busy, please retry shortly"
+    return format_response(False, message, {'reason': reason}), status, {'Retry-After': str(max(1, math.ceil(retry_after)))}
+
+@app.teardown_request
+def release_admission_slot(error):
+    """Free the request's concurrency slot, even if the handler raised"""
+    if g.pop('admitted', False):
+        rate_limiter.admission.release()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency, status and DB usage for the request"""
+    started_at = g.get('request_started_at')
+    if started_at is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        duration = time.perf_counter() - started_at
+        metrics.end_request(endpoint, request.method, response.status_code, duration)
+        
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            response.headers['X-Profile-Dump'] = request_profiler.finish(profiler, endpoint, request.method, duration)
+    return response
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -45,9 +174,21 @@ def health_check():
     return format_response(True, "ClearNext Backend is running", {
         'version': '1.0.0',
         'database': 'mock' if Config.USE_MOCK_DB else 'mongodb',
+        'uptime_seconds': round(time.time() - started_at, 1),
+        'event_queue_depth': event_bus.pending(),
+        'cache_hit_ratios': metrics.cache_hit_ratios(),
+        'rate_limits': rate_limiter.get_stats(),
+        'live_events': sse_hub.get_stats(),
+        'reminders': reminder_scheduler.get_stats(),
+        'write_behind': db.write_behind.get_stats() if db.write_behind else None,
         'timestamp': datetime.utcnow().isoformat()
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metrics endpoint in Prometheus text format"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -67,5 +208,11 @@ if __name__ == '__main__':
     print("🚀 Starting ClearNext Backend...")
     print(f"📊 Database: {'Mock (In-Memory)' if Config.USE_MOCK_DB else 'MongoDB'}")
     print(f"🌐 Server: http://localhost:5000")
+    if Config.SSE_ENABLED:
+        print(f"📡 Live events: http://localhost:{Config.SSE_PORT}/api/events/<user_id>")
+    
+    # With the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves; start reminders there
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
     
     app.run(debug=True, host='0.0.0.0', port=5000)
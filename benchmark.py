@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+ClearNext Service Benchmarks
+Times hot service calls and storage methods against synthetic populations
+
+Usage:
+    python benchmark.py                                  # 1k and 100k users
+    python benchmark.py --sizes 1000,100000,1000000      # include 1M (needs several GB of RAM)
+    python benchmark.py --output bench.json --baseline previous.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+
+os.environ.setdefault('USE_MOCK_DB', 'true')
+
+from utils.mock_db import MockDatabase
+from utils.events import event_bus
+from utils.validators import calculate_reflection_score
+from utils.activity_calendar import ActivityCalendar, TASK_COMPLETED, REFLECTED
+from utils.near_duplicates import NearDuplicateIndex, minhash_signature
+from services.ai_client import AIClient
+from services.task_service import TaskService
+from services.reflection_service import ReflectionService
+
+STATUSES = ['Student', 'Professional', 'Other']
+CONFUSION_AREAS = ['Career', 'Learning']
+STRUGGLE_TYPES = ['Motivation', 'Time', 'Concepts']
+MOODS = ['low', 'okay', 'good']
+WORDS = (
+    "today learned practice focus schedule time career goal research concept difficult "
+    "understand realized motivation energy helpful confusing clear interesting because "
+    "feel think believe improve tomorrow plan study pomodoro notes review project skill"
+).split()
+
+def synthetic_text(rng: random.Random, words: int) -> str:
+    """Generate reflection-like text"""
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+def build_population(db: MockDatabase, size: int, seed: int = 42) -> list:
+    """Fill a mock database with users and realistic task/reflection histories"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    user_ids = []
+
+    for index in range(size):
+        user_id = f"user_{index}"
+        journey_days = rng.choice([7, 14, 21])
+        elapsed = rng.randint(0, journey_days)
+        completed = rng.randint(0, elapsed)
+        created_at = now - timedelta(days=elapsed)
+
+        db.users[user_id] = {
+            'user_id': user_id,
+            'name': f"Student {index}",
+            'status': rng.choice(STATUSES),
+            'confusion_area': rng.choice(CONFUSION_AREAS),
+            'struggle_type': rng.choice(STRUGGLE_TYPES),
+            'journey_days': journey_days,
+            'current_day': completed + 1,
+            'user_type': 'guest',
+            'preferred_time': f"{rng.randint(6, 21):02d}:00",
+            'journey_completed': completed >= journey_days,
+            'created_at': created_at,
+            'updated_at': created_at
+        }
+
+        calendar = ActivityCalendar(user_id, created_at.date())
+        for day in range(1, min(completed + 1, journey_days) + 1):
+            day_date = created_at + timedelta(days=day - 1)
+            task_id = f"task_{index}_{day}"
+            done = day <= completed
+            db.tasks[task_id] = {
+                'task_id': task_id,
+                'user_id': user_id,
+                'day_number': day,
+                'task_content': f"Day {day}: Spend 30 minutes learning",
+                'completed': done,
+                'created_at': day_date
+            }
+            if not done:
+                continue
+
+            calendar.mark(TASK_COMPLETED, day_date.date())
+            calendar.mark(REFLECTED, day_date.date())
+            learning, feeling, improvement = (synthetic_text(rng, rng.randint(8, 40)) for _ in range(3))
+            reflection_id = f"ref_{index}_{day}"
+            db.reflections[reflection_id] = {
+                'reflection_id': reflection_id,
+                'user_id': user_id,
+                'task_id': task_id,
+                'day_number': day,
+                'learning': learning,
+                'feeling': feeling,
+                'improvement': improvement,
+                'mood_after': rng.choice(MOODS),
+                'word_count': len(f"{learning} {feeling} {improvement}".split()),
+                'anti_cheat_score': round(rng.uniform(0.5, 1.0), 2),
+                'created_at': day_date
+            }
+
+        if completed:
+            db.progress[f"prog_{user_id}"] = {
+                'user_id': user_id,
+                'current_streak': calendar.current_streak(REFLECTED),
+                'longest_streak': calendar.longest_streak(REFLECTED),
+                'total_days_completed': completed,
+                'journey_completion': completed / journey_days * 100,
+                'total_characters_written': 0,
+                'achievements': []
+            }
+        db.activity[user_id] = calendar.to_dict()
+        user_ids.append(user_id)
+
+    db.reindex()
+    return user_ids
+
+def time_operation(operation, args_list: list, budget: float) -> dict:
+    """Run an operation over sampled arguments until the list or time budget is exhausted"""
+    samples = []
+    deadline = time.perf_counter() + budget
+    for args in args_list:
+        started = time.perf_counter()
+        operation(*args)
+        samples.append(time.perf_counter() - started)
+        if time.perf_counter() > deadline:
+            break
+    event_bus.flush()
+
+    samples.sort()
+    total = sum(samples)
+    return {
+        'iterations': len(samples),
+        'mean_us': round(total / len(samples) * 1e6, 2),
+        'p50_us': round(samples[len(samples) // 2] * 1e6, 2),
+        'p95_us': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1e6, 2),
+        'ops_per_sec': round(len(samples) / total, 1) if total else None
+    }
+
+def run_population(size: int, iterations: int, budget: float, seed: int) -> dict:
+    """Benchmark every hot path against one population size"""
+    db = MockDatabase()
+    started = time.perf_counter()
+    user_ids = build_population(db, size, seed)
+    print(f"   built {size:,} users in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(seed)
+    sample = [rng.choice(user_ids) for _ in range(iterations)]
+    users = [(user_id, db.users[user_id]) for user_id in sample]
+    texts = [(synthetic_text(rng, rng.randint(20, 120)),) for _ in range(iterations)]
+    task_service = TaskService(db)
+    reflection_service = ReflectionService(db)
+
+    operations = {
+        'TaskService.get_or_create_today_task': (task_service.get_or_create_today_task, users),
+        'TaskService.get_task_status_summary': (task_service.get_task_status_summary, [(u,) for u in sample]),
+        'ReflectionService.get_reflection_analytics': (reflection_service.get_reflection_analytics, [(u,) for u in sample]),
+        'ReflectionService.calculate_streak': (reflection_service.calculate_streak, [(u,) for u in sample]),
+        'ReflectionService.update_user_progress': (reflection_service.update_user_progress, [(u, 120) for u in sample]),
+        'calculate_reflection_score': (calculate_reflection_score, texts),
+        'MockDatabase.get_user': (db.get_user, [(u,) for u in sample]),
+        'MockDatabase.get_user_tasks': (db.get_user_tasks, [(u,) for u in sample]),
+        'MockDatabase.get_user_reflections': (db.get_user_reflections, [(u,) for u in sample]),
+        'MockDatabase.get_progress': (db.get_progress, [(u,) for u in sample]),
+    }
+
+    results = {}
+    for name, (operation, args_list) in operations.items():
+        results[name] = time_operation(operation, args_list, budget)
+        print(f"   {name:<45} {results[name]['mean_us']:>12,.1f} µs  ({results[name]['iterations']} runs)")
+    return results
+
+def recycle(rng: random.Random, text: str, edits: int = 1) -> str:
+    """Copy a text with a few words swapped, as a recycled reflection would be"""
+    words = text.split()
+    for _ in range(edits):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return ' '.join(words)
+
+def run_near_duplicates(size: int, iterations: int, seed: int, table_bits: int) -> dict:
+    """Time near-duplicate checks against `size` stored reflections and measure recall"""
+    rng = random.Random(seed)
+    index = NearDuplicateIndex(table_bits=table_bits)
+    users = max(size // 20, 1)
+
+    # Originals that will later be recycled, stored before the bulk fill so they are the oldest
+    originals = [synthetic_text(rng, rng.randint(30, 120)) for _ in range(iterations)]
+    for i, text in enumerate(originals):
+        index.add(f"orig_{i}", f"user_{i % users}", minhash_signature(text))
+
+    # Background reflections: random signatures occupy the LSH tables like real unrelated text
+    started = time.perf_counter()
+    for i in range(size - iterations):
+        index.add(f"ref_{i}", f"user_{i % users}", array('H', rng.randbytes(32)))
+    print(f"   stored {size:,} reflection signatures in {time.perf_counter() - started:.1f}s "
+          f"({index.stats()['bytes'] / 1e6:,.0f} MB signatures + tables)")
+
+    fresh = [(synthetic_text(rng, rng.randint(30, 120)), f"new_{i}") for i in range(iterations)]
+    own = [(recycle(rng, originals[i]), f"user_{i % users}") for i in range(iterations)]
+    cross = [(recycle(rng, originals[i]), f"other_{i}") for i in range(iterations)]
+    outcomes = {}
+
+    def check(name, text, user_id):
+        match = index.check_and_add(f"{name}_{len(index)}", user_id, text)
+        outcomes.setdefault(name, []).append(match is not None)
+
+    results = {
+        'NearDuplicateIndex.check_and_add (fresh text)':
+            time_operation(lambda t, u: check('fresh', t, u), fresh, 60),
+        'NearDuplicateIndex.check_and_add (own history)':
+            time_operation(lambda t, u: check('own', t, u), own, 60),
+        'NearDuplicateIndex.check_and_add (other user)':
+            time_operation(lambda t, u: check('cross', t, u), cross, 60),
+    }
+    for name, metric in [('fresh', 'false_positive_rate'), ('own', 'own_history_recall'), ('cross', 'cross_user_recall')]:
+        flags = outcomes.get(name, [])
+        results[metric] = {'value': round(sum(flags) / len(flags), 3) if flags else None}
+
+    for name, row in results.items():
+        if 'mean_us' in row:
+            print(f"   {name:<50} {row['mean_us']:>10,.1f} µs  (p95 {row['p95_us']:,.1f} µs)")
+        else:
+            print(f"   {name:<50} {row['value']}")
+    return results
+
+def run_ai_throughput(url: str, requests: int, unique: int, concurrency: int, seed: int) -> dict:
+    """Fire `requests` prompts (drawn from `unique` distinct ones) at a provider through AIClient"""
+    rng = random.Random(seed)
+    client = AIClient(provider_url=url, max_concurrency=concurrency)
+    prompts = [f"Generate a personalized learning task for Day {rng.randrange(unique)}" for _ in range(requests)]
+
+    started = time.perf_counter()
+    client.generate_many(prompts, timeout=600)
+    elapsed = time.perf_counter() - started
+
+    stats = client.get_stats()
+    result = {
+        'requests': requests,
+        'unique_prompts': unique,
+        'concurrency': concurrency,
+        'elapsed_seconds': round(elapsed, 3),
+        'requests_per_sec': round(requests / elapsed, 1),
+        'provider_calls': stats['provider_calls'],
+        'coalesced': stats['coalesced'],
+        'cache_hits': stats['cache']['hits'],
+        'fallbacks': stats['fallbacks']
+    }
+    for name, value in result.items():
+        print(f"   {name:<20} {value}")
+    return result
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Get operations whose mean time regressed by more than threshold"""
+    regressions = []
+    for size, operations in results.items():
+        for name, current in operations.items():
+            previous = baseline.get(size, {}).get(name)
+            # Only timed operations compare; the AI run stores plain counters
+            if not isinstance(current, dict) or not isinstance(previous, dict):
+                continue
+            if not previous.get('mean_us') or 'mean_us' not in current:
+                continue
+            change = current['mean_us'] / previous['mean_us'] - 1
+            if change > threshold:
+                regressions.append(f"{size} users / {name}: {previous['mean_us']}µs -> {current['mean_us']}µs (+{change:.0%})")
+    return regressions
+
+def main():
+    """Main benchmark function"""
+    parser = argparse.ArgumentParser(description='ClearNext service benchmarks')
+    parser.add_argument('--sizes', default='1000,100000', help='Comma-separated population sizes')
+    parser.add_argument('--iterations', type=int, default=200, help='Max calls per operation')
+    parser.add_argument('--budget', type=float, default=5.0, help='Max seconds per operation')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to save JSON results')
+    parser.add_argument('--baseline', help='Previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown before failing (0.2 = 20%%)')
+    parser.add_argument('--near-duplicates', type=int, default=0,
+                        help='Also benchmark near-duplicate detection against this many stored reflections (e.g. 10000000)')
+    parser.add_argument('--table-bits', type=int, default=24, help='LSH table size for --near-duplicates (2^bits slots per band)')
+    parser.add_argument('--ai-url', help='Also benchmark AIClient against a provider, e.g. the ai_stub_server.py URL')
+    parser.add_argument('--ai-requests', type=int, default=2000, help='Prompts to send with --ai-url')
+    parser.add_argument('--ai-unique', type=int, default=200, help='Distinct prompts among --ai-requests')
+    parser.add_argument('--ai-concurrency', type=int, default=32, help='AIClient concurrency limit for --ai-url')
+    args = parser.parse_args()
+
+    print("⏱️ ClearNext Benchmarks")
+    print("=" * 40)
+
+    results = {}
+    for size in (int(value) for value in args.sizes.split(',')):
+        print(f"👥 Population: {size:,} users")
+        results[str(size)] = run_population(size, args.iterations, args.budget, args.seed)
+
+    if args.near_duplicates:
+        print(f"🔁 Near-duplicates: {args.near_duplicates:,} stored reflections")
+        results[f"near_duplicates_{args.near_duplicates}"] = run_near_duplicates(
+            args.near_duplicates, args.iterations, args.seed, args.table_bits)
+
+    if args.ai_url:
+        print(f"🤖 AI client: {args.ai_requests:,} prompts ({args.ai_unique} distinct) -> {args.ai_url}")
+        results['ai_client'] = run_ai_throughput(
+            args.ai_url, args.ai_requests, args.ai_unique, args.ai_concurrency, args.seed)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'iterations': args.iterations,
+                'seed': args.seed
+            },
+            'results': results
+        }, f, indent=2)
+    print(f"💾 Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('results', {})
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ No regressions over {args.threshold:.0%}")
+
+if __name__ == '__main__':
+    main()
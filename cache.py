@@ -0,0 +1,78 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from utils.metrics import metrics
+
+_MISSING = object()
+
+def content_hash(*parts: str) -> bytes:
+    """128-bit digest of text content, used as a compact cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b'\x00')
+    return digest.digest()
+
+class LRUCache:
+    """Thread-safe bounded LRU cache that reports hits and misses to metrics"""
+
+    def __init__(self, name: str, maxsize: int = 10000):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, marking it recently used"""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+        metrics.record_cache(self.name, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Get a cached value or compute and store it"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable) -> Any:
+        """Remove one entry (e.g. when the data behind it changed)"""
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry (e.g. after the computation it caches changed)"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get size and hit rate"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,89 @@
+from datetime import datetime, date, timedelta, timezone
+from typing import Optional
+
+class SystemClock:
+    """Clock backed by the system time"""
+
+    def now(self) -> datetime:
+        """Local wall-clock time"""
+        return datetime.now()
+
+    def utcnow(self) -> datetime:
+        """Naive UTC time"""
+        return datetime.utcnow()
+
+    def today(self) -> date:
+        """Current server-local date: the day basis of the task window, streaks and rollover"""
+        return self.now().date()
+
+    def local_date(self, moment: datetime) -> date:
+        """Server-local date of a stored time (naive values are UTC, as utcnow() writes them)"""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.astimezone().date()
+
+    def timestamp(self) -> float:
+        """Seconds since the epoch"""
+        return self.utcnow().replace(tzinfo=timezone.utc).timestamp()
+
+class ManualClock(SystemClock):
+    """Clock that only moves when told to - for simulations and tests"""
+
+    def __init__(self, start: Optional[datetime] = None):
+        self._now = start or datetime.utcnow()
+
+    def now(self) -> datetime:
+        return self._now
+
+    def utcnow(self) -> datetime:
+        return self._now
+
+    def local_date(self, moment: datetime) -> date:
+        # Simulated local time is UTC
+        return moment.astimezone(timezone.utc).date() if moment.tzinfo else moment.date()
+
+    def set(self, moment: datetime):
+        """Jump to a moment"""
+        self._now = moment
+
+    def advance(self, **kwargs):
+        """Move forward by a timedelta given as keyword arguments (days=1, hours=2, ...)"""
+        self._now += timedelta(**kwargs)
+
+class Clock:
+    """Injectable time source used by services, validators and models.
+
+    Delegates to the system clock unless another source is installed with
+    `use()`, so code can hold a reference to the global `clock` while a
+    simulator swaps in a ManualClock.
+    """
+
+    def __init__(self, source: SystemClock = None):
+        self.source = source or SystemClock()
+
+    def use(self, source: SystemClock) -> SystemClock:
+        """Install a time source"""
+        self.source = source
+        return source
+
+    def reset(self):
+        """Go back to the system clock"""
+        self.source = SystemClock()
+
+    def now(self) -> datetime:
+        return self.source.now()
+
+    def utcnow(self) -> datetime:
+        return self.source.utcnow()
+
+    def today(self) -> date:
+        return self.source.today()
+
+    def local_date(self, moment: datetime) -> date:
+        return self.source.local_date(moment)
+
+    def timestamp(self) -> float:
+        return self.source.timestamp()
+
+# Global clock instance
+clock = Clock()
@@ -22,10 +22,81 @@ class Config:
     # Task Configuration
     TASK_WINDOW_START_HOUR = 0  # 12:00 AM
     TASK_WINDOW_END_HOUR = 23   # 11:59 PM
+    TASK_CONTENT_CACHE_SIZE = int(os.environ.get('TASK_CONTENT_CACHE_SIZE', '10000'))  # (profile, day) entries
     
     # Reflection Configuration
     MIN_REFLECTION_LENGTH = 50
     MIN_SECTION_LENGTH = 10
+    NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', '0.8'))  # estimated Jaccard
+    SCORE_CACHE_SIZE = int(os.environ.get('SCORE_CACHE_SIZE', '10000'))  # memoised reflection scores
+    JOURNEY_FEEDBACK_CACHE_SIZE = int(os.environ.get('JOURNEY_FEEDBACK_CACHE_SIZE', '50000'))
+    NEAR_DUPLICATE_TABLE_BITS = int(os.environ.get('NEAR_DUPLICATE_TABLE_BITS', '20'))  # 4 x 2^bits x 4 bytes of LSH slots
+    
+    # Event Bus Configuration
+    EVENT_BATCH_SIZE = int(os.environ.get('EVENT_BATCH_SIZE', '100'))
+    EVENT_FLUSH_INTERVAL = float(os.environ.get('EVENT_FLUSH_INTERVAL', '0.05'))  # seconds
+    EVENT_MAX_ATTEMPTS = int(os.environ.get('EVENT_MAX_ATTEMPTS', '3'))
+    EVENT_RETRY_DELAY = float(os.environ.get('EVENT_RETRY_DELAY', '0.5'))  # seconds before the first retry, doubling after
+    
+    # Dashboard Configuration
+    DASHBOARD_WORKERS = int(os.environ.get('DASHBOARD_WORKERS', '16'))  # shared fan-out threads
+    DASHBOARD_SECTION_BUDGET = float(os.environ.get('DASHBOARD_SECTION_BUDGET', '0.5'))  # seconds per section
+    DASHBOARD_MAX_QUEUED = int(os.environ.get('DASHBOARD_MAX_QUEUED', '16'))  # sections waiting beyond the workers; more are shed
+    
+    # Batch Endpoints
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '100'))  # ids or completions per request
+    
+    # Rate Limiting and Load Shedding (token buckets refill at RATE per second up to BURST)
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_USER_RATE = float(os.environ.get('RATE_LIMIT_USER_RATE', '5'))
+    RATE_LIMIT_USER_BURST = float(os.environ.get('RATE_LIMIT_USER_BURST', '20'))
+    RATE_LIMIT_IP_RATE = float(os.environ.get('RATE_LIMIT_IP_RATE', '50'))
+    RATE_LIMIT_IP_BURST = float(os.environ.get('RATE_LIMIT_IP_BURST', '100'))
+    RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', '0'))  # proxies in front that append X-Forwarded-For
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))  # buckets kept before idle ones are swept
+    MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', '64'))
+    MAX_QUEUE_WAIT = float(os.environ.get('MAX_QUEUE_WAIT', '0.05'))  # seconds to wait for a slot before a 503
+    
+    # Server-Sent Events (live task/notification channel on its own port)
+    SSE_ENABLED = os.environ.get('SSE_ENABLED', 'True').lower() == 'true'
+    SSE_HOST = os.environ.get('SSE_HOST', '0.0.0.0')
+    SSE_PORT = int(os.environ.get('SSE_PORT', '5001'))
+    SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', '25'))  # seconds between keep-alive comments
+    
+    # Daily Reminders (server-side, at each user's preferred_time in server local time)
+    REMINDERS_ENABLED = os.environ.get('REMINDERS_ENABLED', 'True').lower() == 'true'
+    REMINDER_SINKS = [name.strip() for name in os.environ.get('REMINDER_SINKS', 'sse,file').split(',') if name.strip()]
+    REMINDER_FILE = os.environ.get('REMINDER_FILE', 'reminders.jsonl')  # file sink output
+    REMINDER_WEBHOOK_URL = os.environ.get('REMINDER_WEBHOOK_URL', 'http://localhost:9000/reminders')  # webhook sink target
+    REMINDER_TICK_SECONDS = float(os.environ.get('REMINDER_TICK_SECONDS', '15'))
+    REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', '1000'))  # users per lookup and delivery
+    REMINDER_LEASE_SECONDS = float(os.environ.get('REMINDER_LEASE_SECONDS', '60'))  # one scheduler per deployment; failover after this
+    
+    # Write-Behind Buffer (opt-in: user/progress updates coalesced per user and written in bulk)
+    WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'False').lower() == 'true'
+    WRITE_BEHIND_INTERVAL = float(os.environ.get('WRITE_BEHIND_INTERVAL', '1.0'))  # seconds; bounds unflushed data
+    WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '5000'))  # records before an early flush
+    
+    # Daily Rollover Batch Job
+    ROLLOVER_BATCH_SIZE = int(os.environ.get('ROLLOVER_BATCH_SIZE', '2000'))  # users per read and bulk write
+    
+    # Profiling Configuration (opt-in)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILING_HEADER = os.environ.get('PROFILING_HEADER', 'X-ClearNext-Profile')
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')  # Required header value; header ignored when unset
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))  # 0.0 - 1.0
+    PROFILING_DIR = os.environ.get('PROFILING_DIR', 'profiles')
+    PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', '100'))
+    PROFILING_MAX_BYTES = int(os.environ.get('PROFILING_MAX_BYTES', str(50 * 1024 * 1024)))
+    
+    # AI Provider Configuration (OpenAI-style chat completions; unset URL = MockAI only)
+    AI_PROVIDER_URL = os.environ.get('AI_PROVIDER_URL', '')
+    AI_API_KEY = os.environ.get('AI_API_KEY', '')
+    AI_MODEL = os.environ.get('AI_MODEL', 'gpt-4o-mini')
+    AI_TIMEOUT = float(os.environ.get('AI_TIMEOUT', '10'))  # seconds per provider call
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', '8'))
+    AI_CACHE_SIZE = int(os.environ.get('AI_CACHE_SIZE', '5000'))
+    AI_TASK_GENERATION = os.environ.get('AI_TASK_GENERATION', 'False').lower() == 'true'  # model-written daily tasks
     
     # CORS Configuration
     CORS_ORIGINS = ["http://localhost:8000", "http://127.0.0.1:8000"]
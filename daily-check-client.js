@@ -1,7 +1,9 @@
 // Frontend Integration - Daily Check Client
 class DailyCheckClient {
-    constructor(baseUrl = 'http://localhost:3000') {
+    constructor(baseUrl = 'http://localhost:5000', eventsUrl = 'http://localhost:5001') {
         this.baseUrl = baseUrl;
+        this.eventsUrl = eventsUrl;
+        this.eventSource = null;
         this.token = localStorage.getItem('clearnext_token');
         this.userId = localStorage.getItem('clearnext_user_id');
     }
@@ -70,6 +72,37 @@ class DailyCheckClient {
         }
     }
 
+    // Live task updates pushed by the server (replaces polling for the unlock time)
+    subscribeToUpdates() {
+        if (!this.userId || !window.EventSource || this.eventSource) {
+            return this.eventSource;
+        }
+
+        this.eventSource = new EventSource(`${this.eventsUrl}/api/events/${encodeURIComponent(this.userId)}`);
+
+        this.eventSource.addEventListener('task_state', (event) => {
+            const state = JSON.parse(event.data);
+            window.dispatchEvent(new CustomEvent('clearnext:task-state', { detail: state }));
+        });
+
+        this.eventSource.addEventListener('task_unlocked', (event) => {
+            const unlock = JSON.parse(event.data);
+            window.dispatchEvent(new CustomEvent('clearnext:task-unlocked', { detail: unlock }));
+            this.routeBasedOnStatus();
+        });
+
+        // EventSource reconnects by itself; the server resends the current state on reconnect
+        this.eventSource.onerror = () => console.warn('Live updates disconnected, retrying...');
+        return this.eventSource;
+    }
+
+    unsubscribe() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+
     // Frontend routing based on daily check result
     async routeBasedOnStatus() {
         const status = await this.checkDailyStatus();
@@ -83,7 +116,7 @@ class DailyCheckClient {
         await this.markUserActive();
 
         // Route based on status
-        switch (status.action) {
+        switch (status.data.action) {
             case 'redirect_to_login':
                 window.location.href = 'login.html';
                 break;
@@ -118,14 +151,14 @@ class DailyCheckClient {
                 break;
 
             default:
-                console.warn('Unknown action:', status.action);
+                console.warn('Unknown action:', status.data.action);
                 window.location.href = 'dashboard-new.html';
         }
     }
 
     async generateAndShowTask(status) {
         try {
-            const response = await fetch(`${this.baseUrl}/api/tasks/today`, {
+            const response = await fetch(`${this.baseUrl}/api/tasks/today/${this.userId}`, {
                 method: 'GET',
                 headers: {
                     'Authorization': `Bearer ${this.token}`,
@@ -137,7 +170,7 @@ class DailyCheckClient {
             if (result.success) {
                 window.location.href = 'tasks.html';
             } else {
-                this.showErrorPage({ error: result.error });
+                this.showErrorPage({ error: result.message });
             }
         } catch (error) {
             console.error('Task generation failed:', error);
@@ -180,7 +213,7 @@ class DailyCheckClient {
     }
 
     handleError(status) {
-        if (status.action === 'redirect_to_login') {
+        if (status.data?.action === 'redirect_to_login') {
             // Clear invalid token
             localStorage.removeItem('clearnext_token');
             localStorage.removeItem('clearnext_user_id');
@@ -201,6 +234,7 @@ document.addEventListener('DOMContentLoaded', async function() {
     if (isMainApp) {
         const dailyCheck = new DailyCheckClient();
         await dailyCheck.routeBasedOnStatus();
+        dailyCheck.subscribeToUpdates();
     }
 });
 
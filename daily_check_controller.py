@@ -0,0 +1,48 @@
+from flask import Blueprint, request, jsonify
+from utils.database import db
+from utils.validators import format_response
+from services.task_rules_service import TaskRulesService
+
+daily_check_bp = Blueprint('daily_check', __name__)
+
+@daily_check_bp.route('/<user_id>', methods=['GET'])
+def daily_check(user_id):
+    """Decide which page the app should open for the user today"""
+    try:
+        user = db.get_user(user_id)
+        if not user:
+            return format_response(False, "Please login to continue", {'action': 'redirect_to_login'}), 404
+        
+        action, message, data = TaskRulesService(db).daily_check(user)
+        data['action'] = action
+        
+        return format_response(True, message, data)
+        
+    except Exception as e:
+        return format_response(False, f"Error running daily check: {str(e)}", {'action': 'show_error_page'}), 500
+
+@daily_check_bp.route('/<user_id>/next-available', methods=['GET'])
+def next_available(user_id):
+    """Get when the user's next task unlocks"""
+    try:
+        user = db.get_user(user_id)
+        if not user:
+            return format_response(False, "User not found"), 404
+        
+        return format_response(True, "Next available time retrieved", TaskRulesService(db).next_available(user))
+        
+    except Exception as e:
+        return format_response(False, f"Error getting next available time: {str(e)}"), 500
+
+@daily_check_bp.route('/<user_id>/mark-active', methods=['POST'])
+def mark_active(user_id):
+    """Record that the user opened the app"""
+    try:
+        last_active_date = TaskRulesService(db).mark_active(user_id)
+        if last_active_date is None:
+            return format_response(False, "User not found"), 404
+        
+        return format_response(True, "User marked active", {'last_active_date': last_active_date})
+        
+    except Exception as e:
+        return format_response(False, f"Error marking user active: {str(e)}"), 500
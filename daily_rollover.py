@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+ClearNext Daily Rollover
+Brings every user's journey state up to date: missed days, journey completion and broken streaks
+
+Usage:
+    python daily_rollover.py
+    python daily_rollover.py --batch-size 5000 --limit 100000
+
+Days are counted in server local time, the same as the task window and streaks.
+Run it once a day, shortly after local midnight, e.g. from cron:
+    5 0 * * * cd /path/to/clearnext && python daily_rollover.py
+"""
+
+import argparse
+import json
+import sys
+
+from utils.database import db
+from services.rollover_job import RolloverJob
+
+def main():
+    """Main rollover function"""
+    parser = argparse.ArgumentParser(description='ClearNext daily rollover batch job')
+    parser.add_argument('--batch-size', type=int, default=0, help='Users per read and bulk write (default: ROLLOVER_BATCH_SIZE)')
+    parser.add_argument('--limit', type=int, default=0, help='Stop after this many users (0 = all)')
+    args = parser.parse_args()
+
+    job = RolloverJob(db, batch_size=args.batch_size or None)
+    totals = {'users': 0, 'elapsed_seconds': 0.0}
+    report_every = max(job.batch_size, 100000)
+
+    print("🌙 ClearNext Daily Rollover", file=sys.stderr)
+    for totals in job.iter_batches(limit=args.limit):
+        if totals['users'] % report_every < job.batch_size:
+            rate = totals['users'] / max(totals['elapsed_seconds'], 0.01)
+            print(f"   {totals['users']:,} users processed ({rate:,.0f}/s)", file=sys.stderr)
+
+    print(json.dumps(totals))
+    print(f"✅ {totals['users']:,} users rolled over in {totals['elapsed_seconds']:.1f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
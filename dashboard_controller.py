@@ -0,0 +1,27 @@
+from flask import Blueprint, request, jsonify
+from utils.database import db
+from utils.validators import format_response
+from services.dashboard_service import DashboardService, SECTIONS
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+@dashboard_bp.route('/<user_id>', methods=['GET'])
+def get_dashboard(user_id):
+    """Get user, today's task, task summary, progress, analytics and calendar in one response"""
+    try:
+        sections = None
+        if request.args.get('sections'):
+            sections = [name.strip() for name in request.args['sections'].split(',')]
+            unknown = [name for name in sections if name not in SECTIONS]
+            if unknown:
+                return format_response(False, f"Unknown sections: {', '.join(unknown)}"), 400
+        
+        dashboard = DashboardService(db).get_dashboard(user_id, sections)
+        
+        if dashboard is None:
+            return format_response(False, "User not found"), 404
+        
+        return format_response(True, "Dashboard retrieved", dashboard)
+        
+    except Exception as e:
+        return format_response(False, f"Error getting dashboard: {str(e)}"), 500
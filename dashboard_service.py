@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Any, Callable, List, Optional
+from config import Config
+from services.activity_service import ActivityService
+from services.reflection_service import ReflectionService
+from services.task_service import TaskService
+from utils.clock import clock as default_clock
+from utils.fields import without_hidden
+from utils.metrics import metrics
+from utils.validators import validate_task_window, public_user
+
+SECTIONS = ('today_task', 'task_summary', 'progress', 'reflection_analytics', 'calendar')
+
+# Shared by all dashboard requests so the number of fan-out threads stays fixed
+_executor = ThreadPoolExecutor(max_workers=Config.DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+# Sections running or queued; a slot is freed when the section finishes, not when its request gives up
+_slots = threading.Semaphore(Config.DASHBOARD_WORKERS + Config.DASHBOARD_MAX_QUEUED)
+
+class SectionExpired(Exception):
+    """A queued section whose budget ran out before a worker picked it up"""
+
+class DashboardService:
+    """Builds the whole dashboard payload in one call.
+
+    The user is looked up once and passed to every section. The sections
+    then run concurrently on a shared thread pool. Each one gets its own
+    time budget from the start of the fan-out. A section that misses its
+    budget, or fails, comes back as null with a status, so one slow query
+    cannot hold up the page.
+
+    A thread cannot be stopped, so a section that overruns keeps its
+    worker until it finishes. To keep such stragglers from piling up work
+    behind them, at most DASHBOARD_MAX_QUEUED sections wait beyond the busy
+    workers. Further sections are shed at once. A queued section whose
+    budget has run out by the time a worker takes it is skipped. Reads
+    only: today's task is shown if it exists but is never generated here.
+    """
+
+    def __init__(self, db, clock=None, budgets: Optional[Dict[str, float]] = None):
+        self.db = db
+        self.clock = clock or default_clock
+        self.budgets = budgets or {}
+
+    def get_dashboard(self, user_id: str, sections: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get the user plus the requested sections (all by default); None if the user does not exist"""
+        user = self.db.get_user(user_id)
+        if not user:
+            return None
+
+        builders = self._builders(user_id, user)
+        names = [name for name in (sections or SECTIONS) if name in builders]
+        started = time.perf_counter()
+        futures = {name: self._submit(name, builders[name], started + self.budget_for(name)) for name in names}
+
+        data, status = {}, {}
+        for name in sorted(names, key=self.budget_for):
+            remaining = started + self.budget_for(name) - time.perf_counter()
+            if futures[name] is None:
+                data[name] = None
+                status[name] = {'status': 'shed'}
+                metrics.inc('clearnext_dashboard_sections_total', (('section', name), ('status', 'shed')))
+                continue
+            try:
+                data[name], elapsed = futures[name].result(timeout=max(remaining, 0))
+                status[name] = {'status': 'ok', 'elapsed_ms': round(elapsed * 1000, 2)}
+            except (FutureTimeout, SectionExpired):
+                futures[name].cancel()  # Frees the slot now if the section never started
+                data[name] = None
+                status[name] = {'status': 'timeout', 'budget_ms': round(self.budget_for(name) * 1000)}
+            except Exception as e:
+                data[name] = None
+                status[name] = {'status': 'error', 'error': str(e)}
+            metrics.inc('clearnext_dashboard_sections_total', (('section', name), ('status', status[name]['status'])))
+
+        return {
+            'user': public_user(user),
+            'sections': {name: data[name] for name in names},
+            'section_status': {name: status[name] for name in names},
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def budget_for(self, section: str) -> float:
+        """Seconds a section may take, measured from the start of the fan-out"""
+        return self.budgets.get(section, Config.DASHBOARD_SECTION_BUDGET)
+
+    def _builders(self, user_id: str, user: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+        """Section loaders, all sharing the one user record"""
+        task_service = TaskService(self.db, self.clock)
+        return {
+            'today_task': lambda: self._today_task(task_service, user_id, user),
+            'task_summary': lambda: task_service.get_task_status_summary(user_id, user),
+            'progress': lambda: self.db.get_progress(user_id),
+            'reflection_analytics': lambda: ReflectionService(self.db, self.clock).get_reflection_analytics(user_id),
+            'calendar': lambda: ActivityService(self.db, self.clock).get_calendar_summary(user_id, user)
+        }
+
+    def _today_task(self, task_service: TaskService, user_id: str, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Today's stored task if already generated (with its completion), or None outside the task window"""
+        is_valid, _ = validate_task_window(self.clock.now())
+        if not is_valid:
+            return None
+        task = task_service.find_today_task(user_id)
+        return without_hidden(task) if task else None
+
+    def _submit(self, name: str, build: Callable[[], Any], deadline: float):
+        """Queue a section on the shared pool, or None to shed it when the pool is saturated"""
+        if not _slots.acquire(blocking=False):
+            return None
+        future = _executor.submit(self._timed, name, build, deadline)
+        future.add_done_callback(lambda _: _slots.release())
+        return future
+
+    def _timed(self, name: str, build: Callable[[], Any], deadline: float) -> tuple:
+        """Run one section and record how long it took"""
+        started = time.perf_counter()
+        if started >= deadline:
+            raise SectionExpired(name)  # Its request has already given up on it
+        result = build()
+        elapsed = time.perf_counter() - started
+        metrics.observe('clearnext_dashboard_section_seconds', elapsed, (('section', name),))
+        return result, elapsed
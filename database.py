@@ -1,7 +1,11 @@
-from datetime import datetime
+from datetime import timedelta
 from typing import Dict, Any, Optional
 from config import Config
+from utils.clock import clock
 from utils.mock_db import mock_db
+from utils.ids import ids
+from utils.metrics import instrument_db
+from utils.write_behind import WriteBehindBuffer
 
 class DatabaseManager:
     """Database manager that handles both MongoDB and mock database"""
@@ -10,12 +14,16 @@ class DatabaseManager:
         self.use_mock = Config.USE_MOCK_DB
         self.mongo_client = None
         self.db = None
+        # Optional: user and progress updates are coalesced in memory and written in bulk
+        self.write_behind = WriteBehindBuffer(self.bulk_set) if Config.WRITE_BEHIND_ENABLED else None
         
         if not self.use_mock:
             try:
                 from pymongo import MongoClient
                 self.mongo_client = MongoClient(Config.MONGO_URI)
                 self.db = self.mongo_client.clearnext
+                # The reminder scheduler polls users by updated_at every tick
+                self.db.users.create_index('updated_at')
                 print("✅ Connected to MongoDB")
             except Exception as e:
                 print(f"❌ MongoDB connection failed: {e}")
@@ -24,106 +32,423 @@ class DatabaseManager:
         else:
             print("📝 Using mock database")
     
+    @instrument_db
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create user in database"""
         if self.use_mock:
             return mock_db.create_user(user_data)
         else:
-            user_data['created_at'] = datetime.utcnow()
-            user_data['updated_at'] = datetime.utcnow()
+            user_data['created_at'] = clock.utcnow()
+            user_data['updated_at'] = clock.utcnow()
             result = self.db.users.insert_one(user_data)
             user_data['_id'] = str(result.inserted_id)
             return user_data
     
-    def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get user by ID"""
+    @instrument_db
+    def get_user(self, user_id: str, fields: list = None) -> Optional[Dict[str, Any]]:
+        """Get user by ID, optionally only some fields"""
         if self.use_mock:
-            return mock_db.get_user(user_id)
+            user = mock_db.get_user(user_id, fields)
         else:
-            return self.db.users.find_one({'user_id': user_id})
+            user = self.db.users.find_one({'user_id': user_id}, self._projection(fields))
+        return self.write_behind.overlay('users', user_id, user) if self.write_behind else user
     
+    @instrument_db
+    def get_users(self, user_ids: list) -> list:
+        """Get several users by ID in one round trip"""
+        if self.use_mock:
+            users = mock_db.get_users(user_ids)
+        else:
+            users = list(self.db.users.find({'user_id': {'$in': list(user_ids)}}, {'_id': 0}))
+        if self.write_behind:
+            return [self.write_behind.overlay('users', user['user_id'], user) for user in users]
+        return users
+    
+    def update_users(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Apply per-user updates in one round trip"""
+        if self.write_behind:
+            return self._write_behind('users', updates)
+        return self.bulk_set('users', updates)
+    
+    @instrument_db
+    def bulk_set(self, collection: str, updates: Dict[str, Dict[str, Any]]) -> int:
+        """$set per-user fields on users or progress in one round trip, bypassing write-behind"""
+        if not updates:
+            return 0
+        if self.use_mock:
+            if collection == 'users':
+                return mock_db.update_users(updates)
+            return mock_db.update_progress_for_users(updates)
+        else:
+            from pymongo import UpdateOne
+            now = clock.utcnow()
+            result = self.db[collection].bulk_write([
+                UpdateOne({'user_id': user_id}, {'$set': {'updated_at': now, **fields}})
+                for user_id, fields in updates.items()
+            ], ordered=False)
+            return result.matched_count
+    
+    @instrument_db
     def update_user(self, user_id: str, updates: Dict[str, Any]) -> bool:
-        """Update user data"""
+        """Update user data (with write-behind on, True once the write is queued for an existing user)"""
+        if self.write_behind:
+            return self._write_behind('users', {user_id: updates}) > 0
         if self.use_mock:
             return mock_db.update_user(user_id, updates)
         else:
-            updates['updated_at'] = datetime.utcnow()
+            updates['updated_at'] = clock.utcnow()
             result = self.db.users.update_one(
                 {'user_id': user_id}, 
                 {'$set': updates}
             )
             return result.modified_count > 0
     
+    def iter_users(self, fields: list = None, batch_size: int = 1000):
+        """Stream every user, optionally only some fields"""
+        if self.use_mock:
+            return mock_db.iter_users(fields)
+        else:
+            projection = {field: 1 for field in fields} if fields else {}
+            projection['_id'] = 0
+            return self.db.users.find({}, projection, batch_size=batch_size)
+    
+    def iter_users_updated_since(self, since, fields: list = None, batch_size: int = 1000):
+        """Stream users changed at or after a time, optionally only some fields"""
+        if self.use_mock:
+            return mock_db.iter_users_updated_since(since, fields)
+        else:
+            return self.db.users.find({'updated_at': {'$gte': since}}, self._projection(fields), batch_size=batch_size)
+    
+    @instrument_db
+    def acquire_lease(self, name: str, owner: str, ttl: float, data: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """Take or renew a named lease for `ttl` seconds, storing `data` on it.
+        
+        Returns the lease record (including data left by the previous holder)
+        if `owner` now holds it, None if another owner's lease is still live.
+        """
+        if self.use_mock:
+            return mock_db.acquire_lease(name, owner, ttl, data)
+        else:
+            from pymongo import ReturnDocument
+            from pymongo.errors import DuplicateKeyError
+            now = clock.utcnow()
+            try:
+                return self.db.leases.find_one_and_update(
+                    {'_id': name, '$or': [{'owner': owner}, {'expires_at': {'$lt': now}}]},
+                    {'$set': {**(data or {}), 'owner': owner, 'expires_at': now + timedelta(seconds=ttl)}},
+                    upsert=True, return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                return None  # Held by someone else: the upsert collided with their record
+    
+    @instrument_db
+    def release_lease(self, name: str, owner: str) -> bool:
+        """Give up a lease early so another process can take it"""
+        if self.use_mock:
+            return mock_db.release_lease(name, owner)
+        else:
+            result = self.db.leases.update_one({'_id': name, 'owner': owner},
+                                               {'$set': {'expires_at': clock.utcnow() - timedelta(seconds=1)}})
+            return result.modified_count > 0
+    
+    def iter_completed_users(self, batch_size: int = 1000):
+        """Stream users whose journey is finished"""
+        if self.use_mock:
+            return mock_db.iter_completed_users()
+        else:
+            return self.db.users.find({'$or': [
+                {'journey_completed': True},
+                {'$expr': {'$gt': ['$current_day', '$journey_days']}}
+            ]}, {'_id': 0}, batch_size=batch_size)
+    
+    @instrument_db
     def create_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create task in database"""
         if self.use_mock:
             return mock_db.create_task(task_data)
         else:
-            task_data['created_at'] = datetime.utcnow()
+            task_data['created_at'] = clock.utcnow()
             result = self.db.tasks.insert_one(task_data)
             task_data['_id'] = str(result.inserted_id)
             return task_data
     
-    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
-        """Get task by ID"""
+    @instrument_db
+    def get_task(self, task_id: str, fields: list = None) -> Optional[Dict[str, Any]]:
+        """Get task by ID, optionally only some fields"""
+        if self.use_mock:
+            return mock_db.get_task(task_id, fields)
+        else:
+            return self.db.tasks.find_one({'task_id': task_id}, self._projection(fields))
+    
+    @instrument_db
+    def update_task(self, task_id: str, updates: Dict[str, Any]) -> bool:
+        """Update task data"""
+        if self.use_mock:
+            return mock_db.update_task(task_id, updates)
+        else:
+            result = self.db.tasks.update_one(
+                {'task_id': task_id},
+                {'$set': updates}
+            )
+            return result.modified_count > 0
+    
+    @instrument_db
+    def complete_task(self, task_id: str, updates: Dict[str, Any]) -> bool:
+        """Mark a task completed only if it is not already; True if this call completed it"""
+        updates = {**updates, 'completed': True}
+        if self.use_mock:
+            return mock_db.complete_task(task_id, updates)
+        else:
+            result = self.db.tasks.update_one(
+                {'task_id': task_id, 'completed': {'$ne': True}},
+                {'$set': updates}
+            )
+            return result.modified_count > 0
+    
+    @instrument_db
+    def complete_tasks(self, updates: Dict[str, Dict[str, Any]]) -> set:
+        """Conditionally complete many tasks in one round trip; returns the IDs this call completed"""
+        if not updates:
+            return set()
+        if self.use_mock:
+            return mock_db.complete_tasks({task_id: {**task_updates, 'completed': True}
+                                           for task_id, task_updates in updates.items()})
+        else:
+            from pymongo import UpdateOne
+            # The token tells this call's completions apart if a concurrent request won some tasks
+            token = ids.new_id('done')
+            result = self.db.tasks.bulk_write([
+                UpdateOne({'task_id': task_id, 'completed': {'$ne': True}},
+                          {'$set': {**task_updates, 'completed': True, 'completion_id': token}})
+                for task_id, task_updates in updates.items()
+            ], ordered=False)
+            if result.modified_count == len(updates):
+                return set(updates)
+            return {task['task_id'] for task in self.db.tasks.find(
+                {'task_id': {'$in': list(updates)}, 'completion_id': token}, {'task_id': 1, '_id': 0})}
+    
+    @instrument_db
+    def get_tasks(self, task_ids: list) -> list:
+        """Get several tasks by ID in one round trip"""
+        if self.use_mock:
+            return mock_db.get_tasks(task_ids)
+        else:
+            return list(self.db.tasks.find({'task_id': {'$in': list(task_ids)}}, {'_id': 0}))
+    
+    @instrument_db
+    def update_tasks(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Apply per-task updates in one round trip"""
+        if not updates:
+            return 0
         if self.use_mock:
-            return mock_db.get_task(task_id)
+            return mock_db.update_tasks(updates)
         else:
-            return self.db.tasks.find_one({'task_id': task_id})
+            from pymongo import UpdateOne
+            result = self.db.tasks.bulk_write([
+                UpdateOne({'task_id': task_id}, {'$set': task_updates})
+                for task_id, task_updates in updates.items()
+            ], ordered=False)
+            return result.matched_count
     
-    def get_user_tasks(self, user_id: str) -> list:
-        """Get all tasks for user"""
+    @instrument_db
+    def get_user_tasks(self, user_id: str, fields: list = None) -> list:
+        """Get all tasks for user, optionally only some fields"""
         if self.use_mock:
-            return mock_db.get_user_tasks(user_id)
+            return mock_db.get_user_tasks(user_id, fields)
         else:
-            return list(self.db.tasks.find({'user_id': user_id}))
+            return list(self.db.tasks.find({'user_id': user_id}, self._projection(fields)))
     
+    @instrument_db
     def create_reflection(self, reflection_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create reflection in database"""
         if self.use_mock:
             return mock_db.create_reflection(reflection_data)
         else:
-            reflection_data['created_at'] = datetime.utcnow()
+            reflection_data['created_at'] = clock.utcnow()
             result = self.db.reflections.insert_one(reflection_data)
             reflection_data['_id'] = str(result.inserted_id)
             return reflection_data
     
-    def get_user_reflections(self, user_id: str) -> list:
-        """Get all reflections for user"""
+    @instrument_db
+    def get_user_reflections(self, user_id: str, fields: list = None) -> list:
+        """Get all reflections for user, optionally only some fields"""
         if self.use_mock:
-            return mock_db.get_user_reflections(user_id)
+            return mock_db.get_user_reflections(user_id, fields)
         else:
-            return list(self.db.reflections.find({'user_id': user_id}))
+            return list(self.db.reflections.find({'user_id': user_id}, self._projection(fields)))
     
+    @instrument_db
+    def get_reflection(self, reflection_id: str, fields: list = None) -> Optional[Dict[str, Any]]:
+        """Get reflection by ID, optionally only some fields"""
+        if self.use_mock:
+            return mock_db.get_reflection(reflection_id, fields)
+        else:
+            return self.db.reflections.find_one({'reflection_id': reflection_id}, self._projection(fields))
+    
+    @instrument_db
+    def get_reflections(self, reflection_ids: list) -> list:
+        """Get several reflections by ID in one round trip"""
+        if self.use_mock:
+            return mock_db.get_reflections(reflection_ids)
+        else:
+            return list(self.db.reflections.find({'reflection_id': {'$in': list(reflection_ids)}}, {'_id': 0}))
+    
+    @instrument_db
+    def get_reflections_for_users(self, user_ids: list) -> Dict[str, list]:
+        """Get reflections for several users in one round trip, grouped by user"""
+        if self.use_mock:
+            return mock_db.get_reflections_for_users(user_ids)
+        else:
+            grouped = {user_id: [] for user_id in user_ids}
+            for reflection in self.db.reflections.find({'user_id': {'$in': list(user_ids)}}, {'_id': 0}):
+                grouped[reflection['user_id']].append(reflection)
+            return grouped
+    
+    @instrument_db
+    def update_reflection_scores(self, scores: Dict[str, float]) -> int:
+        """Set anti_cheat_score on many reflections in one round trip"""
+        if not scores:
+            return 0
+        if self.use_mock:
+            return mock_db.update_reflection_scores(scores)
+        else:
+            from pymongo import UpdateOne
+            result = self.db.reflections.bulk_write([
+                UpdateOne({'reflection_id': reflection_id}, {'$set': {'anti_cheat_score': score}})
+                for reflection_id, score in scores.items()
+            ], ordered=False)
+            return result.modified_count
+    
+    def iter_reflections(self, fields: list = None):
+        """Stream every reflection, optionally only some fields"""
+        if self.use_mock:
+            return mock_db.iter_reflections(fields)
+        else:
+            projection = {field: 1 for field in fields} if fields else {}
+            projection['_id'] = 0
+            return self.db.reflections.find({}, projection, batch_size=1000)
+    
+    @instrument_db
     def create_progress(self, progress_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create progress record"""
         if self.use_mock:
             return mock_db.create_progress(progress_data)
         else:
-            progress_data['created_at'] = datetime.utcnow()
-            progress_data['updated_at'] = datetime.utcnow()
+            progress_data['created_at'] = clock.utcnow()
+            progress_data['updated_at'] = clock.utcnow()
             result = self.db.progress.insert_one(progress_data)
             progress_data['_id'] = str(result.inserted_id)
             return progress_data
     
+    @instrument_db
     def get_progress(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get progress for user"""
         if self.use_mock:
-            return mock_db.get_progress(user_id)
+            progress = mock_db.get_progress(user_id)
         else:
-            return self.db.progress.find_one({'user_id': user_id})
+            progress = self.db.progress.find_one({'user_id': user_id}, {'_id': 0})
+        return self.write_behind.overlay('progress', user_id, progress) if self.write_behind else progress
     
+    @instrument_db
     def update_progress(self, user_id: str, updates: Dict[str, Any]) -> bool:
-        """Update progress data"""
+        """Update progress data (with write-behind on, True once the write is queued for existing progress)"""
+        if self.write_behind:
+            return self._write_behind('progress', {user_id: updates}) > 0
         if self.use_mock:
             return mock_db.update_progress(user_id, updates)
         else:
-            updates['updated_at'] = datetime.utcnow()
+            updates['updated_at'] = clock.utcnow()
             result = self.db.progress.update_one(
                 {'user_id': user_id}, 
                 {'$set': updates}
             )
             return result.modified_count > 0
+    
+    @instrument_db
+    def get_progress_for_users(self, user_ids: list) -> Dict[str, Dict[str, Any]]:
+        """Get progress for several users in one round trip, keyed by user"""
+        if self.use_mock:
+            found = mock_db.get_progress_for_users(user_ids)
+        else:
+            found = {progress['user_id']: progress
+                     for progress in self.db.progress.find({'user_id': {'$in': list(user_ids)}}, {'_id': 0})}
+        if self.write_behind:
+            return {user_id: self.write_behind.overlay('progress', user_id, progress) for user_id, progress in found.items()}
+        return found
+    
+    def update_progress_for_users(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Apply per-user progress updates in one round trip"""
+        if self.write_behind:
+            return self._write_behind('progress', updates)
+        return self.bulk_set('progress', updates)
+    
+    @instrument_db
+    def award_achievements(self, user_id: str, achievement_ids: list) -> bool:
+        """Idempotently add achievements to a user's progress"""
+        if not achievement_ids:
+            return False
+        if self.use_mock:
+            return mock_db.award_achievements(user_id, achievement_ids)
+        else:
+            result = self.db.progress.update_one(
+                {'user_id': user_id},
+                {'$addToSet': {'achievements': {'$each': list(achievement_ids)}},
+                 '$set': {'updated_at': clock.utcnow()}}
+            )
+            return result.modified_count > 0
+    
+    @instrument_db
+    def get_activity(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get activity calendar for user"""
+        if self.use_mock:
+            return mock_db.get_activity(user_id)
+        else:
+            return self.db.activity.find_one({'user_id': user_id}, {'_id': 0})
+    
+    @instrument_db
+    def save_activity(self, user_id: str, activity_data: Dict[str, Any]) -> bool:
+        """Create or replace activity calendar for user"""
+        if self.use_mock:
+            return mock_db.save_activity(user_id, activity_data)
+        else:
+            result = self.db.activity.replace_one(
+                {'user_id': user_id},
+                activity_data,
+                upsert=True
+            )
+            return result.acknowledged
+    
+    def _projection(self, fields: list = None) -> Dict[str, int]:
+        """Mongo projection for the given fields; `_id` is never returned"""
+        projection = {field: 1 for field in fields} if fields else {}
+        projection['_id'] = 0
+        return projection
+    
+    def _write_behind(self, collection: str, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Queue per-user updates on the write-behind buffer; returns records queued.
+        
+        Like a direct update, records that do not exist are not written. Only
+        users with nothing queued yet are looked up, so a burst of updates to
+        one user costs one existence check.
+        """
+        existing = {user_id for user_id in updates if self.write_behind.is_pending(collection, user_id)}
+        unknown = [user_id for user_id in updates if user_id not in existing]
+        if unknown:
+            existing |= self._existing_user_ids(collection, unknown)
+        now = clock.utcnow()
+        for user_id in existing:
+            self.write_behind.set(collection, user_id, {**updates[user_id], 'updated_at': now})
+        return len(existing)
+    
+    def _existing_user_ids(self, collection: str, user_ids: list) -> set:
+        """Which of the users have a record in users or progress"""
+        if self.use_mock:
+            if collection == 'users':
+                return {user_id for user_id in user_ids if user_id in mock_db.users}
+            return {user_id for user_id in user_ids if user_id in mock_db.user_progress}
+        else:
+            return {record['user_id'] for record in self.db[collection].find(
+                {'user_id': {'$in': list(user_ids)}}, {'user_id': 1, '_id': 0})}
 
 # Global database instance
 db = DatabaseManager()
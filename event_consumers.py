@@ -0,0 +1,122 @@
+from typing import Dict, Any
+from utils.events import DomainEvent, EventBus, ALL_EVENTS
+from utils.activity_calendar import TASK_COMPLETED
+from utils.search_index import search_index
+from utils.sse_hub import sse_hub
+from services.activity_service import ActivityService
+from services.achievement_engine import ACHIEVEMENT_MESSAGES
+from services.reflection_service import ReflectionService
+from services.reflection_analyzer import journey_feedback_cache
+from services.task_rules_service import TaskRulesService
+from services.task_service import TaskService
+
+class EventAnalytics:
+    """Counts domain events per type and per day"""
+
+    def __init__(self):
+        self.totals = {}
+        self.daily = {}
+
+    def record(self, event: DomainEvent):
+        """Record one event occurrence"""
+        day = event.occurred_at.strftime('%Y-%m-%d')
+        self.totals[event.event_type] = self.totals.get(event.event_type, 0) + 1
+        day_counts = self.daily.setdefault(day, {})
+        day_counts[event.event_type] = day_counts.get(event.event_type, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Get event counts"""
+        return {'totals': dict(self.totals), 'daily': {day: dict(counts) for day, counts in self.daily.items()}}
+
+# Global analytics consumer instance
+event_analytics = EventAnalytics()
+
+def register_consumers(bus: EventBus, db, reminders=None):
+    """Register the default side-effect consumers on the event bus (reminders: optional ReminderScheduler)"""
+    reflection_service = ReflectionService(db)
+    activity_service = ActivityService(db)
+    task_rules = TaskRulesService(db)
+    task_service = TaskService(db)
+
+    def update_progress(event: DomainEvent):
+        """Update user progress after a reflection is stored"""
+        reflection_service.update_user_progress(
+            event.payload['user_id'],
+            event.payload.get('word_count', 0),
+            event_id=event.event_id
+        )
+
+    def advance_journey(event: DomainEvent):
+        """Move the user to the day after the completed task"""
+        task_service.advance_journey(event.payload['user_id'], event.payload['day_number'])
+
+    def award_achievements(event: DomainEvent):
+        """Award achievements earned by the new progress metrics"""
+        payload = event.payload
+        awarded = reflection_service.award_achievements(payload['user_id'], payload['metrics'], payload.get('previous'))
+        if awarded:
+            bus.publish('achievements_awarded', {'user_id': payload['user_id'], 'achievement_ids': awarded})
+
+    def notify_achievements(event: DomainEvent):
+        """Tell the user's open tabs about new achievements"""
+        user_id = event.payload['user_id']
+        if not sse_hub.has_listeners(user_id):
+            return
+        for achievement_id in event.payload['achievement_ids']:
+            sse_hub.publish(user_id, 'notification', {
+                'type': 'achievement',
+                'achievement_id': achievement_id,
+                'message': ACHIEVEMENT_MESSAGES.get(achievement_id, "New achievement unlocked!")
+            })
+
+    def record_task_activity(event: DomainEvent):
+        """Mark the task-completed bit in the activity calendar"""
+        activity_service.record(event.payload['user_id'], TASK_COMPLETED, event.occurred_at)
+
+    def index_reflection(event: DomainEvent):
+        """Add a stored reflection to the full-text search index"""
+        reflection = db.get_reflection(event.payload['reflection_id'])
+        if reflection:
+            search_index.add(reflection)
+
+    def unlock_next_day(event: DomainEvent):
+        """Record today's reflection on the precomputed task-lock state"""
+        task_rules.record_reflection(event.payload['user_id'])
+
+    def push_task_state(event: DomainEvent):
+        """Send the new task state to the user's open tabs and arm the unlock event"""
+        user_id = event.payload['user_id']
+        if not sse_hub.has_listeners(user_id):
+            return
+        user = db.get_user(user_id)
+        if not user:
+            return
+        for pushed in task_rules.push_events(user):
+            if len(pushed) == 3:
+                sse_hub.publish_later(user_id, pushed[2], pushed[0], pushed[1])
+            else:
+                sse_hub.publish(user_id, *pushed)
+
+    def schedule_reminder(event: DomainEvent):
+        """Keep the user's daily reminder at their preferred time"""
+        reminders.schedule(event.payload['user_id'], event.payload.get('preferred_time'))
+
+    def invalidate_journey_feedback(event: DomainEvent):
+        """Drop cached journey feedback once a user has new reflections"""
+        journey_feedback_cache.pop(event.payload['user_id'])
+
+    bus.subscribe('reflection_submitted', update_progress, name='progress')
+    bus.subscribe('reflection_submitted', index_reflection, name='search')
+    bus.subscribe('reflection_submitted', invalidate_journey_feedback, name='journey_feedback')
+    bus.subscribe('reflection_submitted', unlock_next_day, name='task_lock')
+    bus.subscribe('progress_updated', award_achievements, name='achievements')
+    bus.subscribe('achievements_awarded', notify_achievements, name='notifications')
+    bus.subscribe('task_completed', advance_journey, name='journey')
+    bus.subscribe('task_completed', record_task_activity, name='activity')
+    # After task_lock, so reflections push the state it just recorded
+    for event_type in ('task_generated', 'task_completed', 'reflection_submitted'):
+        bus.subscribe(event_type, push_task_state, name='push')
+    if reminders is not None:
+        bus.subscribe('user_created', schedule_reminder, name='reminders')
+        bus.subscribe('user_updated', schedule_reminder, name='reminders')
+    bus.subscribe(ALL_EVENTS, event_analytics.record, name='analytics')
@@ -0,0 +1,165 @@
+import atexit
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, Any, List, Callable, Optional, Tuple
+from config import Config
+from utils.clock import clock
+
+ALL_EVENTS = '*'
+
+class DomainEvent:
+    """Domain event emitted after a user action"""
+
+    def __init__(self, event_type: str, payload: Dict[str, Any], event_id: Optional[str] = None):
+        self.event_id = event_id or uuid.uuid4().hex
+        self.event_type = event_type
+        self.payload = payload
+        self.occurred_at = clock.utcnow()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert event to dictionary"""
+        return {
+            'event_id': self.event_id,
+            'event_type': self.event_type,
+            'payload': self.payload,
+            'occurred_at': self.occurred_at.isoformat()
+        }
+
+class EventBus:
+    """In-process event bus with a batched, non-blocking dispatcher.
+
+    Publishing only appends to a queue; consumers run on a background thread.
+    Delivery is at-least-once per consumer: a failing consumer is retried on
+    its own (other consumers are not re-run) until EVENT_MAX_ATTEMPTS, after
+    which the delivery is kept in `dead_letters`. Retries back off
+    exponentially from EVENT_RETRY_DELAY, so a consumer whose dependency is
+    down is not hammered; `flush()` delivers them without waiting. Consumers
+    should therefore be idempotent on `event.event_id`.
+    """
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None, max_attempts: int = None,
+                 retry_delay: float = None):
+        self.batch_size = batch_size or Config.EVENT_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.EVENT_FLUSH_INTERVAL
+        self.max_attempts = max_attempts or Config.EVENT_MAX_ATTEMPTS
+        self.retry_delay = retry_delay if retry_delay is not None else Config.EVENT_RETRY_DELAY
+        self.consumers: Dict[str, List[Tuple[str, Callable[[DomainEvent], Any]]]] = {}
+        self.dead_letters = deque(maxlen=1000)
+        self.stats = {'published': 0, 'delivered': 0, 'retried': 0, 'failed': 0}
+        # Queue items are (event, consumer_name, attempt); consumer_name None means fan-out
+        self._queue = deque()
+        # Retries waiting out their backoff: (due, sequence, queue item)
+        self._delayed = []
+        self._sequence = itertools.count()
+        self._wakeup = threading.Event()
+        self._dispatch_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def subscribe(self, event_type: str, handler: Callable[[DomainEvent], Any], name: str = None):
+        """Register a consumer for an event type ('*' for all events)"""
+        name = name or getattr(handler, '__name__', repr(handler))
+        self.consumers.setdefault(event_type, []).append((name, handler))
+
+    def publish(self, event_type: str, payload: Dict[str, Any]) -> DomainEvent:
+        """Queue an event for delivery without blocking the caller"""
+        event = DomainEvent(event_type, payload)
+        self._queue.append((event, None, 1))
+        self.stats['published'] += 1
+        if self._running and len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return event
+
+    def pending(self) -> int:
+        """Number of deliveries waiting to be dispatched (including retries backing off)"""
+        return len(self._queue) + len(self._delayed)
+
+    def start(self):
+        """Start the background dispatcher thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='event-bus', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the dispatcher and deliver anything still queued"""
+        if self._running:
+            self._running = False
+            self._wakeup.set()
+            if self._thread:
+                self._thread.join(timeout)
+        self.flush()
+
+    def flush(self) -> int:
+        """Synchronously dispatch every queued event and retry, returning deliveries made"""
+        delivered = 0
+        while self._queue or self._delayed:
+            self._release_retries(force=True)
+            delivered += self._dispatch_batch()
+        return delivered
+
+    def _run(self):
+        """Dispatcher loop: wake on interval or when a batch is full"""
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._release_retries()
+            while self._queue:
+                self._dispatch_batch()
+
+    def _release_retries(self, force: bool = False):
+        """Move retries whose backoff has passed (all of them with force) back onto the queue"""
+        with self._dispatch_lock:
+            now = time.monotonic()
+            while self._delayed and (force or self._delayed[0][0] <= now):
+                self._queue.append(heapq.heappop(self._delayed)[2])
+
+    def _dispatch_batch(self) -> int:
+        """Deliver up to one batch of queued events"""
+        with self._dispatch_lock:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+
+            delivered = 0
+            for event, consumer_name, attempt in batch:
+                for name, handler in self._consumers_for(event.event_type, consumer_name):
+                    try:
+                        handler(event)
+                        delivered += 1
+                    except Exception as e:
+                        self._retry(event, name, attempt, e)
+
+            self.stats['delivered'] += delivered
+            return delivered
+
+    def _consumers_for(self, event_type: str, consumer_name: Optional[str]) -> List[Tuple[str, Callable]]:
+        """Resolve the consumers a queued delivery targets"""
+        consumers = self.consumers.get(event_type, []) + self.consumers.get(ALL_EVENTS, [])
+        if consumer_name is None:
+            return consumers
+        return [consumer for consumer in consumers if consumer[0] == consumer_name]
+
+    def _retry(self, event: DomainEvent, consumer_name: str, attempt: int, error: Exception):
+        """Schedule a failed delivery for one consumer after a backoff, or dead-letter it"""
+        if attempt < self.max_attempts:
+            self.stats['retried'] += 1
+            due = time.monotonic() + self.retry_delay * 2 ** (attempt - 1)
+            heapq.heappush(self._delayed, (due, next(self._sequence), (event, consumer_name, attempt + 1)))
+        else:
+            self.stats['failed'] += 1
+            self.dead_letters.append({
+                'event': event.to_dict(),
+                'consumer': consumer_name,
+                'error': str(error)
+            })
+            print(f"❌ Event {event.event_type} failed for consumer {consumer_name}: {error}")
+
+# Global event bus instance
+event_bus = EventBus()
@@ -0,0 +1,46 @@
+import re
+from typing import Any, Dict, List, Optional
+from utils.http_cache import VERSION_FIELDS, MODIFIED_FIELDS
+from utils.validators import PRIVATE_USER_FIELDS
+
+FIELD_NAME = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
+
+# Never returned, whatever is asked for
+HIDDEN_FIELDS = set(PRIVATE_USER_FIELDS)
+
+# Always returned so clients can tell records apart
+ID_FIELDS = {
+    'user': 'user_id',
+    'task': 'task_id',
+    'reflection': 'reflection_id',
+}
+
+def parse_fields(raw: Optional[str]) -> tuple[bool, str, Optional[List[str]]]:
+    """Parse a `fields=a,b,c` parameter; None means the full document"""
+    if raw is None or not raw.strip():
+        return True, "", None
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    invalid = [name for name in fields if not FIELD_NAME.match(name) or name in HIDDEN_FIELDS]
+    if invalid:
+        return False, f"Invalid or unavailable fields: {', '.join(invalid)}", None
+    return True, "", fields
+
+def projection_for(kind: str, fields: Optional[List[str]]) -> Optional[List[str]]:
+    """Fields to read from the store: the requested ones plus the ID and cache validators"""
+    if fields is None:
+        return None
+    extra = [ID_FIELDS[kind], *VERSION_FIELDS.get(kind, ()), *MODIFIED_FIELDS.get(kind, ())]
+    return list(dict.fromkeys([*fields, *extra]))
+
+def select_fields(kind: str, records: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Trim records to the requested fields (plus the ID), or to everything but the hidden fields"""
+    if fields is None:
+        return [without_hidden(record) for record in records]
+    wanted = [name for name in dict.fromkeys([ID_FIELDS[kind], *fields]) if name not in HIDDEN_FIELDS]
+    return [{name: record[name] for name in wanted if name in record} for record in records]
+
+def without_hidden(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The record minus hidden fields (the record itself when it has none)"""
+    if HIDDEN_FIELDS.isdisjoint(record):
+        return record
+    return {name: value for name, value in record.items() if name not in HIDDEN_FIELDS}
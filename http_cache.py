@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Optional
+from flask import request
+from werkzeug.http import http_date, unquote_etag
+from utils.cache import content_hash
+from utils.metrics import metrics
+
+# Cache-Control per resource type. Everything here is one user's data, so
+# shared caches must not store it. Mutable records are revalidated on every
+# use, which the validators below make cheap; a reflection only changes
+# when it is rescored, so browsers may reuse it for a few minutes.
+CACHE_POLICIES = {
+    'user': 'private, no-cache',
+    'task': 'private, no-cache',
+    'task_list': 'private, no-cache',
+    'reflection': 'private, max-age=300',
+    'reflection_list': 'private, no-cache',
+}
+
+# Fields that change whenever a record does: ETags hash these, not the response body
+VERSION_FIELDS = {
+    'user': ('user_id', 'updated_at', 'current_day'),
+    'task': ('task_id', 'completed', 'completed_at', 'response_at'),
+    'reflection': ('reflection_id', 'anti_cheat_score', 'near_duplicate_of'),
+}
+
+# Timestamp fields that bound a record's last change (reflections have none: rescoring keeps created_at)
+MODIFIED_FIELDS = {
+    'user': ('updated_at',),
+    'task': ('generated_at', 'completed_at', 'response_at'),
+}
+
+def entity_tag(kind: str, records: Iterable[Dict[str, Any]], variant: Optional[Iterable[str]] = None) -> str:
+    """Weak ETag over the version fields of one or more records.
+
+    Weak because responses also carry a per-request timestamp, so two 200s
+    with the same tag are equivalent rather than byte-identical. A variant
+    (the requested field list) gets its own tag, so a trimmed response is
+    never validated against the full one.
+    """
+    fields = VERSION_FIELDS[kind]
+    parts = [str(record.get(field)) for record in records for field in fields]
+    if variant is not None:
+        parts.insert(0, ','.join(variant))
+    return f'W/"{content_hash(kind, *parts).hex()}"'
+
+def last_modified(kind: str, records: Iterable[Dict[str, Any]]) -> Optional[datetime]:
+    """Latest change time of the records, if the kind has reliable timestamps"""
+    fields = MODIFIED_FIELDS.get(kind)
+    if not fields:
+        return None
+    latest = None
+    for record in records:
+        for field in fields:
+            value = _as_datetime(record.get(field))
+            if value is not None and (latest is None or value > latest):
+                latest = value
+    return latest
+
+def is_not_modified(etag: str, modified: Optional[datetime] = None) -> bool:
+    """Whether the client's copy is current (If-None-Match wins over If-Modified-Since)"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(unquote_etag(etag)[0])
+    since = request.if_modified_since
+    if since is None or modified is None:
+        return False
+    return modified.replace(microsecond=0) <= since.replace(tzinfo=None)
+
+def cache_headers(resource: str, etag: str, modified: Optional[datetime] = None) -> Dict[str, str]:
+    """ETag, Last-Modified and Cache-Control headers for a resource"""
+    headers = {'ETag': etag, 'Cache-Control': CACHE_POLICIES.get(resource, 'private, no-cache')}
+    if modified is not None:
+        headers['Last-Modified'] = http_date(modified.replace(tzinfo=timezone.utc))
+    return headers
+
+def conditional_response(resource: str, kind: str, records: list, build: Callable[[], Dict[str, Any]],
+                         variant: Optional[Iterable[str]] = None):
+    """Return 304 when the client's validators match, else build the body.
+
+    `build` only runs for a 200, so an unchanged resource costs a validator
+    comparison instead of serialising the whole response.
+    """
+    etag = entity_tag(kind, records, variant)
+    modified = last_modified(kind, records)
+    headers = cache_headers(resource, etag, modified)
+    if is_not_modified(etag, modified):
+        metrics.inc('clearnext_http_not_modified_total', (('resource', resource),))
+        return '', 304, headers
+    return build(), 200, headers
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    """Naive UTC datetime from a stored datetime or ISO string"""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None) if value.tzinfo is None else value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, str):
+        try:
+            return _as_datetime(datetime.fromisoformat(value))
+        except ValueError:
+            return None
+    return None
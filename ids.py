@@ -0,0 +1,83 @@
+import os
+import threading
+from typing import List
+from utils.clock import clock
+
+# Crockford base32: no I, L, O or U, so IDs stay readable and sort lexicographically
+ENCODING = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+RANDOM_BITS = 80
+RANDOM_MAX = (1 << RANDOM_BITS) - 1
+# Two base32 characters per 10-bit chunk, so an ID is 13 table lookups
+_PAIRS = [ENCODING[i >> 5] + ENCODING[i & 31] for i in range(1024)]
+
+class IdGenerator:
+    """ULID-style generator: 48-bit millisecond timestamp + 80 random bits.
+
+    IDs are 26 base32 characters that sort by creation time, so inserts land
+    at the right edge of an index and time ranges are prefix scans. The random
+    part makes IDs unique across processes without coordination; within one
+    process, IDs minted in the same millisecond increment the random part so
+    they stay strictly increasing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new_id(self, prefix: str = '') -> str:
+        """Get one ID, optionally as '<prefix>_<ulid>'"""
+        return self._with_prefix(prefix, self._encode(*self._next()))
+
+    def bulk(self, count: int, prefix: str = '') -> List[str]:
+        """Get `count` increasing IDs with a single lock acquisition"""
+        if count <= 0:
+            return []
+        with self._lock:
+            ms, random = self._advance()
+            values = [(ms, random)]
+            for _ in range(count - 1):
+                ms, random = self._bump(ms, random)
+                values.append((ms, random))
+            self._last_ms, self._last_random = ms, random
+        return [self._with_prefix(prefix, self._encode(ms, random)) for ms, random in values]
+
+    def _next(self) -> tuple:
+        """Reserve the next (timestamp, random) pair"""
+        with self._lock:
+            self._last_ms, self._last_random = self._advance()
+            return self._last_ms, self._last_random
+
+    def _advance(self) -> tuple:
+        """Pick a fresh random part for a new millisecond, or increment within the same one"""
+        ms = int(clock.timestamp() * 1000)
+        if ms > self._last_ms:
+            return ms, int.from_bytes(os.urandom(10), 'big')
+        # Same millisecond, or the clock went backwards: keep counting from the last ID
+        return self._bump(self._last_ms, self._last_random)
+
+    @staticmethod
+    def _bump(ms: int, random: int) -> tuple:
+        """Next value after (ms, random), carrying into the timestamp on overflow"""
+        return (ms, random + 1) if random < RANDOM_MAX else (ms + 1, 0)
+
+    @staticmethod
+    def _encode(ms: int, random: int) -> str:
+        """Encode the 128-bit value as 26 base32 characters"""
+        value = (ms << RANDOM_BITS) | random
+        return ''.join([_PAIRS[value >> shift & 1023] for shift in range(120, -1, -10)])
+
+    @staticmethod
+    def _with_prefix(prefix: str, ulid: str) -> str:
+        return f"{prefix}_{ulid}" if prefix else ulid
+
+def id_timestamp(entity_id: str) -> float:
+    """Get the creation time (seconds since the epoch) encoded in an ID"""
+    ulid = entity_id.rsplit('_', 1)[-1]
+    ms = 0
+    for char in ulid[:10]:
+        ms = ms * 32 + ENCODING.index(char)
+    return ms / 1000
+
+# Global ID generator instance
+ids = IdGenerator()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+ClearNext Load Driver
+Replays full student journeys against the API and reports per-endpoint latency
+
+Usage:
+    python load_test.py --users 500 --concurrency 16            # in-process Flask test client, mock DB
+    python load_test.py --url http://localhost:5000 --users 200  # real HTTP against a running server
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+STEPS = ['create_guest', 'today_task', 'complete_task', 'submit_reflection', 'analytics']
+
+REFLECTION_SAMPLES = [
+    ("I learned how to break a big topic into smaller study blocks",
+     "I felt focused at first and a little tired by the end",
+     "Tomorrow I will start earlier and take short breaks"),
+    ("Researching career paths showed me which skills I am missing",
+     "I feel more confident because I have a clearer plan now",
+     "I want to talk to someone working in the field next week"),
+]
+
+class TestClientTransport:
+    """Sends requests through the in-process Flask test client"""
+
+    def __init__(self):
+        os.environ['USE_MOCK_DB'] = 'true'
+        os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')  # every simulated student shares one client IP
+        os.environ.setdefault('REMINDERS_ENABLED', 'false')
+        os.environ.setdefault('SSE_ENABLED', 'false')  # in-process: never bind the live-events port
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body: dict = None) -> tuple:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True) or {}
+
+class HttpTransport:
+    """Sends requests to a running server over HTTP"""
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body: dict = None) -> tuple:
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            return e.code, {}
+
+class LoadStats:
+    """Thread-safe latency samples per step"""
+
+    def __init__(self):
+        self.samples = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self._lock = threading.Lock()
+
+    def record(self, step: str, duration: float, ok: bool):
+        with self._lock:
+            self.samples[step].append(duration)
+            if not ok:
+                self.errors[step] += 1
+
+    def report(self, elapsed: float) -> dict:
+        """Summarise throughput and percentiles per step"""
+        report = {}
+        for step in STEPS:
+            samples = sorted(self.samples[step])
+            if not samples:
+                continue
+            report[step] = {
+                'requests': len(samples),
+                'errors': self.errors[step],
+                'throughput_rps': round(len(samples) / elapsed, 1),
+                'p50_ms': round(percentile(samples, 50) * 1000, 2),
+                'p95_ms': round(percentile(samples, 95) * 1000, 2),
+                'p99_ms': round(percentile(samples, 99) * 1000, 2)
+            }
+        return report
+
+def percentile(sorted_samples: list, pct: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    index = max(0, min(len(sorted_samples) - 1, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+def run_journey(transport, stats: LoadStats, index: int, rng: random.Random):
+    """Drive one student through guest creation, task, reflection and analytics"""
+
+    def call(step, method, path, body=None):
+        started = time.perf_counter()
+        try:
+            status, payload = transport.request(method, path, body)
+        except Exception:
+            status, payload = 599, {}
+        ok = 200 <= status < 300
+        stats.record(step, time.perf_counter() - started, ok)
+        return payload.get('data') if ok else None
+
+    data = call('create_guest', 'POST', '/api/users/guest', {
+        'name': f"Load Student {index}",
+        'status': rng.choice(['Student', 'Professional']),
+        'confusion_area': rng.choice(['Career', 'Learning']),
+        'struggle_type': rng.choice(['Motivation', 'Time', 'Concepts']),
+        'journey_days': rng.choice([7, 14, 21])
+    })
+    if not data:
+        return
+    user_id = data['user']['user_id']
+
+    data = call('today_task', 'GET', f"/api/tasks/today/{user_id}")
+    task = data and data.get('task')
+    if not task:
+        return
+
+    call('complete_task', 'POST', f"/api/tasks/{task['task_id']}/complete", {'response': 'Done'})
+
+    learning, feeling, improvement = rng.choice(REFLECTION_SAMPLES)
+    call('submit_reflection', 'POST', '/api/reflections/', {
+        'user_id': user_id,
+        'task_id': task['task_id'],
+        'day_number': task['day_number'],
+        'learning': learning,
+        'feeling': feeling,
+        'improvement': improvement,
+        'mood_after': rng.choice(['low', 'okay', 'good']),
+        'honesty_confirmed': True
+    })
+
+    call('analytics', 'GET', f"/api/reflections/analytics/{user_id}")
+
+def main():
+    """Main load test function"""
+    parser = argparse.ArgumentParser(description='ClearNext load driver')
+    parser.add_argument('--users', type=int, default=200, help='Number of journeys to run')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent journeys')
+    parser.add_argument('--url', help='Base URL of a running server (default: in-process test client)')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Optional JSON report path')
+    args = parser.parse_args()
+
+    transport = HttpTransport(args.url) if args.url else TestClientTransport()
+    stats = LoadStats()
+
+    print("🏋️ ClearNext Load Test")
+    print("=" * 40)
+    print(f"🎯 Target: {args.url or 'in-process test client (mock DB)'}")
+    print(f"👥 Journeys: {args.users}  🔀 Concurrency: {args.concurrency}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(run_journey, transport, stats, i, random.Random(args.seed + i))
+                   for i in range(args.users)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    report = stats.report(elapsed)
+    print("=" * 40)
+    print(f"{'step':<20}{'reqs':>7}{'errs':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step, row in report.items():
+        print(f"{step:<20}{row['requests']:>7}{row['errors']:>6}{row['throughput_rps']:>9}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    print(f"⏱️ {args.users} journeys in {elapsed:.2f}s ({args.users / elapsed:.1f} journeys/s)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'elapsed_seconds': round(elapsed, 3), 'journeys': args.users,
+                       'concurrency': args.concurrency, 'steps': report}, f, indent=2)
+        print(f"💾 Report saved to {args.output}")
+
+    if any(row['errors'] for row in report.values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
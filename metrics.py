@@ -0,0 +1,203 @@
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Dict, Callable, Tuple
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRIC_HELP = {
+    'clearnext_http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint'),
+    'clearnext_http_requests_total': ('counter', 'HTTP requests by endpoint and status'),
+    'clearnext_http_errors_total': ('counter', 'HTTP responses with status >= 500'),
+    'clearnext_db_call_duration_seconds': ('histogram', 'Database call latency by backend and method'),
+    'clearnext_db_calls_per_request': ('histogram', 'Database calls made while serving one request'),
+    'clearnext_db_time_per_request_seconds': ('histogram', 'Database time spent while serving one request'),
+    'clearnext_db_errors_total': ('counter', 'Database calls that raised'),
+    'clearnext_cache_requests_total': ('counter', 'Cache lookups by cache and result'),
+    'clearnext_cache_hit_ratio': ('gauge', 'Cache hit ratio since process start'),
+    'clearnext_http_not_modified_total': ('counter', 'Conditional GETs answered with 304 by resource'),
+    'clearnext_http_rejected_total': ('counter', 'Requests rejected by rate limits (429) or load shedding (503)'),
+    'clearnext_dashboard_section_seconds': ('histogram', 'Time to build each dashboard section'),
+    'clearnext_dashboard_sections_total': ('counter', 'Dashboard sections by outcome (ok, timeout, error)'),
+    'clearnext_admission_wait_seconds': ('histogram', 'Time spent waiting for a concurrency slot'),
+    'clearnext_sse_dropped_total': ('counter', 'Live event connections closed for not keeping up'),
+    'clearnext_reminders_total': ('counter', 'Daily reminders handed to each sink by outcome'),
+    'clearnext_write_behind_flush_seconds': ('histogram', 'Time to write one batch of coalesced updates'),
+    'clearnext_ai_request_duration_seconds': ('histogram', 'AI provider call latency'),
+    'clearnext_ai_requests_total': ('counter', 'AI requests by outcome (ok, coalesced, timeout, error, fallback)'),
+}
+
+DB_CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+class Histogram:
+    """Fixed-bucket histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record one observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Process-wide counters and histograms rendered in Prometheus text format"""
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self.gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+        self._lock = threading.Lock()
+        self._request = threading.local()
+
+    def inc(self, name: str, labels: tuple = (), amount: float = 1):
+        """Increment a counter"""
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: tuple = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """Record a histogram observation"""
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], float]):
+        """Register a gauge read at render time"""
+        self.gauges[name] = (help_text, callback)
+
+    def begin_request(self):
+        """Reset per-request DB accounting for the current thread"""
+        self._request.db_calls = 0
+        self._request.db_time = 0.0
+        self._request.active = True
+
+    def end_request(self, endpoint: str, method: str, status: int, duration: float):
+        """Record request latency, status and the DB work it did"""
+        labels = (('endpoint', endpoint), ('method', method))
+        self.observe('clearnext_http_request_duration_seconds', duration, labels)
+        self.inc('clearnext_http_requests_total', labels + (('status', str(status)),))
+        if status >= 500:
+            self.inc('clearnext_http_errors_total', labels)
+
+        if getattr(self._request, 'active', False):
+            self.observe('clearnext_db_calls_per_request', self._request.db_calls, labels, DB_CALL_BUCKETS)
+            self.observe('clearnext_db_time_per_request_seconds', self._request.db_time, labels)
+            self._request.active = False
+
+    def record_db_call(self, backend: str, method: str, duration: float, failed: bool = False):
+        """Record one database call"""
+        labels = (('backend', backend), ('method', method))
+        self.observe('clearnext_db_call_duration_seconds', duration, labels)
+        if failed:
+            self.inc('clearnext_db_errors_total', labels)
+        if getattr(self._request, 'active', False):
+            self._request.db_calls += 1
+            self._request.db_time += duration
+
+    def record_cache(self, cache: str, hit: bool):
+        """Record a cache lookup"""
+        self.inc('clearnext_cache_requests_total', (('cache', cache), ('result', 'hit' if hit else 'miss')))
+
+    def cache_hit_ratios(self) -> Dict[str, float]:
+        """Get hit ratio per cache"""
+        totals = {}
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                if name != 'clearnext_cache_requests_total':
+                    continue
+                label_map = dict(labels)
+                hits, lookups = totals.get(label_map['cache'], (0, 0))
+                if label_map['result'] == 'hit':
+                    hits += value
+                totals[label_map['cache']] = (hits, lookups + value)
+        return {cache: round(hits / lookups, 4) for cache, (hits, lookups) in totals.items() if lookups}
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+        emitted = set()
+
+        def header(name: str):
+            if name not in emitted:
+                metric_type, help_text = METRIC_HELP.get(name, ('untyped', name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                emitted.add(name)
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, (hist.buckets, list(hist.counts), hist.sum, hist.count))
+                for key, hist in self.histograms.items()
+            )
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            header(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for name, (help_text, callback) in sorted(self.gauges.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(callback())}")
+
+        for cache, ratio in sorted(self.cache_hit_ratios().items()):
+            header('clearnext_cache_hit_ratio')
+            lines.append(f"clearnext_cache_hit_ratio{_format_labels((('cache', cache),))} {ratio}")
+
+        return '\n'.join(lines) + '\n'
+
+def _format_labels(labels: tuple) -> str:
+    """Format label pairs as {key="value",...}"""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+def _format_value(value: float) -> str:
+    """Format a sample value"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+def instrument_db(method: Callable) -> Callable:
+    """Time a DatabaseManager method, labelled by backend and method name"""
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        failed = False
+        try:
+            return method(self, *args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            backend = 'mock' if self.use_mock else 'mongodb'
+            metrics.record_db_call(backend, name, time.perf_counter() - started, failed)
+
+    return wrapper
@@ -1,6 +1,9 @@
-from datetime import datetime
+import threading
+from datetime import timedelta
 from typing import Optional, Dict, Any
 from config import Config
+from utils.clock import clock
+from utils.ids import ids
 
 class MockDatabase:
     """In-memory database for testing/development without MongoDB"""
@@ -10,91 +13,237 @@ class MockDatabase:
         self.tasks = {}
         self.reflections = {}
         self.progress = {}
-        self.counters = {
-            'users': 0,
-            'tasks': 0,
-            'reflections': 0,
-            'progress': 0
-        }
-    
-    def get_next_id(self, prefix: str) -> str:
-        """Generate next ID with prefix"""
-        self.counters[prefix] = self.counters.get(prefix, 0) + 1
-        return f"{prefix}_{self.counters[prefix]}"
+        self.activity = {}
+        self.leases = {}
+        # Secondary indexes: user_id -> record IDs, so per-user reads skip full scans
+        self.user_tasks = {}
+        self.user_reflections = {}
+        self.user_progress = {}
+        self._lock = threading.Lock()  # Makes check-and-set writes atomic across request threads
+    
+    def assign_id(self, record: Dict[str, Any], key: str, prefix: str) -> str:
+        """Keep the ID the caller generated, or mint one if it is missing"""
+        if not record.get(key):
+            record[key] = ids.new_id(prefix)
+        return record[key]
+    
+    def select(self, record: Optional[Dict[str, Any]], fields: list = None) -> Optional[Dict[str, Any]]:
+        """Only the given fields of a record (the record itself when fields is None)"""
+        if record is None or fields is None:
+            return record
+        return {field: record[field] for field in fields if field in record}
     
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new user"""
-        user_id = self.get_next_id('user')
-        user_data['user_id'] = user_id
-        user_data['created_at'] = datetime.utcnow()
-        user_data['updated_at'] = datetime.utcnow()
+        user_id = self.assign_id(user_data, 'user_id', 'GUEST')
+        user_data['created_at'] = clock.utcnow()
+        user_data['updated_at'] = clock.utcnow()
         self.users[user_id] = user_data
         return user_data
     
-    def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+    def get_user(self, user_id: str, fields: list = None) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
-        return self.users.get(user_id)
+        return self.select(self.users.get(user_id), fields)
     
     def update_user(self, user_id: str, updates: Dict[str, Any]) -> bool:
         """Update user data"""
         if user_id in self.users:
             self.users[user_id].update(updates)
-            self.users[user_id]['updated_at'] = datetime.utcnow()
+            self.users[user_id]['updated_at'] = clock.utcnow()
             return True
         return False
     
+    def get_users(self, user_ids: list) -> list:
+        """Get several users by ID"""
+        return [self.users[user_id] for user_id in user_ids if user_id in self.users]
+    
+    def update_users(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Apply per-user updates"""
+        return sum(1 for user_id, user_updates in updates.items() if self.update_user(user_id, user_updates))
+    
+    def iter_users(self, fields: list = None):
+        """Stream every user, optionally only some fields"""
+        for user in list(self.users.values()):
+            yield {field: user.get(field) for field in fields} if fields else user
+    
+    def iter_users_updated_since(self, since, fields: list = None):
+        """Stream users changed at or after a time, optionally only some fields"""
+        for user in list(self.users.values()):
+            if user.get('updated_at') and user['updated_at'] >= since:
+                yield {field: user.get(field) for field in fields} if fields else user
+    
+    def acquire_lease(self, name: str, owner: str, ttl: float, data: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """Take or renew a named lease; the lease record if the owner holds it, else None"""
+        now = clock.utcnow()
+        lease = self.leases.get(name)
+        if lease and lease['owner'] != owner and lease['expires_at'] >= now:
+            return None
+        lease = self.leases[name] = {**(lease or {}), **(data or {}), 'owner': owner,
+                                     'expires_at': now + timedelta(seconds=ttl)}
+        return dict(lease)
+    
+    def release_lease(self, name: str, owner: str) -> bool:
+        """Give up a lease early so another process can take it"""
+        lease = self.leases.get(name)
+        if not lease or lease['owner'] != owner:
+            return False
+        lease['expires_at'] = clock.utcnow() - timedelta(seconds=1)
+        return True
+    
+    def iter_completed_users(self):
+        """Stream users whose journey is finished"""
+        for user in list(self.users.values()):
+            if user.get('journey_completed') or user.get('current_day', 1) > user.get('journey_days', 7):
+                yield user
+    
     def create_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new task"""
-        task_id = self.get_next_id('task')
-        task_data['task_id'] = task_id
-        task_data['created_at'] = datetime.utcnow()
+        task_id = self.assign_id(task_data, 'task_id', 'task')
+        task_data['created_at'] = clock.utcnow()
         self.tasks[task_id] = task_data
+        self.user_tasks.setdefault(task_data.get('user_id'), []).append(task_id)
         return task_data
     
-    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+    def get_task(self, task_id: str, fields: list = None) -> Optional[Dict[str, Any]]:
         """Get task by ID"""
-        return self.tasks.get(task_id)
+        return self.select(self.tasks.get(task_id), fields)
+    
+    def update_task(self, task_id: str, updates: Dict[str, Any]) -> bool:
+        """Update task data"""
+        if task_id in self.tasks:
+            self.tasks[task_id].update(updates)
+            return True
+        return False
+    
+    def complete_task(self, task_id: str, updates: Dict[str, Any]) -> bool:
+        """Apply a completion unless the task is missing or already completed"""
+        with self._lock:
+            task = self.tasks.get(task_id)
+            if task is None or task.get('completed'):
+                return False
+            task.update(updates)
+            return True
+    
+    def complete_tasks(self, updates: Dict[str, Dict[str, Any]]) -> set:
+        """Apply completions; returns the IDs actually completed"""
+        return {task_id for task_id, task_updates in updates.items() if self.complete_task(task_id, task_updates)}
+    
+    def get_tasks(self, task_ids: list) -> list:
+        """Get several tasks by ID"""
+        return [self.tasks[task_id] for task_id in task_ids if task_id in self.tasks]
     
-    def get_user_tasks(self, user_id: str) -> list:
+    def update_tasks(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Apply per-task updates"""
+        return sum(1 for task_id, task_updates in updates.items() if self.update_task(task_id, task_updates))
+    
+    def get_user_tasks(self, user_id: str, fields: list = None) -> list:
         """Get all tasks for a user"""
-        return [task for task in self.tasks.values() if task.get('user_id') == user_id]
+        return [self.select(self.tasks[task_id], fields) for task_id in self.user_tasks.get(user_id, [])]
     
     def create_reflection(self, reflection_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new reflection"""
-        reflection_id = self.get_next_id('reflection')
-        reflection_data['reflection_id'] = reflection_id
-        reflection_data['created_at'] = datetime.utcnow()
+        reflection_id = self.assign_id(reflection_data, 'reflection_id', 'ref')
+        reflection_data['created_at'] = clock.utcnow()
         self.reflections[reflection_id] = reflection_data
+        self.user_reflections.setdefault(reflection_data.get('user_id'), []).append(reflection_id)
         return reflection_data
     
-    def get_user_reflections(self, user_id: str) -> list:
+    def get_user_reflections(self, user_id: str, fields: list = None) -> list:
         """Get all reflections for a user"""
-        return [ref for ref in self.reflections.values() if ref.get('user_id') == user_id]
+        return [self.select(self.reflections[ref_id], fields) for ref_id in self.user_reflections.get(user_id, [])]
+    
+    def get_reflection(self, reflection_id: str, fields: list = None) -> Optional[Dict[str, Any]]:
+        """Get reflection by ID"""
+        return self.select(self.reflections.get(reflection_id), fields)
+    
+    def get_reflections(self, reflection_ids: list) -> list:
+        """Get several reflections by ID"""
+        return [self.reflections[ref_id] for ref_id in reflection_ids if ref_id in self.reflections]
+    
+    def get_reflections_for_users(self, user_ids: list) -> Dict[str, list]:
+        """Get reflections for several users, grouped by user"""
+        return {user_id: self.get_user_reflections(user_id) for user_id in user_ids}
+    
+    def update_reflection_scores(self, scores: Dict[str, float]) -> int:
+        """Set anti_cheat_score on many reflections"""
+        updated = 0
+        for reflection_id, score in scores.items():
+            if reflection_id in self.reflections:
+                self.reflections[reflection_id]['anti_cheat_score'] = score
+                updated += 1
+        return updated
+    
+    def iter_reflections(self, fields: list = None):
+        """Stream every reflection, optionally only some fields"""
+        for reflection in list(self.reflections.values()):
+            yield {field: reflection.get(field) for field in fields} if fields else reflection
     
     def create_progress(self, progress_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create progress record"""
-        progress_id = self.get_next_id('progress')
-        progress_data['progress_id'] = progress_id
-        progress_data['created_at'] = datetime.utcnow()
-        progress_data['updated_at'] = datetime.utcnow()
+        progress_id = self.assign_id(progress_data, 'progress_id', 'prog')
+        progress_data['created_at'] = clock.utcnow()
+        progress_data['updated_at'] = clock.utcnow()
         self.progress[progress_id] = progress_data
+        self.user_progress[progress_data.get('user_id')] = progress_id
         return progress_data
     
     def get_progress(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get progress for user"""
-        for progress in self.progress.values():
-            if progress.get('user_id') == user_id:
-                return progress
-        return None
+        progress_id = self.user_progress.get(user_id)
+        return self.progress.get(progress_id) if progress_id else None
     
     def update_progress(self, user_id: str, updates: Dict[str, Any]) -> bool:
         """Update progress data"""
-        for progress_id, progress in self.progress.items():
-            if progress.get('user_id') == user_id:
-                progress.update(updates)
-                progress['updated_at'] = datetime.utcnow()
-                return True
+        progress = self.get_progress(user_id)
+        if progress:
+            progress.update(updates)
+            progress['updated_at'] = clock.utcnow()
+            return True
         return False
+    
+    def get_progress_for_users(self, user_ids: list) -> Dict[str, Dict[str, Any]]:
+        """Get progress for several users, keyed by user"""
+        found = {}
+        for user_id in user_ids:
+            progress = self.get_progress(user_id)
+            if progress:
+                found[user_id] = progress
+        return found
+    
+    def update_progress_for_users(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Apply per-user progress updates"""
+        return sum(1 for user_id, progress_updates in updates.items() if self.update_progress(user_id, progress_updates))
+    
+    def award_achievements(self, user_id: str, achievement_ids: list) -> bool:
+        """Add achievements not already awarded to a user's progress"""
+        progress = self.get_progress(user_id)
+        if not progress:
+            return False
+        achievements = progress.setdefault('achievements', [])
+        new_ids = [a for a in achievement_ids if a not in achievements]
+        achievements.extend(new_ids)
+        if new_ids:
+            progress['updated_at'] = clock.utcnow()
+        return bool(new_ids)
+    
+    def get_activity(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get activity calendar for user"""
+        return self.activity.get(user_id)
+    
+    def save_activity(self, user_id: str, activity_data: Dict[str, Any]) -> bool:
+        """Create or replace activity calendar for user"""
+        self.activity[user_id] = activity_data
+        return True
+
+    def reindex(self):
+        """Rebuild secondary indexes after records were loaded directly into the dicts"""
+        self.user_tasks, self.user_reflections, self.user_progress = {}, {}, {}
+        for task_id, task in self.tasks.items():
+            self.user_tasks.setdefault(task.get('user_id'), []).append(task_id)
+        for reflection_id, reflection in self.reflections.items():
+            self.user_reflections.setdefault(reflection.get('user_id'), []).append(reflection_id)
+        for progress_id, progress in self.progress.items():
+            self.user_progress[progress.get('user_id')] = progress_id
 
 # Global mock database instance
 mock_db = MockDatabase()
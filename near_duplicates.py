@@ -0,0 +1,194 @@
+import threading
+import zlib
+from array import array
+from typing import Dict, Any, List, Optional, Iterable, Callable
+from config import Config
+from utils.search_index import TOKEN_PATTERN, SEARCH_FIELDS
+
+BINS = 16          # MinHash values per signature
+BANDS = 4          # LSH bands of BINS // BANDS rows: candidates from ~0.7 Jaccard
+ROWS = BINS // BANDS
+SHINGLE_WORDS = 3
+HASH_MIX = 0x9E3779B1
+
+def shingle_hashes(text: str) -> List[int]:
+    """32-bit hashes of the word 3-shingles of a text (single words for very short texts)"""
+    words = TOKEN_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        shingles = words
+    else:
+        shingles = [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return [(zlib.crc32(shingle.encode()) * HASH_MIX) & 0xFFFFFFFF for shingle in shingles]
+
+def minhash_signature(text: str) -> Optional[tuple]:
+    """One-permutation MinHash: one hash per shingle, split into BINS bins by its top bits.
+
+    Each bin keeps its minimum, so a signature costs one pass over the shingles
+    instead of BINS passes. Empty bins borrow from the next non-empty bin
+    (rotation densification) so short texts still get a full signature.
+    """
+    hashes = shingle_hashes(text)
+    if not hashes:
+        return None
+
+    mins = [None] * BINS
+    for value in hashes:
+        bin_index = value >> 28
+        rest = value & 0x0FFFFFFF
+        if mins[bin_index] is None or rest < mins[bin_index]:
+            mins[bin_index] = rest
+
+    signature = []
+    for i in range(BINS):
+        offset = 0
+        while mins[(i + offset) % BINS] is None:
+            offset += 1
+        # Keep 16 bits per bin; borrowed values are shifted so they only match other borrowed values
+        signature.append(((mins[(i + offset) % BINS] >> 12) + offset * 0x3C6F) & 0xFFFF)
+    return tuple(signature)
+
+def similarity(a: tuple, b) -> float:
+    """Estimated Jaccard similarity: fraction of equal bins"""
+    return sum(1 for x, y in zip(a, b) if x == y) / BINS
+
+class NearDuplicateIndex:
+    """MinHash/LSH index that flags recycled reflection text.
+
+    Signatures are 16 x 16-bit values kept in one flat array (32 bytes per
+    reflection). Each LSH band is a direct-mapped table of 2**table_bits
+    slots holding the latest reflection that hashed there, so memory is fixed
+    however many reflections are stored and a lookup is BANDS array reads
+    plus a signature comparison per candidate. A user's own history is small
+    and is compared in full, so self-recycling is caught even below the LSH
+    threshold; across users, an old reflection can be displaced from a slot
+    by a newer one, trading some recall on old text for bounded memory.
+    """
+
+    def __init__(self, table_bits: int = None, threshold: float = None):
+        self.table_bits = table_bits or Config.NEAR_DUPLICATE_TABLE_BITS
+        self.threshold = threshold if threshold is not None else Config.NEAR_DUPLICATE_THRESHOLD
+        self._mask = (1 << self.table_bits) - 1
+        self._lock = threading.Lock()
+        self.built = False
+        self._building = False
+        self.reflection_ids: List[str] = []
+        self.doc_numbers: Dict[str, int] = {}
+        self.signatures = array('H')
+        self.doc_users = array('I')
+        self.user_numbers: Dict[str, int] = {}
+        self.user_docs: List[array] = []
+        # Slot value is doc number + 1; 0 means empty. Allocated on first use.
+        self.bands: List[array] = []
+
+    def __len__(self) -> int:
+        return len(self.reflection_ids)
+
+    def find(self, signature: tuple, user_id: str = None) -> Optional[Dict[str, Any]]:
+        """Get the most similar stored reflection at or above the threshold, if any"""
+        if not signature:
+            return None
+
+        best_doc, best_similarity = -1, 0.0
+        with self._lock:
+            if not self.bands:
+                return None
+            candidates = set()
+            for band, slot in enumerate(self._slots(signature)):
+                doc = self.bands[band][slot]
+                if doc:
+                    candidates.add(doc - 1)
+
+            user_number = self.user_numbers.get(user_id) if user_id else None
+            if user_number is not None:
+                candidates.update(self.user_docs[user_number])
+
+            signatures = self.signatures
+            for doc in candidates:
+                start = doc * BINS
+                score = similarity(signature, signatures[start:start + BINS])
+                if score > best_similarity:
+                    best_doc, best_similarity = doc, score
+
+            if best_doc < 0 or best_similarity < self.threshold:
+                return None
+            return {
+                'reflection_id': self.reflection_ids[best_doc],
+                'similarity': best_similarity,
+                'own_history': user_number is not None and self.doc_users[best_doc] == user_number
+            }
+
+    def add(self, reflection_id: str, user_id: str, signature: tuple) -> bool:
+        """Store a signature; returns False if the reflection is already indexed or has no text"""
+        if not signature:
+            return False
+        with self._lock:
+            if reflection_id in self.doc_numbers:
+                return False
+            if not self.bands:
+                self.bands = [array('I', bytes(4 << self.table_bits)) for _ in range(BANDS)]
+            doc = len(self.reflection_ids)
+            self.reflection_ids.append(reflection_id)
+            self.doc_numbers[reflection_id] = doc
+            self.signatures.extend(signature)
+            user_number = self.user_numbers.get(user_id)
+            if user_number is None:
+                user_number = self.user_numbers[user_id] = len(self.user_docs)
+                self.user_docs.append(array('I'))
+            self.doc_users.append(user_number)
+            self.user_docs[user_number].append(doc)
+            for band, slot in enumerate(self._slots(signature)):
+                self.bands[band][slot] = doc + 1
+        return True
+
+    def check_and_add(self, reflection_id: str, user_id: str, text: str) -> Optional[Dict[str, Any]]:
+        """Look for a near-duplicate of a new reflection, then store it"""
+        signature = minhash_signature(text)
+        match = self.find(signature, user_id)
+        self.add(reflection_id, user_id, signature)
+        return match
+
+    def build(self, reflections: Iterable[Dict[str, Any]]) -> int:
+        """Index stored reflections (already-indexed ones are skipped)"""
+        added = 0
+        for reflection in reflections:
+            text = ' '.join(str(reflection.get(field) or '') for field in SEARCH_FIELDS)
+            if self.add(reflection.get('reflection_id'), reflection.get('user_id'), minhash_signature(text)):
+                added += 1
+        self.built = True
+        return added
+
+    def build_in_background(self, load: Callable[[], Iterable[Dict[str, Any]]]) -> bool:
+        """Build from load() on a daemon thread, once; lookups should wait for `built`"""
+        with self._lock:
+            if self.built or self._building:
+                return False
+            self._building = True
+
+        def run():
+            try:
+                added = self.build(load())
+                print(f"🔁 Near-duplicate index built ({added:,} reflections)")
+            except Exception as e:
+                print(f"⚠️ Near-duplicate index build failed: {e}")
+            finally:
+                self._building = False
+
+        threading.Thread(target=run, name='near-duplicate-build', daemon=True).start()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index size figures"""
+        return {
+            'reflections': len(self.reflection_ids),
+            'users': len(self.user_docs),
+            'table_slots': 1 << self.table_bits,
+            'bytes': self.signatures.itemsize * len(self.signatures) + BANDS * (4 << self.table_bits)
+        }
+
+    def _slots(self, signature) -> List[int]:
+        """Table slot of each band"""
+        mask = self._mask
+        return [hash((band,) + tuple(signature[band * ROWS:(band + 1) * ROWS])) & mask for band in range(BANDS)]
+
+# Global near-duplicate index instance
+near_duplicate_index = NearDuplicateIndex()
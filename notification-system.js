@@ -5,6 +5,9 @@ class DailyNotificationSystem {
         this.notificationTime = this.user.profile?.notification || '9:00 AM';
         this.lastNotificationDate = this.user.lastNotificationDate;
         this.isSupported = 'Notification' in window;
+        this.userId = localStorage.getItem('clearnext_user_id');
+        this.eventsUrl = 'http://localhost:5001';
+        this.eventSource = null;
     }
 
     // Request permission for notifications
@@ -26,47 +29,51 @@ class DailyNotificationSystem {
         return false;
     }
 
-    // Schedule daily notification
-    scheduleNotification() {
+    // Listen for notifications pushed by the server instead of keeping a local timer
+    connect() {
         if (!this.isSupported || Notification.permission !== 'granted') {
             return;
         }
 
-        // Clear any existing timeout
-        if (this.notificationTimeout) {
-            clearTimeout(this.notificationTimeout);
+        if (!this.userId || !window.EventSource || this.eventSource) {
+            return;
         }
 
-        // Calculate time until next notification
-        const now = new Date();
-        const [time, period] = this.notificationTime.split(' ');
-        const [hours, minutes] = time.split(':').map(Number);
-        
-        let notificationHour = hours;
-        if (period === 'PM' && hours !== 12) {
-            notificationHour += 12;
-        } else if (period === 'AM' && hours === 12) {
-            notificationHour = 0;
-        }
+        this.eventSource = new EventSource(`${this.eventsUrl}/api/events/${encodeURIComponent(this.userId)}`);
 
-        const notificationTime = new Date();
-        notificationTime.setHours(notificationHour, minutes, 0, 0);
+        // Daily reminders and other server-side notifications
+        this.eventSource.addEventListener('notification', (event) => {
+            const notification = JSON.parse(event.data);
+            if (notification.type === 'daily') {
+                this.sendDailyNotification();
+            } else {
+                this.showServerNotification(notification);
+            }
+        });
 
-        // If notification time has passed today, schedule for tomorrow
-        if (notificationTime <= now) {
-            notificationTime.setDate(notificationTime.getDate() + 1);
-        }
+        // Tomorrow's task became available
+        this.eventSource.addEventListener('task_unlocked', (event) => {
+            const unlock = JSON.parse(event.data);
+            this.showServerNotification({ title: '📚 CLEARNEXT', body: unlock.message, type: 'unlock' });
+        });
 
-        const timeUntilNotification = notificationTime - now;
+        console.log('Listening for live notifications');
+    }
 
-        // Schedule the notification
-        this.notificationTimeout = setTimeout(() => {
-            this.sendDailyNotification();
-            // Schedule next day's notification
-            this.scheduleNotification();
-        }, timeUntilNotification);
+    // Show a notification whose text comes from the server
+    showServerNotification({ title, body, type = 'server' }) {
+        const notification = new Notification(title || '📚 CLEARNEXT', {
+            body: body,
+            icon: 'data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100"><text y=".9em" font-size="90">📚</text></svg>',
+            tag: `clearnext-${type}`
+        });
 
-        console.log(`Next notification scheduled for: ${notificationTime.toLocaleString()}`);
+        notification.onclick = (event) => {
+            event.preventDefault();
+            window.focus();
+            window.location.href = 'tasks.html';
+            notification.close();
+        };
     }
 
     // Send daily notification
@@ -259,8 +266,8 @@ class DailyNotificationSystem {
         const hasPermission = await this.requestPermission();
         
         if (hasPermission) {
-            this.scheduleNotification();
-            this.checkAndSendNotification(); // Check for immediate notification
+            this.connect();
+            this.checkAndSendNotification(); // Catch up on a reminder missed while the page was closed
         }
 
         return hasPermission;
@@ -271,16 +278,13 @@ class DailyNotificationSystem {
         this.notificationTime = newTime;
         this.user.profile.notification = newTime;
         localStorage.setItem('clearnext_user', JSON.stringify(this.user));
-        
-        // Reschedule with new time
-        this.scheduleNotification();
     }
 
     // Stop notification system
     stop() {
-        if (this.notificationTimeout) {
-            clearTimeout(this.notificationTimeout);
-            this.notificationTimeout = null;
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
         }
     }
 
@@ -289,7 +293,7 @@ class DailyNotificationSystem {
         return {
             supported: this.isSupported,
             permission: Notification.permission,
-            scheduled: !!this.notificationTimeout,
+            connected: !!this.eventSource && this.eventSource.readyState !== EventSource.CLOSED,
             time: this.notificationTime,
             lastSent: this.lastNotificationDate
         };
@@ -0,0 +1,95 @@
+import cProfile
+import hmac
+import os
+import random
+import re
+import threading
+from datetime import datetime
+from typing import Optional, Mapping
+from config import Config
+
+class RequestProfiler:
+    """Opt-in per-request cProfile hook with a rotating dump directory.
+
+    A request is profiled only when profiling is enabled in config and either
+    it carries the profiling header with PROFILING_TOKEN as its value, or it
+    is picked by the sampling rate. Without a token the header is ignored,
+    so clients cannot switch profiling on for themselves. Dumps are pstats files, readable with
+    `python -m pstats` or snakeviz.
+    """
+
+    def __init__(self, enabled: bool = None, header: str = None, token: str = None,
+                 sample_rate: float = None, output_dir: str = None,
+                 max_files: int = None, max_bytes: int = None):
+        self.enabled = Config.PROFILING_ENABLED if enabled is None else enabled
+        self.header = header or Config.PROFILING_HEADER
+        self.token = Config.PROFILING_TOKEN if token is None else token
+        self.sample_rate = Config.PROFILING_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.output_dir = output_dir or Config.PROFILING_DIR
+        self.max_files = max_files or Config.PROFILING_MAX_FILES
+        self.max_bytes = max_bytes or Config.PROFILING_MAX_BYTES
+        self._rotate_lock = threading.Lock()
+
+    def should_profile(self, headers: Mapping[str, str]) -> bool:
+        """Decide whether to profile a request"""
+        if not self.enabled:
+            return False
+
+        requested = headers.get(self.header)
+        if requested is not None and self.token:
+            return hmac.compare_digest(requested.encode(), self.token.encode())
+
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Start profiling the current thread"""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return None
+        return profiler
+
+    def finish(self, profiler: cProfile.Profile, endpoint: str, method: str, duration: float) -> str:
+        """Stop profiling and write the dump, returning its file name"""
+        profiler.disable()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', endpoint).strip('_') or 'root'
+        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        filename = f"{timestamp}_{method}_{slug}_{int(duration * 1000)}ms.prof"
+        path = os.path.join(self.output_dir, filename)
+        profiler.dump_stats(path)
+
+        self.rotate(keep=path)
+        return filename
+
+    def rotate(self, keep: str = None):
+        """Delete the oldest dumps until under the file count and size caps, never `keep`"""
+        with self._rotate_lock:
+            entries = []
+            for name in os.listdir(self.output_dir):
+                if name.endswith('.prof'):
+                    path = os.path.join(self.output_dir, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue  # Rotated away by another worker process
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            entries.sort()
+            total_bytes = sum(size for _, size, _ in entries)
+            # The kept dump counts towards the caps but is never a candidate
+            kept = [entry for entry in entries if entry[2] == keep]
+            entries = [entry for entry in entries if entry[2] != keep]
+            while entries and (len(entries) + len(kept) > self.max_files or total_bytes > self.max_bytes):
+                _, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+
+# Global request profiler instance
+request_profiler = RequestProfiler()
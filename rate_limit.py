@@ -0,0 +1,177 @@
+import threading
+import time
+from array import array
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from config import Config
+from utils.metrics import metrics
+
+def client_ip(remote_addr: Optional[str], forwarded_for: Optional[str], trusted_proxies: int = None) -> Optional[str]:
+    """The client address as seen by the outermost trusted proxy.
+
+    Each trusted proxy appends the address it received the request from to
+    X-Forwarded-For, so the entry `trusted_proxies` from the end is the one
+    the client cannot forge. With no trusted proxies the header is ignored.
+    """
+    hops = Config.RATE_LIMIT_TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+    if hops <= 0 or not forwarded_for:
+        return remote_addr
+    addresses = [address.strip() for address in forwarded_for.split(',') if address.strip()]
+    return addresses[-hops] if len(addresses) >= hops else remote_addr
+
+class TokenBucketLimiter:
+    """Token buckets for many keys (user IDs, client IPs) in flat arrays.
+
+    Each key maps to a slot in two float arrays (tokens, last refill time),
+    about 16 bytes per bucket plus the dict entry, instead of an object per
+    client. Buckets refill lazily when checked. Once `max_keys` is reached,
+    idle buckets, which would be full again by now, are swept and their
+    slots reused, so memory stays bounded by the number of active clients.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_keys: int = 100000):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.slots: Dict[str, int] = {}
+        self.tokens = array('d')
+        self.updated = array('d')
+        self.free: List[int] = []
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def allow(self, key: str, cost: float = 1.0, now: float = None) -> Tuple[bool, float]:
+        """Take `cost` tokens from a key's bucket; returns (allowed, seconds until it would be)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = self._new_slot(key, now)
+            tokens = min(self.burst, self.tokens[slot] + (now - self.updated[slot]) * self.rate)
+            self.updated[slot] = now
+            if tokens >= cost:
+                self.tokens[slot] = tokens - cost
+                return True, 0.0
+            self.tokens[slot] = tokens
+            return False, (cost - tokens) / self.rate
+
+    def sweep(self, now: float = None) -> int:
+        """Release buckets that have refilled completely; returns how many were freed"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._sweep(now)
+
+    def _new_slot(self, key: str, now: float) -> int:
+        """Assign a full bucket to a new key (caller holds the lock)"""
+        if len(self.slots) >= self.max_keys and not self.free and now >= self._next_sweep:
+            self._sweep(now)
+        if self.free:
+            slot = self.free.pop()
+            self.tokens[slot] = self.burst
+            self.updated[slot] = now
+        else:
+            # Still full of active clients: grow rather than reset someone's bucket
+            slot = len(self.tokens)
+            self.tokens.append(self.burst)
+            self.updated.append(now)
+        self.slots[key] = slot
+        return slot
+
+    def _sweep(self, now: float) -> int:
+        """Free idle slots (caller holds the lock)"""
+        refill_time = self.burst / self.rate
+        idle = [key for key, slot in self.slots.items() if now - self.updated[slot] >= refill_time]
+        for key in idle:
+            self.free.append(self.slots.pop(key))
+        # A sweep is O(keys): when everyone is active, wait before trying again
+        self._next_sweep = now + min(refill_time, 1.0)
+        return len(idle)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get bucket counts"""
+        return {'name': self.name, 'keys': len(self.slots), 'slots': len(self.tokens),
+                'rate': self.rate, 'burst': self.burst}
+
+class AdmissionController:
+    """Global cap on requests being served at once.
+
+    A request waits at most `max_wait` seconds for a free slot; past that
+    it is shed with a 503 straight away rather than queueing behind work
+    the server cannot finish in time.
+    """
+
+    def __init__(self, max_concurrent: int, max_wait: float):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting up to max_wait; False if the server is saturated"""
+        started = time.perf_counter()
+        admitted = self._slots.acquire(timeout=self.max_wait)
+        metrics.observe('clearnext_admission_wait_seconds', time.perf_counter() - started)
+        if admitted:
+            with self._lock:
+                self.in_flight += 1
+        return admitted
+
+    def release(self):
+        """Give a slot back"""
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+class RateLimiter:
+    """Per-user and per-IP token buckets plus admission control for the API"""
+
+    def __init__(self, enabled: bool = None):
+        self.enabled = Config.RATE_LIMIT_ENABLED if enabled is None else enabled
+        self.user_buckets = TokenBucketLimiter('user', Config.RATE_LIMIT_USER_RATE, Config.RATE_LIMIT_USER_BURST,
+                                               Config.RATE_LIMIT_MAX_KEYS)
+        self.ip_buckets = TokenBucketLimiter('ip', Config.RATE_LIMIT_IP_RATE, Config.RATE_LIMIT_IP_BURST,
+                                             Config.RATE_LIMIT_MAX_KEYS)
+        self.admission = AdmissionController(Config.MAX_CONCURRENT_REQUESTS, Config.MAX_QUEUE_WAIT)
+
+    def check_ip(self, client_ip: Optional[str]) -> Optional[Tuple[int, str, float]]:
+        """Check the IP bucket; returns (status, reason, retry_after) when the request must be rejected"""
+        if client_ip:
+            allowed, retry_after = self.ip_buckets.allow(client_ip)
+            if not allowed:
+                return self._reject(429, 'ip', retry_after)
+        return None
+
+    def check_users(self, user_ids: Iterable[str]) -> Optional[Tuple[int, str, float]]:
+        """Check each user's bucket; returns (status, reason, retry_after) when the request must be rejected"""
+        for user_id in user_ids:
+            allowed, retry_after = self.user_buckets.allow(user_id)
+            if not allowed:
+                return self._reject(429, 'user', retry_after)
+        return None
+
+    def admit(self) -> Optional[Tuple[int, str, float]]:
+        """Take a concurrency slot; returns a rejection when the server is saturated"""
+        if self.admission.acquire():
+            return None
+        return self._reject(503, 'overloaded', 1.0)
+
+    def _reject(self, status: int, reason: str, retry_after: float) -> Tuple[int, str, float]:
+        """Count a rejected request"""
+        metrics.inc('clearnext_http_rejected_total', (('reason', reason), ('status', str(status))))
+        return status, reason, retry_after
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter state for the health check"""
+        return {
+            'enabled': self.enabled,
+            'in_flight': self.admission.in_flight,
+            'max_concurrent': self.admission.max_concurrent,
+            'buckets': [self.user_buckets.stats(), self.ip_buckets.stats()]
+        }
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
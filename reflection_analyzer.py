@@ -0,0 +1,215 @@
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Iterator
+from config import Config
+from utils.cache import LRUCache
+from utils.clock import clock as default_clock
+from utils.activity_calendar import to_date
+
+MOODS = ['low', 'okay', 'good']
+
+# Finished-journey feedback per user; entries are dropped when the user submits a reflection
+journey_feedback_cache = LRUCache('journey_feedback', Config.JOURNEY_FEEDBACK_CACHE_SIZE)
+
+class ReflectionAnalyzer:
+    """Server-side port of the journey analysis in reflection-analyzer.js.
+
+    The browser version reads `dailyProgress` from localStorage; here the
+    same per-day view is built from stored reflections, so every device
+    (and the batch job) gets the same answer.
+    """
+
+    def __init__(self, db, clock=None):
+        self.db = db
+        self.clock = clock or default_clock
+
+    def get_journey_feedback(self, user_id: str, user: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Get a user's final feedback, from cache when nothing changed since it was built"""
+        cached = journey_feedback_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        user = user or self.db.get_user(user_id)
+        if not user:
+            return None
+        feedback = self.generate_final_feedback(user, self.db.get_user_reflections(user_id))
+        journey_feedback_cache.set(user_id, feedback)
+        return feedback
+
+    def analyze_completed_journeys(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Stream final feedback for every user who finished a journey.
+
+        Users are read from a cursor and their reflections fetched one batch
+        of users per round trip, so memory stays bounded by `batch_size`.
+        """
+        batch = []
+        for user in self.db.iter_completed_users():
+            batch.append(user)
+            if len(batch) >= batch_size:
+                yield from self._analyze_batch(batch)
+                batch = []
+        if batch:
+            yield from self._analyze_batch(batch)
+
+    def _analyze_batch(self, users: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Analyze one batch of users with a single reflections query"""
+        reflections = self.db.get_reflections_for_users([user['user_id'] for user in users])
+        for user in users:
+            feedback = journey_feedback_cache.get(user['user_id'])
+            if feedback is None:
+                feedback = self.generate_final_feedback(user, reflections.get(user['user_id'], []))
+                journey_feedback_cache.set(user['user_id'], feedback)
+            yield feedback
+
+    def daily_progress(self, reflections: List[Dict[str, Any]]) -> Dict[date, Dict[str, Any]]:
+        """Group reflections by calendar day (the latest one on a day wins)"""
+        days = {}
+        for reflection in sorted(reflections, key=lambda ref: str(ref.get('created_at', ''))):
+            day = to_date(reflection.get('created_at'))
+            if day is None:
+                continue
+            days[day] = {
+                'mood': reflection.get('mood_after'),
+                'reflection': reflection,
+                'reflection_completed': True
+            }
+        return days
+
+    def generate_final_feedback(self, user: Dict[str, Any], reflections: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the end-of-journey feedback (generateFinalFeedback)"""
+        journey_days = user.get('journey_days', 7)
+        daily_progress = self.daily_progress(reflections)
+        completed_days = sum(1 for day in daily_progress.values() if day.get('reflection_completed'))
+
+        mood_analysis = self.analyze_mood_patterns(daily_progress)
+        growth_analysis = self.analyze_growth_patterns(daily_progress)
+        consistency_analysis = self.analyze_consistency(daily_progress, self._reference_day(user))
+
+        feedback = {
+            'user_id': user.get('user_id'),
+            'journey_days': journey_days,
+            'completed_days': completed_days,
+            'journey_summary': self.create_journey_summary(journey_days, completed_days),
+            'emotional_changes': mood_analysis,
+            'strengths_observed': growth_analysis,
+            'consistency': consistency_analysis,
+            'clarity_gained': self.identify_clarity_gained(daily_progress),
+            'suggested_next_step': self.generate_next_step(mood_analysis, growth_analysis),
+            'overall_tone': 'accomplished' if completed_days >= journey_days * 0.8 else 'progressing'
+        }
+        feedback['text'] = self.format_final_feedback(feedback)
+        return feedback
+
+    def analyze_mood_patterns(self, daily_progress: Dict[date, Dict[str, Any]]) -> Dict[str, Any]:
+        """Mood distribution and positivity (analyzeMoodPatterns)"""
+        mood_counts = {mood: 0 for mood in MOODS}
+        moods = [str(day['mood']).lower() for day in daily_progress.values() if day.get('mood')]
+        for mood in moods:
+            if mood in mood_counts:
+                mood_counts[mood] += 1
+
+        total = len(moods) or 1
+        # Same tie-break as the browser's reduce: a later mood wins ties
+        dominant_mood = MOODS[0]
+        for mood in MOODS[1:]:
+            if not mood_counts[dominant_mood] > mood_counts[mood]:
+                dominant_mood = mood
+
+        return {
+            'dominant_mood': dominant_mood,
+            'distribution': mood_counts,
+            'positivity': mood_counts['good'] / total * 100,
+            'resilience': ("You showed resilience on challenging days" if mood_counts['low'] > 0
+                           else "Consistently positive mindset")
+        }
+
+    def analyze_growth_patterns(self, daily_progress: Dict[date, Dict[str, Any]]) -> List[str]:
+        """Strengths shown by reflection depth and commitment (analyzeGrowthPatterns)"""
+        reflections = [day['reflection'] for day in daily_progress.values() if day.get('reflection')]
+        strengths = []
+
+        total_length = sum(len(ref.get('learning') or '') + len(ref.get('feeling') or '') +
+                           len(ref.get('improvement') or '') for ref in reflections)
+        if total_length / (len(reflections) or 1) > 200:
+            strengths.append("Deep self-reflection and thoughtful analysis")
+
+        completed_days = sum(1 for day in daily_progress.values() if day.get('reflection_completed'))
+        if completed_days > 10:
+            strengths.append("Strong commitment and consistency")
+
+        return strengths or ["Building self-awareness through regular practice"]
+
+    def analyze_consistency(self, daily_progress: Dict[date, Dict[str, Any]], today: date = None) -> Dict[str, Any]:
+        """Current/longest streak of reflection days (analyzeConsistency)"""
+        today = today or self.clock.today()
+        days = sorted(day for day, progress in daily_progress.items() if progress.get('reflection_completed'))
+        current_streak = longest_streak = run = 0
+        previous = None
+
+        for day in days:
+            run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+            longest_streak = max(longest_streak, run)
+            previous = day
+        if days and (today - days[-1]).days <= 7:
+            current_streak = run
+
+        return {
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
+            'total_days': len(daily_progress),
+            'consistency': longest_streak / len(daily_progress) * 100 if daily_progress else 0
+        }
+
+    def identify_clarity_gained(self, daily_progress: Dict[date, Dict[str, Any]]) -> List[str]:
+        """Clarity themes mentioned in learning/improvement text"""
+        themes = [
+            (('understand', 'clear'), "Better understanding of personal learning patterns"),
+            (('time', 'schedule'), "Improved time management awareness"),
+            (('motivation', 'energy'), "Deeper insight into personal motivation")
+        ]
+        clarity_areas = []
+        for day in daily_progress.values():
+            reflection = day.get('reflection')
+            if not reflection:
+                continue
+            text = f"{reflection.get('learning') or ''} {reflection.get('improvement') or ''}".lower()
+            for keywords, area in themes:
+                if area not in clarity_areas and any(keyword in text for keyword in keywords):
+                    clarity_areas.append(area)
+
+        return clarity_areas or ["Developing self-awareness through regular reflection"]
+
+    def generate_next_step(self, mood_analysis: Dict[str, Any], growth_analysis: List[str]) -> str:
+        """Suggest what to do after the journey"""
+        if mood_analysis['positivity'] < 40:
+            return "Focus on building positive routines and self-compassion"
+        if any(strength.startswith("Deep self-reflection") for strength in growth_analysis):
+            return "Apply your insights to new learning challenges"
+        return "Continue your reflection practice with new topics or goals"
+
+    def create_journey_summary(self, journey_days: int, completed_days: int) -> str:
+        """One-line completion summary"""
+        completion = round(completed_days / journey_days * 100) if journey_days else 0
+        return f"You completed {completed_days} out of {journey_days} days ({completion}% completion rate)"
+
+    def format_final_feedback(self, feedback: Dict[str, Any]) -> str:
+        """Render feedback as the text shown at the end of a journey"""
+        emotional = feedback['emotional_changes']
+        strengths = '\n'.join(f"- {strength}" for strength in feedback['strengths_observed'])
+        clarity = '\n'.join(f"- {area}" for area in feedback['clarity_gained'])
+        return (f"Journey Complete: {feedback['journey_summary']}\n\n"
+                f"Emotional & Mental Changes:\n"
+                f"- Dominant mood pattern: {emotional['dominant_mood']}\n"
+                f"- Positivity rate: {round(emotional['positivity'])}%\n"
+                f"- {emotional['resilience']}\n\n"
+                f"Strengths Observed:\n{strengths}\n\n"
+                f"Clarity Gained:\n{clarity}\n\n"
+                f"Suggested Next Step:\n{feedback['suggested_next_step']}\n\n"
+                f"Your journey shows {feedback['overall_tone']} growth. Keep building on this foundation.")
+
+    def _reference_day(self, user: Dict[str, Any]) -> date:
+        """Day the current streak is measured against: the journey's last day once it is over"""
+        today = self.clock.today()
+        start = to_date(user.get('created_at'))
+        if start is None:
+            return today
+        return min(today, start + timedelta(days=user.get('journey_days', 7) - 1))
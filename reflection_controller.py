@@ -1,8 +1,11 @@
+from datetime import date
 from flask import Blueprint, request, jsonify
-from models.task import Reflection
 from utils.database import db
 from utils.validators import validate_reflection_data, format_response
+from utils.http_cache import conditional_response
+from utils.fields import parse_fields, projection_for, select_fields
 from services.reflection_service import ReflectionService
+from services.reflection_analyzer import ReflectionAnalyzer
 
 reflection_bp = Blueprint('reflections', __name__)
 
@@ -17,72 +20,124 @@ def submit_reflection():
         if not is_valid:
             return format_response(False, message, validation_details), 400
         
-        # Create reflection object
-        reflection = Reflection(
-            reflection_id=f"ref_{data['user_id']}_{data.get('day_number', 1)}",
-            user_id=data['user_id'],
-            task_id=data['task_id'],
-            day_number=data.get('day_number', 1),
-            learning=data['learning'],
-            feeling=data['feeling'],
-            improvement=data['improvement'],
-            mood_before=data.get('mood_before', 'okay'),
-            mood_after=data.get('mood_after', 'okay')
-        )
+        result = ReflectionService(db).submit_reflection(data)
+        result['validation_details'] = validation_details
         
-        # Confirm honesty if provided
-        if data.get('honesty_confirmed'):
-            reflection.confirm_honesty()
+        return format_response(True, "Reflection submitted successfully", result)
         
-        # Calculate quality score
-        quality_score = reflection.calculate_quality_score()
+    except Exception as e:
+        return format_response(False, f"Error submitting reflection: {str(e)}"), 500
+
+@reflection_bp.route('/user/<user_id>', methods=['GET'])
+def get_user_reflections(user_id):
+    """Get all reflections for a user (?fields=a,b returns only those fields)"""
+    try:
+        is_valid, message, fields = parse_fields(request.args.get('fields'))
+        if not is_valid:
+            return format_response(False, message), 400
         
-        # Generate appreciation
-        appreciation = reflection.generate_appreciation(data.get('mood_after', 'okay'))
-        reflection.micro_appreciation = appreciation
+        reflections = db.get_user_reflections(user_id, projection_for('reflection', fields))
         
-        # Save to database
-        reflection_service = ReflectionService(db)
-        created_reflection = reflection_service.create_reflection(reflection.to_dict())
+        return conditional_response('reflection_list', 'reflection', reflections,
+                                    lambda: format_response(True, "User reflections retrieved", {
+                                        'reflections': select_fields('reflection', reflections, fields),
+                                        'total_reflections': len(reflections)
+                                    }), variant=fields)
         
-        # Update user progress
-        reflection_service.update_user_progress(data['user_id'], reflection.word_count)
+    except Exception as e:
+        return format_response(False, f"Error getting user reflections: {str(e)}"), 500
+
+@reflection_bp.route('/analytics/<user_id>', methods=['GET'])
+def get_reflection_analytics(user_id):
+    """Get reflection analytics for a user"""
+    try:
+        analytics = ReflectionService(db).get_reflection_analytics(user_id)
         
-        return format_response(True, "Reflection submitted successfully", {
-            'reflection_id': reflection.reflection_id,
-            'quality_score': quality_score,
-            'word_count': reflection.word_count,
-            'micro_appreciation': appreciation,
-            'validation_details': validation_details
+        return format_response(True, "Reflection analytics retrieved", {'analytics': analytics})
+        
+    except Exception as e:
+        return format_response(False, f"Error getting reflection analytics: {str(e)}"), 500
+
+@reflection_bp.route('/journey-feedback/<user_id>', methods=['GET'])
+def get_journey_feedback(user_id):
+    """Get end-of-journey feedback computed from stored reflections"""
+    try:
+        feedback = ReflectionAnalyzer(db).get_journey_feedback(user_id)
+        
+        if not feedback:
+            return format_response(False, "User not found"), 404
+        
+        return format_response(True, "Journey feedback retrieved", {'feedback': feedback})
+        
+    except Exception as e:
+        return format_response(False, f"Error getting journey feedback: {str(e)}"), 500
+
+@reflection_bp.route('/score', methods=['POST'])
+def score_reflections():
+    """Score a batch of reflection drafts"""
+    try:
+        data = request.get_json() or {}
+        drafts = data.get('reflections')
+        if not isinstance(drafts, list) or not drafts or not all(isinstance(draft, dict) for draft in drafts):
+            return format_response(False, "reflections must be a non-empty list of objects"), 400
+        if len(drafts) > 1000:
+            return format_response(False, "At most 1000 reflections per request"), 400
+        
+        scores = ReflectionService(db).score_drafts(drafts)
+        
+        return format_response(True, "Reflections scored", {
+            'scores': scores,
+            'total_scored': len(scores)
         })
         
     except Exception as e:
-        return format_response(False, f"Error submitting reflection: {str(e)}"), 500
+        return format_response(False, f"Error scoring reflections: {str(e)}"), 500
 
-@reflection_bp.route('/user/<user_id>', methods=['GET'])
-def get_user_reflections(user_id):
-    """Get all reflections for a user"""
+@reflection_bp.route('/search', methods=['GET'])
+def search_reflections():
+    """Full-text search over reflections (BM25 ranked)"""
     try:
-        reflections = db.get_user_reflections(user_id)
+        query = request.args.get('q', '').strip()
+        if not query:
+            return format_response(False, "q is required"), 400
+        
+        try:
+            since = date.fromisoformat(request.args['since']) if request.args.get('since') else None
+            until = date.fromisoformat(request.args['until']) if request.args.get('until') else None
+            limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        except ValueError:
+            return format_response(False, "since/until must be YYYY-MM-DD and limit a number"), 400
+        
+        results = ReflectionService(db).search_reflections(
+            query, user_id=request.args.get('user_id'), since=since, until=until, limit=limit
+        )
         
-        return format_response(True, "User reflections retrieved", {
-            'reflections': reflections,
-            'total_reflections': len(reflections)
+        return format_response(True, "Reflection search results", {
+            'query': query,
+            'results': results,
+            'total_results': len(results)
         })
         
     except Exception as e:
-        return format_response(False, f"Error getting user reflections: {str(e)}"), 500
+        return format_response(False, f"Error searching reflections: {str(e)}"), 500
 
 @reflection_bp.route('/<reflection_id>', methods=['GET'])
 def get_reflection(reflection_id):
-    """Get specific reflection by ID"""
+    """Get specific reflection by ID (?fields=a,b returns only those fields)"""
     try:
-        reflection = db.get_reflection(reflection_id)
+        is_valid, message, fields = parse_fields(request.args.get('fields'))
+        if not is_valid:
+            return format_response(False, message), 400
+        
+        reflection = db.get_reflection(reflection_id, projection_for('reflection', fields))
         
         if not reflection:
             return format_response(False, "Reflection not found"), 404
         
-        return format_response(True, "Reflection retrieved", {'reflection': reflection})
+        return conditional_response('reflection', 'reflection', [reflection],
+                                    lambda: format_response(True, "Reflection retrieved", {
+                                        'reflection': select_fields('reflection', [reflection], fields)[0]
+                                    }), variant=fields)
         
     except Exception as e:
         return format_response(False, f"Error getting reflection: {str(e)}"), 500
@@ -96,8 +151,12 @@ def validate_reflection():
         # Validate reflection data
         is_valid, message, validation_details = validate_reflection_data(data)
         
+        # Drafts are re-validated on every keystroke; the score is memoised by content
+        quality_score = ReflectionService(db).score_drafts([data])[0] if is_valid else None
+        
         return format_response(True, message if is_valid else "Validation failed", {
             'is_valid': is_valid,
+            'quality_score': quality_score,
             'validation_details': validation_details
         })
         
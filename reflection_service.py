@@ -1,13 +1,83 @@
-from datetime import datetime
 from typing import Dict, Any, List
 from models.task import Reflection, Progress
-from utils.validators import generate_reflection_id
+from utils.clock import clock as default_clock
+from utils.events import event_bus
+from utils.validators import generate_reflection_id, generate_progress_id, score_reflections, near_duplicate_penalty
+from services.achievement_engine import achievement_engine
+from services.activity_service import ActivityService
+from utils.activity_calendar import REFLECTED
+from utils.search_index import search_index, SEARCH_FIELDS
+from utils.near_duplicates import near_duplicate_index, minhash_signature
+
+SEARCH_INDEX_FIELDS = ['reflection_id', 'user_id', 'created_at'] + SEARCH_FIELDS
+RESCORE_FIELDS = ['reflection_id', 'anti_cheat_score', 'near_duplicate_of', 'near_duplicate_similarity'] + SEARCH_FIELDS
+
+def draft_text(reflection: Dict[str, Any]) -> str:
+    """Join reflection sections the way Reflection.full_text does"""
+    return f"{reflection.get('learning', '')} {reflection.get('feeling', '')} {reflection.get('improvement', '')}"
 
 class ReflectionService:
     """Service for managing reflections and progress tracking"""
     
-    def __init__(self, db):
+    def __init__(self, db, clock=None):
         self.db = db
+        self.clock = clock or default_clock
+        self.activity_service = ActivityService(db, self.clock)
+    
+    def submit_reflection(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Score and store a validated reflection, then publish it for side effects"""
+        reflection = Reflection(
+            reflection_id=generate_reflection_id(),
+            user_id=data['user_id'],
+            task_id=data['task_id'],
+            day_number=data.get('day_number', 1),
+            learning=data['learning'],
+            feeling=data['feeling'],
+            improvement=data['improvement'],
+            mood_before=data.get('mood_before', 'okay'),
+            mood_after=data.get('mood_after', 'okay')
+        )
+        
+        # Confirm honesty if provided
+        if data.get('honesty_confirmed'):
+            reflection.confirm_honesty()
+        
+        quality_score = reflection.calculate_quality_score()
+        
+        # Recycled text (own history or other users) lowers the anti-cheat score.
+        # Until the index has loaded the stored corpus the check is skipped, not run against part of it.
+        if near_duplicate_index.built:
+            match = near_duplicate_index.check_and_add(reflection.reflection_id, reflection.user_id, reflection.full_text())
+            if match:
+                quality_score = reflection.flag_near_duplicate(match)
+        else:
+            self.build_near_duplicate_index()
+            near_duplicate_index.add(reflection.reflection_id, reflection.user_id, minhash_signature(reflection.full_text()))
+        
+        reflection.micro_appreciation = reflection.generate_appreciation(data.get('mood_after', 'okay'))
+        
+        self.create_reflection(reflection.to_dict())
+        
+        # Progress and other side effects are handled by event consumers
+        event_bus.publish('reflection_submitted', {
+            'user_id': reflection.user_id,
+            'task_id': reflection.task_id,
+            'reflection_id': reflection.reflection_id,
+            'day_number': reflection.day_number,
+            'word_count': reflection.word_count,
+            'quality_score': quality_score
+        })
+        
+        return {
+            'reflection_id': reflection.reflection_id,
+            'quality_score': quality_score,
+            'word_count': reflection.word_count,
+            'micro_appreciation': reflection.micro_appreciation
+        }
+    
+    def build_near_duplicate_index(self) -> bool:
+        """Start loading stored reflections into the near-duplicate index (no-op once started)"""
+        return near_duplicate_index.build_in_background(lambda: self.db.iter_reflections(SEARCH_INDEX_FIELDS))
     
     def create_reflection(self, reflection_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new reflection"""
@@ -17,27 +87,40 @@ class ReflectionService:
         """Get all reflections for a user"""
         return self.db.get_user_reflections(user_id)
     
-    def update_user_progress(self, user_id: str, characters_written: int) -> bool:
+    def update_user_progress(self, user_id: str, characters_written: int, event_id: str = None) -> bool:
         """Update user progress after reflection"""
         # Get existing progress
         progress = self.db.get_progress(user_id)
         
+        # Redelivered event (at-least-once delivery) - already applied
+        if event_id and progress and progress.get('last_event_id') == event_id:
+            return True
+        
+        calendar = self.activity_service.record(user_id, REFLECTED)
+        
         if not progress:
             # Create new progress record
             new_progress = Progress(
-                progress_id=f"prog_{user_id}",
+                progress_id=generate_progress_id(),
                 user_id=user_id
             )
+            if calendar:
+                new_progress.current_streak = calendar.current_streak(REFLECTED, self.clock.today())
+                new_progress.longest_streak = calendar.longest_streak(REFLECTED)
             new_progress.complete_day(characters_written)
-            self.db.create_progress(new_progress.to_dict())
+            progress_data = new_progress.to_dict()
+            progress_data['last_event_id'] = event_id
+            self.db.create_progress(progress_data)
+            self._publish_progress(user_id, progress_data, None)
             return True
         
         # Update existing progress
         progress_data = {
+            'last_event_id': event_id,
             'total_days_completed': progress.get('total_days_completed', 0) + 1,
             'total_characters_written': progress.get('total_characters_written', 0) + characters_written,
-            'last_activity_date': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
+            'last_activity_date': self.clock.utcnow().isoformat(),
+            'updated_at': self.clock.utcnow().isoformat()
         }
         
         # Calculate journey completion
@@ -47,61 +130,48 @@ class ReflectionService:
             progress_data['journey_completion'] = (progress_data['total_days_completed'] / journey_days) * 100
         
         # Update streak
-        progress_data['current_streak'] = self.calculate_streak(user_id)
-        if progress_data['current_streak'] > progress.get('longest_streak', 0):
-            progress_data['longest_streak'] = progress_data['current_streak']
+        if calendar:
+            progress_data['current_streak'] = calendar.current_streak(REFLECTED, self.clock.today())
+            progress_data['longest_streak'] = calendar.longest_streak(REFLECTED)
         
-        # Check achievements
-        achievements = progress.get('achievements', [])
-        new_achievements = self.check_achievements(progress_data, user)
-        progress_data['achievements'] = new_achievements
+        previous = self._achievement_metrics(progress)  # Before the update, which may change `progress` in place
+        success = self.db.update_progress(user_id, progress_data)
+        if success:
+            self._publish_progress(user_id, progress_data, previous)
         
-        return self.db.update_progress(user_id, progress_data)
+        return success
+    
+    def award_achievements(self, user_id: str, metrics: Dict[str, Any], previous: Dict[str, Any] = None) -> List[str]:
+        """Award achievements earned by new progress metrics; returns the newly awarded ids"""
+        progress = self.db.get_progress(user_id)
+        if not progress:
+            return []
+        # Only rules whose metrics changed are evaluated; awards are idempotent
+        new_achievements = achievement_engine.evaluate(metrics, progress.get('achievements', []), previous=previous)
+        if new_achievements:
+            self.db.award_achievements(user_id, new_achievements)
+        return new_achievements
+    
+    def _achievement_metrics(self, progress: Dict[str, Any]) -> Dict[str, Any]:
+        """The progress values achievement rules depend on"""
+        return {name: progress.get(name) for name in achievement_engine.metrics()}
+    
+    def _publish_progress(self, user_id: str, progress_data: Dict[str, Any], previous: Dict[str, Any] = None):
+        """Announce changed progress metrics to the achievement consumer (previous None: all changed)"""
+        event_bus.publish('progress_updated', {
+            'user_id': user_id,
+            'metrics': self._achievement_metrics(progress_data),
+            'previous': previous
+        })
     
     def calculate_streak(self, user_id: str) -> int:
         """Calculate current streak for user"""
-        reflections = self.get_user_reflections(user_id)
-        if not reflections:
-            return 0
-        
-        # Sort by date
-        sorted_reflections = sorted(reflections, key=lambda x: x.get('created_at', ''))
-        
-        streak = 0
-        current_date = datetime.now().date()
-        
-        for reflection in reversed(sorted_reflections):
-            ref_date = datetime.fromisoformat(reflection.get('created_at', '')).date()
-            days_diff = (current_date - ref_date).days
-            
-            if days_diff <= 1:  # Today or yesterday
-                streak += 1
-                current_date = ref_date
-            else:
-                break
-        
-        return streak
+        return self.activity_service.current_streak(user_id, REFLECTED)
     
     def check_achievements(self, progress_data: Dict[str, Any], user: Dict[str, Any]) -> List[str]:
         """Check and award achievements"""
-        achievements = progress_data.get('achievements', [])
-        
-        # First week achievement
-        if progress_data.get('current_streak', 0) >= 7 and 'first_week' not in achievements:
-            achievements.append('first_week')
-        
-        # Monthly champion achievement
-        if progress_data.get('current_streak', 0) >= 30 and 'monthly_champion' not in achievements:
-            achievements.append('monthly_champion')
-        
-        # Journey completion achievement
-        if progress_data.get('journey_completion', 0) >= 100.0 and 'journey_complete' not in achievements:
-            achievements.append('journey_complete')
-        
-        # Consistent learner achievement
-        if progress_data.get('total_days_completed', 0) >= 14 and 'consistent_learner' not in achievements:
-            achievements.append('consistent_learner')
-        
+        achievements = list(progress_data.get('achievements', []))
+        achievements.extend(achievement_engine.evaluate(progress_data, achievements))
         return achievements
     
     def get_reflection_analytics(self, user_id: str) -> Dict[str, Any]:
@@ -137,6 +207,55 @@ class ReflectionService:
             'quality_trend': self.get_quality_trend(reflections)
         }
     
+    def score_drafts(self, drafts: List[Dict[str, Any]]) -> List[float]:
+        """Score reflection drafts in one batch (memoised by content)"""
+        return score_reflections([draft_text(draft) for draft in drafts])
+    
+    def rescore_reflections(self, batch_size: int = 1000) -> Dict[str, int]:
+        """Re-apply the current scoring rules to every stored reflection (run after bumping SCORING_VERSION).
+        
+        Near-duplicates get a fresh score with their stored similarity penalty
+        applied again. Older ones flagged before the similarity was stored
+        keep their score and are counted as skipped.
+        """
+        counts = {'scanned': 0, 'updated': 0, 'skipped_duplicates': 0}
+        batch = []
+        
+        def flush():
+            scores = score_reflections([draft_text(ref) for ref in batch], use_cache=False)
+            scores = [near_duplicate_penalty(score, ref['near_duplicate_similarity'])
+                      if ref.get('near_duplicate_of') else score for ref, score in zip(batch, scores)]
+            changed = {ref['reflection_id']: score for ref, score in zip(batch, scores)
+                       if score != ref.get('anti_cheat_score')}
+            counts['updated'] += self.db.update_reflection_scores(changed)
+            batch.clear()
+        
+        for reflection in self.db.iter_reflections(RESCORE_FIELDS):
+            counts['scanned'] += 1
+            # Without the match similarity the penalty cannot be re-applied; keep the old score
+            if reflection.get('near_duplicate_of') and reflection.get('near_duplicate_similarity') is None:
+                counts['skipped_duplicates'] += 1
+                continue
+            batch.append(reflection)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return counts
+    
+    def search_reflections(self, query: str, user_id: str = None, since=None, until=None,
+                           limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text search over reflections, best matches first"""
+        if not search_index.built:
+            search_index.build(self.db.iter_reflections(SEARCH_INDEX_FIELDS))
+        
+        hits = search_index.search(query, user_id=user_id, since=since, until=until, limit=limit)
+        reflections = {ref['reflection_id']: ref for ref in self.db.get_reflections([hit['reflection_id'] for hit in hits])}
+        for hit in hits:
+            reflection = reflections.get(hit['reflection_id'], {})
+            hit.update({field: reflection.get(field) for field in ['day_number', 'learning', 'feeling', 'improvement', 'mood_after']})
+        return hits
+    
     def get_quality_trend(self, reflections: List[Dict[str, Any]]) -> str:
         """Analyze quality trend over time"""
         if len(reflections) < 3:
@@ -0,0 +1,340 @@
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional
+from config import Config
+from utils.clock import clock as default_clock
+from utils.metrics import metrics
+from utils.sse_hub import sse_hub
+from utils.validators import parse_time_of_day
+from services.task_rules_service import TaskRulesService
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_REMINDER_TIME = '09:00'
+LEASE_NAME = 'reminder_scheduler'
+
+# ---------- delivery sinks ----------
+
+class LogSink:
+    """Prints each reminder (development)"""
+
+    name = 'log'
+
+    def deliver(self, reminders: List[Dict[str, Any]]):
+        for reminder in reminders:
+            print(f"🔔 Reminder for {reminder['user_id']} at {reminder['scheduled_for']}: {reminder['body']}")
+
+class FileSink:
+    """Appends reminders to a JSON-lines file, one write per batch"""
+
+    name = 'file'
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def deliver(self, reminders: List[Dict[str, Any]]):
+        with open(self.path, 'a', encoding='utf-8') as out:
+            out.write(''.join(json.dumps(reminder, default=str) + '\n' for reminder in reminders))
+
+class WebhookSink:
+    """POSTs each batch as {"reminders": [...]} to a push service"""
+
+    name = 'webhook'
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, reminders: List[Dict[str, Any]]):
+        body = json.dumps({'reminders': reminders}, default=str).encode()
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class SSESink:
+    """Pushes reminders to the user's open tabs as `notification` events"""
+
+    name = 'sse'
+
+    def deliver(self, reminders: List[Dict[str, Any]]):
+        for reminder in reminders:
+            if sse_hub.has_listeners(reminder['user_id']):
+                sse_hub.publish(reminder['user_id'], 'notification', reminder)
+
+def build_sinks(names: Iterable[str]) -> list:
+    """Sinks from a list of names (log, file, webhook, sse)"""
+    factories = {
+        'log': LogSink,
+        'file': lambda: FileSink(Config.REMINDER_FILE),
+        'webhook': lambda: WebhookSink(Config.REMINDER_WEBHOOK_URL),
+        'sse': SSESink
+    }
+    return [factories[name]() for name in names if name in factories]
+
+# ---------- scheduler ----------
+
+class ReminderScheduler:
+    """Daily reminders at each user's `preferred_time`, fired in batches.
+
+    Users sit in a timing wheel with one slot per minute of the day. The
+    reminders repeat daily, so a single level covers the whole period.
+    Scheduling, moving and cancelling a user are O(1). A tick only touches
+    the slots the clock has passed since the previous tick.
+
+    A slot is a plain list of user IDs, and `positions` is the source of
+    truth. Moving a user appends to the new slot, and the stale entry is
+    dropped when its slot next fires. That costs about 8 bytes per slot
+    entry instead of a set entry per user.
+
+    Due users are loaded with one multi-get per batch. Anyone who has
+    finished the journey or already completed today's task is skipped.
+    The rest go to every configured sink at once.
+
+    Once started, only the process holding the `reminder_scheduler` lease
+    in the database keeps a wheel and fires it, so a multi-worker server
+    sends each reminder once. The holder renews the lease every tick and
+    stores its cursor on it. A standby takes over when the lease lapses,
+    rebuilds the wheel, and resumes from that cursor. Users changed in any
+    process are picked up from their `updated_at` on each tick.
+    """
+
+    def __init__(self, db, sinks: list = None, clock=None, batch_size: int = None):
+        self.db = db
+        self.sinks = build_sinks(Config.REMINDER_SINKS) if sinks is None else sinks
+        if self.sinks and all(sink.name == 'sse' for sink in self.sinks):
+            print("⚠️ REMINDER_SINKS=sse only reaches open tabs; add file or webhook to reach closed ones")
+        self.clock = clock or default_clock
+        self.batch_size = batch_size or Config.REMINDER_BATCH_SIZE
+        self.rules = TaskRulesService(db, self.clock)
+        self.slots: List[List[str]] = [[] for _ in range(MINUTES_PER_DAY)]
+        self.positions: Dict[str, int] = {}
+        self.cursor: Optional[datetime] = None
+        self.stats = {'fired': 0, 'delivered': 0, 'skipped': 0, 'failed': 0}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.leader = False
+        self.refreshed_at: Optional[datetime] = None
+        self._rebuild = True
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def schedule(self, user_id: str, preferred_time: Any = None, replace: bool = True) -> bool:
+        """Put a user on the wheel at their preferred time (falls back to 09:00)"""
+        if self._thread is not None and not self.leader:
+            return False  # A standby keeps no wheel; the lease holder picks the change up from updated_at
+        minute = self._minute_of(preferred_time)
+        with self._lock:
+            current = self.positions.get(user_id)
+            if current is not None and (current == minute or not replace):
+                return False
+            self.positions[user_id] = minute
+            self.slots[minute].append(user_id)
+            return True
+
+    def unschedule(self, user_id: str) -> bool:
+        """Take a user off the wheel"""
+        with self._lock:
+            return self.positions.pop(user_id, None) is not None
+
+    def rebuild(self) -> int:
+        """Load every user's reminder time from the database.
+
+        Only two fields per user are read. Anyone scheduled while this runs
+        keeps that newer time.
+        """
+        started = time.perf_counter()
+        count = 0
+        minutes: Dict[Any, int] = {}  # Few distinct times: parse each once
+        batch = []
+        for user in self.db.iter_users(['user_id', 'preferred_time'], batch_size=Config.REMINDER_BATCH_SIZE):
+            preferred_time = user.get('preferred_time')
+            minute = minutes.get(preferred_time)
+            if minute is None:
+                minute = minutes[preferred_time] = self._minute_of(preferred_time)
+            batch.append((user['user_id'], minute))
+            if len(batch) >= Config.REMINDER_BATCH_SIZE:
+                count += self._add_missing(batch)
+                batch = []
+        count += self._add_missing(batch)
+        print(f"🔔 Reminder schedule rebuilt: {count} users in {time.perf_counter() - started:.2f}s")
+        return count
+
+    def refresh(self) -> int:
+        """Reschedule users changed since the last refresh, in any process; returns users moved"""
+        # Overlap by a lease period to cover clock skew between hosts and write-behind delay
+        since = self.refreshed_at - timedelta(seconds=Config.REMINDER_LEASE_SECONDS)
+        self.refreshed_at = self.clock.utcnow()
+        return sum(1 for user in self.db.iter_users_updated_since(since, ['user_id', 'preferred_time'])
+                   if self.schedule(user['user_id'], user.get('preferred_time')))
+
+    def step(self, now: datetime = None) -> int:
+        """One scheduler round: hold the lease, keep the wheel current and fire what is due"""
+        data = {'cursor': self.cursor.isoformat()} if self.leader and self.cursor else None
+        lease = self.db.acquire_lease(LEASE_NAME, self.owner, Config.REMINDER_LEASE_SECONDS, data)
+        if lease is None:
+            if self.leader:
+                print("🔔 Reminder lease lost; another process sends reminders now")
+                self._resign()
+            return 0
+        if self.leader:
+            self.refresh()
+        else:
+            self._take_over(lease, now)
+        return self.tick(now)
+
+    def tick(self, now: datetime = None) -> int:
+        """Fire every slot passed since the last tick; returns reminders delivered"""
+        now = (now or self.clock.now()).replace(second=0, microsecond=0)
+        if self.cursor is None or now <= self.cursor:
+            # First tick starts the wheel here: a restart does not resend earlier reminders
+            self.cursor = now if self.cursor is None else self.cursor
+            return 0
+
+        # A gap longer than a day still fires each slot once
+        start = max(self.cursor + timedelta(minutes=1), now - timedelta(minutes=MINUTES_PER_DAY - 1))
+        delivered = 0
+        moment = start
+        while moment <= now:
+            minute = moment.hour * 60 + moment.minute
+            delivered += self._fire(minute, self._due(minute))
+            self.cursor = moment  # A failure later in the loop retries only the slots not yet fired
+            moment += timedelta(minutes=1)
+        return delivered
+
+    def start(self, rebuild: bool = True) -> bool:
+        """Run scheduler rounds on a background thread (once per process)"""
+        with self._start_lock:
+            if self._thread is not None:
+                return False
+            self._rebuild = rebuild
+
+            def run():
+                while True:
+                    try:
+                        self.step()
+                    except Exception as e:
+                        print(f"⚠️ Reminder tick failed: {e}")
+                    if self._stop.wait(Config.REMINDER_TICK_SECONDS):
+                        break
+
+            self._thread = threading.Thread(target=run, name='reminder-scheduler', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+        return True
+
+    def stop(self):
+        """Stop the background thread and hand the lease over straight away"""
+        self._stop.set()
+        if self.leader:
+            self._resign()
+            self.db.release_lease(LEASE_NAME, self.owner)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get schedule size and delivery counts for the health check"""
+        return {**self.stats, 'leader': self.leader, 'scheduled_users': len(self.positions),
+                'cursor': self.cursor.isoformat() if self.cursor else None,
+                'sinks': [sink.name for sink in self.sinks]}
+
+    def _take_over(self, lease: Dict[str, Any], now: datetime = None):
+        """Become the sending process: load the wheel and resume the previous holder's cursor"""
+        self.leader = True
+        self.refreshed_at = self.clock.utcnow()
+        if self._rebuild:
+            self.rebuild()
+        cursor = datetime.fromisoformat(lease['cursor']) if lease.get('cursor') else None
+        now = now or self.clock.now()
+        # A handover resumes where the last holder stopped; after a full outage start afresh
+        if cursor and now - cursor <= timedelta(seconds=2 * Config.REMINDER_LEASE_SECONDS):
+            self.cursor = cursor
+        print(f"🔔 Reminder lease taken by {self.owner}")
+
+    def _resign(self):
+        """Drop the wheel after losing the lease"""
+        with self._lock:
+            self.leader = False
+            self.slots = [[] for _ in range(MINUTES_PER_DAY)]
+            self.positions = {}
+        self.cursor = None
+
+    def _minute_of(self, preferred_time: Any) -> int:
+        """Wheel slot for a preferred time"""
+        minute = parse_time_of_day(preferred_time)
+        return parse_time_of_day(DEFAULT_REMINDER_TIME) if minute is None else minute
+
+    def _add_missing(self, entries: List[tuple]) -> int:
+        """Schedule (user_id, minute) pairs for users not yet on the wheel, under one lock"""
+        added = 0
+        with self._lock:
+            positions, slots = self.positions, self.slots
+            for user_id, minute in entries:
+                if user_id not in positions:
+                    positions[user_id] = minute
+                    slots[minute].append(user_id)
+                    added += 1
+        return added
+
+    def _due(self, minute: int) -> List[str]:
+        """Users whose reminder is at this minute, compacting the slot"""
+        with self._lock:
+            positions = self.positions
+            due = list(dict.fromkeys(user_id for user_id in self.slots[minute] if positions.get(user_id) == minute))
+            self.slots[minute] = due[:]
+        return due
+
+    def _fire(self, minute: int, user_ids: List[str]) -> int:
+        """Build and deliver reminders for due users in batches"""
+        delivered = 0
+        scheduled_for = f"{minute // 60:02d}:{minute % 60:02d}"
+        for offset in range(0, len(user_ids), self.batch_size):
+            batch = user_ids[offset:offset + self.batch_size]
+            users = {user['user_id']: user for user in self.db.get_users(batch)}
+            for user_id in batch:
+                if user_id not in users:
+                    self.unschedule(user_id)
+            reminders = [self._reminder(user, scheduled_for) for user in users.values() if self._needs_reminder(user)]
+            self.stats['fired'] += len(batch)
+            self.stats['skipped'] += len(batch) - len(reminders)
+            if reminders:
+                self._deliver(reminders)
+                delivered += len(reminders)
+        self.stats['delivered'] += delivered
+        return delivered
+
+    def _needs_reminder(self, user: Dict[str, Any]) -> bool:
+        """Still on the journey and today's task not yet done"""
+        if self.rules.is_journey_complete(user):
+            return False
+        state = self.rules.todays_state(user)
+        return not (state and state.get('task_completed'))
+
+    def _reminder(self, user: Dict[str, Any], scheduled_for: str) -> Dict[str, Any]:
+        """Notification payload for one user"""
+        day, days = user.get('current_day', 1), user.get('journey_days', 7)
+        return {
+            'user_id': user['user_id'],
+            'type': 'daily',
+            'title': '📚 CLEARNEXT - Daily Learning Reminder',
+            'body': f"Day {day} of {days} is waiting for you. A few minutes today keeps the momentum going!",
+            'scheduled_for': scheduled_for,
+            'sent_at': self.clock.utcnow().isoformat()
+        }
+
+    def _deliver(self, reminders: List[Dict[str, Any]]):
+        """Hand a batch to every sink; one failing sink does not stop the others (failed counts per sink)"""
+        for sink in self.sinks:
+            try:
+                sink.deliver(reminders)
+                metrics.inc('clearnext_reminders_total', (('outcome', 'delivered'), ('sink', sink.name)), len(reminders))
+            except Exception as e:
+                self.stats['failed'] += len(reminders)
+                metrics.inc('clearnext_reminders_total', (('outcome', 'failed'), ('sink', sink.name)), len(reminders))
+                print(f"⚠️ Reminder sink '{sink.name}' failed: {e}")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+ClearNext Reflection Re-scoring
+Re-applies the current scoring rules to every stored reflection
+
+Usage:
+    python rescore_reflections.py
+    python rescore_reflections.py --batch-size 5000
+
+Run it after changing the scoring rules and bumping SCORING_VERSION in utils/validators.py.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from utils.database import db
+from services.reflection_service import ReflectionService
+
+def main():
+    """Main re-scoring function"""
+    parser = argparse.ArgumentParser(description='ClearNext reflection re-scoring batch job')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Reflections scored and written per batch')
+    args = parser.parse_args()
+
+    print("🧮 ClearNext Reflection Re-scoring", file=sys.stderr)
+    started = time.perf_counter()
+    counts = ReflectionService(db).rescore_reflections(batch_size=args.batch_size)
+
+    print(json.dumps(counts))
+    print(f"✅ {counts['scanned']:,} reflections scanned, {counts['updated']:,} updated "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
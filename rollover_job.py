@@ -0,0 +1,126 @@
+import time
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from config import Config
+from utils.activity_calendar import to_date
+from utils.clock import clock as default_clock
+
+# Only the fields the rollover reads are fetched
+USER_FIELDS = ['user_id', 'current_day', 'journey_days', 'journey_completed', 'last_active_date', 'missed_days']
+
+class RolloverJob:
+    """Nightly pass that brings every user's journey state up to date.
+
+    Journey state otherwise changes only when the user calls an endpoint,
+    so inactive users keep stale values. For each user the pass:
+
+    - sets `missed_days`, the whole days since they were last active
+      (0 once the journey is over);
+    - sets `journey_completed` once `current_day` has passed
+      `journey_days`;
+    - resets the progress `current_streak` to 0 when the last activity was
+      before yesterday.
+
+    Users are streamed in batches with a projection, and their progress is
+    fetched with one query per batch. Each field is computed column-wise
+    over the batch. Only records that actually change are written, as one
+    bulk write per collection per batch. Running the job twice on the same
+    day is therefore a no-op.
+
+    Days are server-local dates (Clock.today), the same basis as the task
+    window and streaks; stored UTC timestamps are converted to their local
+    day. A run shortly after local midnight therefore counts the day that
+    has just ended.
+    """
+
+    def __init__(self, db, clock=None, batch_size: int = None):
+        self.db = db
+        self.clock = clock or default_clock
+        self.batch_size = batch_size or Config.ROLLOVER_BATCH_SIZE
+
+    def run(self, limit: int = 0) -> Dict[str, Any]:
+        """Process every user and return the totals"""
+        totals = self._summary(self._totals(), time.perf_counter())
+        for totals in self.iter_batches(limit):
+            pass
+        return totals
+
+    def iter_batches(self, limit: int = 0) -> Iterator[Dict[str, Any]]:
+        """Process users batch by batch, yielding running totals after each batch"""
+        started = time.perf_counter()
+        totals = self._totals()
+        users = self.db.iter_users(USER_FIELDS, batch_size=self.batch_size)
+        if limit:
+            users = islice(users, limit)
+
+        while True:
+            batch = list(islice(users, self.batch_size))
+            if not batch:
+                break
+            progress = self.db.get_progress_for_users([user['user_id'] for user in batch])
+            user_updates, progress_updates, counts = self.plan_batch(batch, progress)
+            self.db.update_users(user_updates)
+            self.db.update_progress_for_users(progress_updates)
+
+            totals['users'] += len(batch)
+            totals['users_updated'] += len(user_updates)
+            totals['progress_updated'] += len(progress_updates)
+            for name, count in counts.items():
+                totals[name] += count
+            yield self._summary(totals, started)
+
+    def plan_batch(self, users: List[Dict[str, Any]],
+                   progress: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Dict], Dict[str, Dict], Dict[str, int]]:
+        """Work out the writes for one batch: (user updates, progress updates, counts)"""
+        today = self.clock.today().toordinal()  # Server-local date
+        now = self.clock.utcnow().isoformat()
+
+        # Columns for the batch
+        current_days = [user.get('current_day', 1) for user in users]
+        journey_days = [user.get('journey_days', 7) for user in users]
+        flagged = [bool(user.get('journey_completed')) for user in users]
+        finished = [flag or day > days for flag, day, days in zip(flagged, current_days, journey_days)]
+        last_active = [self._ordinal(user.get('last_active_date')) for user in users]
+        missed = [0 if done or last is None else max(0, today - last - 1)
+                  for done, last in zip(finished, last_active)]
+
+        user_updates: Dict[str, Dict[str, Any]] = {}
+        counts = {'journeys_completed': 0, 'users_missing_days': 0, 'streaks_reset': 0}
+        for user, done, flag, missed_days in zip(users, finished, flagged, missed):
+            changes = {}
+            if done and not flag:
+                changes['journey_completed'] = True
+                changes['journey_completed_at'] = now
+                counts['journeys_completed'] += 1
+            if missed_days != (user.get('missed_days') or 0):
+                changes['missed_days'] = missed_days
+            if missed_days:
+                counts['users_missing_days'] += 1
+            if changes:
+                user_updates[user['user_id']] = changes
+
+        records = [progress.get(user['user_id']) for user in users]
+        progress_updates: Dict[str, Dict[str, Any]] = {}
+        for user, record in zip(users, records):
+            if not record or not record.get('current_streak'):
+                continue
+            last = self._ordinal(record.get('last_activity_date'))
+            if last is None or today - last > 1:
+                progress_updates[user['user_id']] = {'current_streak': 0}
+                counts['streaks_reset'] += 1
+
+        return user_updates, progress_updates, counts
+
+    def _ordinal(self, value: Any) -> Optional[int]:
+        """Server-local day number of a stored date or UTC timestamp"""
+        day = to_date(value)
+        return day.toordinal() if day else None
+
+    def _totals(self) -> Dict[str, int]:
+        """Empty running totals"""
+        return {'users': 0, 'users_updated': 0, 'progress_updated': 0, 'journeys_completed': 0,
+                'users_missing_days': 0, 'streaks_reset': 0}
+
+    def _summary(self, totals: Dict[str, int], started: float) -> Dict[str, Any]:
+        """Totals so far with the elapsed time"""
+        return {**totals, 'elapsed_seconds': round(time.perf_counter() - started, 2)}
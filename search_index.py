@@ -0,0 +1,187 @@
+import heapq
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, Any, List, Optional, Iterable
+from utils.activity_calendar import to_date
+
+SEARCH_FIELDS = ['learning', 'feeling', 'improvement']
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from had has have i i'm in is it it's me my of on or so
+that the this to was we were will with you your am been do did just not very
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+class ReflectionSearchIndex:
+    """In-memory inverted index over reflection text with BM25 ranking.
+
+    Each reflection gets a dense document number in insertion order. Postings
+    are parallel arrays of document numbers and term frequencies, and per-doc
+    length, user and date live in flat arrays, so a query only touches the
+    postings of its own terms: cost grows with the number of matching
+    reflections, not with the size of the corpus. A user filter walks that
+    user's own documents and binary-searches the (sorted) postings instead,
+    and while reflections arrive in date order a date filter narrows each
+    posting list to a document-number range.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.built = False
+        self.reflection_ids: List[str] = []
+        self.doc_numbers: Dict[str, int] = {}
+        self.doc_lengths = array('I')
+        self.doc_days = array('i')    # date.toordinal(), 0 if unknown
+        self.doc_users = array('I')   # index into self.users
+        self.users: List[str] = []
+        self.user_numbers: Dict[str, int] = {}
+        self.user_docs: List[array] = []
+        self.days_sorted = True  # doc_days is non-decreasing, so date ranges are doc ranges
+        self.postings: Dict[str, tuple] = {}  # term -> (array of doc numbers, array of term frequencies)
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.reflection_ids)
+
+    def add(self, reflection: Dict[str, Any]) -> bool:
+        """Index one reflection; returns False if it was already indexed"""
+        reflection_id = reflection.get('reflection_id')
+        if not reflection_id:
+            return False
+
+        tokens = tokenize(' '.join(str(reflection.get(field) or '') for field in SEARCH_FIELDS))
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        created = to_date(reflection.get('created_at'))
+
+        with self._lock:
+            if reflection_id in self.doc_numbers:
+                return False
+            doc = len(self.reflection_ids)
+            day = created.toordinal() if created else 0
+            if self.doc_days and day < self.doc_days[-1]:
+                self.days_sorted = False
+            user = self._user_number(reflection.get('user_id', ''))
+            self.reflection_ids.append(reflection_id)
+            self.doc_numbers[reflection_id] = doc
+            self.doc_lengths.append(len(tokens))
+            self.doc_days.append(day)
+            self.doc_users.append(user)
+            self.user_docs[user].append(doc)
+            self.total_length += len(tokens)
+
+            for term, tf in counts.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = (array('I'), array('H'))
+                posting[0].append(doc)
+                posting[1].append(min(tf, 65535))
+        return True
+
+    def build(self, reflections: Iterable[Dict[str, Any]]) -> int:
+        """Index every reflection from an iterable (already-indexed ones are skipped)"""
+        added = sum(1 for reflection in reflections if self.add(reflection))
+        self.built = True
+        return added
+
+    def search(self, query: str, user_id: Optional[str] = None, since: Optional[date] = None,
+               until: Optional[date] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the top `limit` reflections for a query, best first"""
+        terms = set(tokenize(query))
+        if not terms or not self.reflection_ids:
+            return []
+
+        with self._lock:
+            doc_count = len(self.reflection_ids)
+            avg_length = self.total_length / doc_count or 1.0
+            user_filter = self.user_numbers.get(user_id) if user_id else None
+            if user_id and user_filter is None:
+                return []
+            since_day = since.toordinal() if since else None
+            until_day = until.toordinal() if until else None
+            doc_lengths, doc_days, doc_users = self.doc_lengths, self.doc_days, self.doc_users
+            k1, b = self.K1, self.B
+
+            # Candidate document range from the date filter when days are in order
+            first_doc, end_doc = 0, doc_count
+            if self.days_sorted:
+                if since_day is not None:
+                    first_doc = bisect_left(doc_days, since_day, 0, doc_count)
+                if until_day is not None:
+                    end_doc = bisect_right(doc_days, until_day, 0, doc_count)
+                since_day = until_day = None
+
+            def in_dates(doc: int) -> bool:
+                return ((since_day is None or doc_days[doc] >= since_day) and
+                        (until_day is None or doc_days[doc] <= until_day))
+
+            def bm25(idf: float, tf: int, doc: int) -> float:
+                norm = k1 * (1 - b + b * doc_lengths[doc] / avg_length)
+                return idf * tf * (k1 + 1) / (tf + norm)
+
+            scores = {}
+            for term in terms:
+                posting = self.postings.get(term)
+                if posting is None:
+                    continue
+                docs, frequencies = posting
+                df = len(docs)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+                if user_filter is not None:
+                    # Few docs per user: look each one up in the sorted posting list
+                    for doc in self.user_docs[user_filter]:
+                        if doc < first_doc or doc >= end_doc or not in_dates(doc):
+                            continue
+                        i = bisect_left(docs, doc)
+                        if i < df and docs[i] == doc:
+                            scores[doc] = scores.get(doc, 0.0) + bm25(idf, frequencies[i], doc)
+                    continue
+
+                start = bisect_left(docs, first_doc) if first_doc else 0
+                stop = bisect_left(docs, end_doc) if end_doc < doc_count else df
+                for i in range(start, stop):
+                    doc = docs[i]
+                    if in_dates(doc):
+                        scores[doc] = scores.get(doc, 0.0) + bm25(idf, frequencies[i], doc)
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [{
+                'reflection_id': self.reflection_ids[doc],
+                'user_id': self.users[doc_users[doc]],
+                'date': date.fromordinal(doc_days[doc]).isoformat() if doc_days[doc] else None,
+                'score': round(score, 4)
+            } for doc, score in top]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index size figures"""
+        return {
+            'documents': len(self.reflection_ids),
+            'terms': len(self.postings),
+            'postings': sum(len(docs) for docs, _ in self.postings.values()),
+            'users': len(self.users)
+        }
+
+    def _user_number(self, user_id: str) -> int:
+        """Intern a user ID"""
+        number = self.user_numbers.get(user_id)
+        if number is None:
+            number = self.user_numbers[user_id] = len(self.users)
+            self.users.append(user_id)
+            self.user_docs.append(array('I'))
+        return number
+
+# Global reflection search index instance
+search_index = ReflectionSearchIndex()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+ClearNext Journey Simulator
+Fast-forwards synthetic students through whole journeys on a manual clock
+
+Usage:
+    python simulate.py --users 2000 --activity 0.85
+    python simulate.py --users 500 --days 30 --output simulation.json
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+os.environ.setdefault('USE_MOCK_DB', 'true')
+
+from models.user import User
+from utils.clock import clock, ManualClock
+from utils.mock_db import MockDatabase
+from utils.events import event_bus
+from utils.activity_calendar import ANY_ACTIVITY
+from services.event_consumers import register_consumers
+from services.task_service import TaskService
+from services.reflection_service import ReflectionService
+from services.activity_service import ActivityService
+
+STATUSES = ['Student', 'Professional', 'Other']
+CONFUSION_AREAS = ['Career', 'Learning']
+STRUGGLE_TYPES = ['Motivation', 'Time', 'Concepts']
+MOODS = ['low', 'okay', 'good']
+
+REFLECTION_SAMPLES = [
+    ("I learned how to break a big topic into smaller study blocks",
+     "I felt focused at first and a little tired by the end",
+     "Tomorrow I will start earlier and take short breaks"),
+    ("Researching career paths showed me which skills I am missing",
+     "I feel more confident because I have a clearer plan now",
+     "I want to talk to someone working in the field next week"),
+    ("Practising with examples made the concept finally make sense",
+     "I was frustrated in the beginning but proud once it clicked",
+     "Next time I will write down questions as soon as I get stuck"),
+]
+
+def create_users(db: MockDatabase, count: int, rng: random.Random) -> list:
+    """Create guest users with random profiles on the current simulated day"""
+    user_ids = []
+    for index in range(count):
+        user = User(
+            user_id=f"sim_{index}",
+            name=f"Sim Student {index}",
+            status=rng.choice(STATUSES),
+            confusion_area=rng.choice(CONFUSION_AREAS),
+            struggle_type=rng.choice(STRUGGLE_TYPES),
+            journey_days=rng.choice([7, 14, 21])
+        )
+        user_ids.append(db.create_user(user.to_dict())['user_id'])
+    return user_ids
+
+def simulate_day(db: MockDatabase, task_service: TaskService, reflection_service: ReflectionService,
+                 user_ids: list, activity: float, rng: random.Random) -> dict:
+    """Run one simulated day: each still-active user shows up with probability `activity`"""
+    counts = {'tasks_completed': 0, 'reflections': 0, 'skipped': 0}
+    for user_id in user_ids:
+        user = db.get_user(user_id)
+        if user['current_day'] > user['journey_days']:
+            continue
+        if rng.random() > activity:
+            counts['skipped'] += 1
+            continue
+
+        task = task_service.get_or_create_today_task(user_id, user)
+        if not task:
+            continue
+        task_service.complete_task(task.task_id, 'Done')
+        counts['tasks_completed'] += 1
+
+        learning, feeling, improvement = rng.choice(REFLECTION_SAMPLES)
+        reflection_service.submit_reflection({
+            'user_id': user_id,
+            'task_id': task.task_id,
+            'day_number': task.day_number,
+            'learning': learning,
+            'feeling': feeling,
+            'improvement': improvement,
+            'mood_after': rng.choice(MOODS),
+            'honesty_confirmed': True
+        })
+        counts['reflections'] += 1
+
+    # Deliver progress/activity side effects before the clock moves on
+    event_bus.flush()
+    return counts
+
+def summarise(db: MockDatabase, user_ids: list, activity_service: ActivityService) -> dict:
+    """Collect journey, streak and achievement outcomes"""
+    completed = 0
+    longest_streaks = []
+    achievements = {}
+    for user_id in user_ids:
+        user = db.get_user(user_id)
+        if user['current_day'] > user['journey_days']:
+            completed += 1
+        calendar = activity_service.get_calendar(user_id, user)
+        longest_streaks.append(calendar.longest_streak(ANY_ACTIVITY) if calendar else 0)
+        for achievement in (db.get_progress(user_id) or {}).get('achievements', []):
+            achievements[achievement] = achievements.get(achievement, 0) + 1
+
+    return {
+        'users': len(user_ids),
+        'journeys_completed': completed,
+        'completion_rate': round(completed / len(user_ids) * 100, 1) if user_ids else 0,
+        'average_longest_streak': round(sum(longest_streaks) / len(longest_streaks), 2) if longest_streaks else 0,
+        'achievements': dict(sorted(achievements.items()))
+    }
+
+def main():
+    """Main simulator function"""
+    parser = argparse.ArgumentParser(description='ClearNext journey simulator')
+    parser.add_argument('--users', type=int, default=1000, help='Number of simulated students')
+    parser.add_argument('--days', type=int, default=28, help='Simulated days to run')
+    parser.add_argument('--activity', type=float, default=0.85, help='Chance a student shows up on a given day')
+    parser.add_argument('--start', default='2025-01-06', help='Simulated start date (YYYY-MM-DD)')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Optional JSON report path')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    manual_clock = clock.use(ManualClock(datetime.fromisoformat(args.start).replace(hour=9)))
+    db = MockDatabase()
+    register_consumers(event_bus, db)
+    task_service = TaskService(db)
+    reflection_service = ReflectionService(db)
+
+    print("⏩ ClearNext Journey Simulator")
+    print("=" * 40)
+    print(f"👥 Students: {args.users}  📅 Days: {args.days}  🎲 Activity: {args.activity:.0%}")
+
+    started = time.perf_counter()
+    user_ids = create_users(db, args.users, rng)
+    for day in range(1, args.days + 1):
+        counts = simulate_day(db, task_service, reflection_service, user_ids, args.activity, rng)
+        print(f"   day {day:>3} {manual_clock.today()}  ✅ {counts['tasks_completed']:>6} tasks  "
+              f"📝 {counts['reflections']:>6} reflections  💤 {counts['skipped']:>6} skipped")
+        manual_clock.advance(days=1)
+    elapsed = time.perf_counter() - started
+
+    summary = summarise(db, user_ids, ActivityService(db))
+    summary['elapsed_seconds'] = round(elapsed, 3)
+    summary['task_generation'] = task_service.get_generation_stats()['task_content']
+    clock.reset()
+
+    print("=" * 40)
+    print(f"🏁 Journeys completed: {summary['journeys_completed']}/{summary['users']} ({summary['completion_rate']}%)")
+    print(f"🔥 Average longest streak: {summary['average_longest_streak']} days")
+    print(f"🏆 Achievements: {summary['achievements']}")
+    generation = summary['task_generation']
+    print(f"🧠 Task texts generated: {generation['misses']} for {generation['hits'] + generation['misses']} "
+          f"tasks (hit rate {generation['hit_rate']})")
+    print(f"⏱️ Simulated {args.days} days in {elapsed:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Report saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Set
+from urllib.parse import unquote, urlsplit
+from config import Config
+from utils.metrics import metrics
+
+EVENTS_PATH = re.compile(r'^/api/events/([^/]+)$')
+MAX_HEADER_BYTES = 8192
+MAX_MESSAGE_BYTES = 1024 * 1024
+LISTEN_RETRY_SECONDS = 30
+PUBLISH_TOKEN_HEADER = 'x-publish-token'
+
+def publish_token() -> str:
+    """Credential a worker's PUBLISH stream presents: an HMAC of SECRET_KEY, never the key itself"""
+    return hmac.new(Config.SECRET_KEY.encode(), b'sse-publish', hashlib.sha256).hexdigest()
+
+def format_event(event: str, data: Dict[str, Any], event_id: str = None) -> bytes:
+    """Encode one server-sent event"""
+    lines = f"id: {event_id}\n" if event_id else ''
+    return f"{lines}event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+class SSEConnection(asyncio.Protocol):
+    """One EventSource connection: parses the GET, then only receives writes.
+
+    A bare protocol (no StreamReader/Writer or task per connection) keeps an
+    idle subscriber down to this object plus its socket transport.
+    """
+
+    __slots__ = ('hub', 'transport', 'buffer', 'user_id', 'open', 'header_timer', 'publisher')
+
+    def __init__(self, hub: 'SSEHub'):
+        self.hub = hub
+        self.transport = None
+        self.buffer = b''
+        self.user_id = None
+        self.open = False
+        self.header_timer = None
+        self.publisher = False  # Another worker's publish stream rather than a browser tab
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.header_timer = self.hub.loop.call_later(10, transport.close)
+
+    def data_received(self, data: bytes):
+        if self.publisher:
+            self.buffer += data
+            *messages, self.buffer = self.buffer.split(b'\n')
+            for message in messages:
+                self.hub.receive(message)
+            if len(self.buffer) > MAX_MESSAGE_BYTES:
+                self.transport.close()
+            return
+        if self.user_id is not None:
+            return  # Clients send nothing after the request; ignore keep-alive noise
+        self.buffer += data
+        if b'\r\n\r\n' not in self.buffer:
+            if len(self.buffer) > MAX_HEADER_BYTES:
+                self.transport.close()
+            return
+        self.header_timer.cancel()
+        head, _, rest = self.buffer.partition(b'\r\n\r\n')
+        self.buffer = b''
+        self.hub.handle_request(self, head.decode('latin-1'))
+        if self.publisher and rest:
+            self.data_received(rest)
+
+    def connection_lost(self, exc):
+        if self.header_timer:
+            self.header_timer.cancel()
+        self.hub.remove(self)
+
+    def send(self, payload: bytes) -> bool:
+        """Write an event; slow clients whose buffer keeps growing are dropped"""
+        if self.transport.get_write_buffer_size() > self.hub.max_buffer:
+            metrics.inc('clearnext_sse_dropped_total', (('reason', 'slow_client'),))
+            self.transport.close()
+            return False
+        self.transport.write(payload)
+        return True
+
+class SSEHub:
+    """Per-user server-sent event channels for many idle browser tabs.
+
+    Connections are served by an asyncio listener on its own port and
+    thread (SSE_PORT), so holding tens of thousands of open EventSource
+    connections costs memory, not threads; Flask workers are never tied up.
+    Any thread may `publish`: the event is encoded once and written to every
+    tab of that user on the hub loop. `publish_later` schedules an event
+    (e.g. a task unlocking tomorrow morning) as one loop timer per listening
+    user. One heartbeat pass keeps every connection alive through proxies.
+
+    Under a multi-worker server the first worker to bind SSE_PORT holds
+    every connection. The others forward their publishes to it over one
+    persistent `PUBLISH` stream from the same host, so an event raised in
+    any worker reaches every tab. The stream must carry a token derived
+    from SECRET_KEY: behind a same-host proxy every browser also connects
+    from loopback, so the peer address alone proves nothing. Forwarders retry the bind periodically and take over
+    if the listening worker goes away. Workers on other hosts need a shared
+    broker instead.
+    """
+
+    def __init__(self, host: str = None, port: int = None, heartbeat: float = None, max_buffer: int = 64 * 1024):
+        self.host = host or Config.SSE_HOST
+        self.port = port or Config.SSE_PORT
+        self.heartbeat = heartbeat or Config.SSE_HEARTBEAT
+        self.max_buffer = max_buffer
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server = None
+        self.on_connect: Optional[Callable[[str], Optional[List[tuple]]]] = None
+        self.channels: Dict[str, Set[SSEConnection]] = {}
+        self.timers: Dict[str, asyncio.TimerHandle] = {}
+        # Only touched on the hub loop, except `forwarded` (under _forward_lock)
+        self.stats = {'connections': 0, 'opened': 0, 'published': 0, 'delivered': 0, 'forwarded': 0}
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='sse-connect')
+        self._start_lock = threading.Lock()
+        self._forwarding = False
+        self._forwarder: Optional[socket.socket] = None
+        self._forward_lock = threading.Lock()
+        self._retry_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.loop is not None
+
+    def start(self, on_connect: Callable[[str], Optional[List[tuple]]] = None) -> bool:
+        """Start the listener thread, or forward to the worker that has it.
+
+        Idempotent. A worker that could not bind retries on a timer every
+        LISTEN_RETRY_SECONDS, so it takes over if the listening worker exits.
+
+        on_connect(user_id) returns the events a new subscriber gets straight
+        away as (event, data) pairs, plus (event, data, delay) triples to
+        schedule, or None to refuse an unknown user.
+        """
+        if self.running or time.monotonic() < self._retry_at:
+            return self.running
+        with self._start_lock:
+            if self.running or time.monotonic() < self._retry_at:
+                return self.running
+            self._retry_at = time.monotonic() + LISTEN_RETRY_SECONDS
+            self.on_connect = on_connect or self.on_connect
+            loop = asyncio.new_event_loop()
+            try:
+                self.server = loop.run_until_complete(loop.create_server(
+                    lambda: SSEConnection(self), self.host, self.port, backlog=4096, reuse_address=True))
+            except OSError as e:
+                loop.close()
+                if not self._forwarding:
+                    print(f"📡 SSE port {self.port} in use ({e}); forwarding live events to the worker that holds it")
+                    self._forwarding = True
+                retry = threading.Timer(LISTEN_RETRY_SECONDS, self._retry_listen)
+                retry.daemon = True
+                retry.start()
+                return False
+            with self._forward_lock:
+                self._forwarding = False
+                self._close_forwarder()
+            loop.call_later(self.heartbeat, self._heartbeat)
+            threading.Thread(target=loop.run_forever, name='sse-hub', daemon=True).start()
+            self.loop = loop
+            return True
+
+    def _retry_listen(self):
+        """Timer callback: try to take the listening port over"""
+        self._retry_at = 0.0
+        self.start()
+
+    def has_listeners(self, user_id: str) -> bool:
+        """Whether any tab of the user may be connected (lets publishers skip building events)"""
+        if self.running:
+            return user_id in self.channels
+        return self._forwarding  # Only the listening worker knows
+
+    def publish(self, user_id: str, event: str, data: Dict[str, Any]) -> bool:
+        """Push an event to every open tab of a user (thread-safe; no-op if nobody is listening)"""
+        payload = format_event(event, data)
+        if self.running:
+            self.loop.call_soon_threadsafe(self._publish, user_id, payload)
+            return True
+        return self._forward(user_id, None, payload)
+
+    def publish_later(self, user_id: str, delay: float, event: str, data: Dict[str, Any]) -> bool:
+        """Push an event after `delay` seconds, replacing the user's earlier pending event"""
+        payload = format_event(event, data)
+        if self.running:
+            self.loop.call_soon_threadsafe(self._schedule, user_id, delay, payload)
+            return True
+        return self._forward(user_id, delay, payload)
+
+    def handle_request(self, connection: SSEConnection, head: str):
+        """Validate the GET and subscribe the connection (runs on the hub loop)"""
+        request_line, _, header_block = head.partition('\r\n')
+        parts = request_line.split(' ')
+        headers = {}
+        for line in header_block.split('\r\n'):
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if parts[0] == 'PUBLISH':
+            if self._is_local(connection) and hmac.compare_digest(
+                    headers.get(PUBLISH_TOKEN_HEADER, '').encode(), publish_token().encode()):
+                connection.publisher = True
+            else:
+                metrics.inc('clearnext_sse_dropped_total', (('reason', 'publish_refused'),))
+                self._reject(connection, '403 Forbidden')
+            return
+        match = EVENTS_PATH.match(urlsplit(parts[1]).path) if len(parts) == 3 else None
+        if parts[0] != 'GET' or not match:
+            self._reject(connection, '404 Not Found')
+            return
+
+        connection.user_id = unquote(match.group(1))
+
+        future = self.loop.run_in_executor(self._executor, self._initial_events, connection.user_id)
+        future.add_done_callback(lambda done: self._open(connection, headers.get('origin'), done))
+
+    def remove(self, connection: SSEConnection):
+        """Forget a closed connection"""
+        if not connection.open:
+            return
+        connection.open = False
+        self.stats['connections'] -= 1
+        channel = self.channels.get(connection.user_id)
+        if channel is not None:
+            channel.discard(connection)
+            if not channel:
+                del self.channels[connection.user_id]
+                timer = self.timers.pop(connection.user_id, None)
+                if timer:
+                    timer.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get connection counts for the health check"""
+        mode = 'listener' if self.running else 'forwarder' if self._forwarding else 'off'
+        return {**self.stats, 'running': self.running, 'mode': mode, 'users': len(self.channels),
+                'scheduled': len(self.timers), 'port': self.port}
+
+    def _initial_events(self, user_id: str) -> Optional[List[tuple]]:
+        """Ask the app what a new subscriber should see first (off the loop: may hit the DB)"""
+        return self.on_connect(user_id) if self.on_connect else []
+
+    def _open(self, connection: SSEConnection, origin: Optional[str], done: asyncio.Future):
+        """Send response headers and register the connection"""
+        if connection.transport.is_closing():
+            return
+        initial = None if done.exception() else done.result()
+        if initial is None:
+            self._reject(connection, '404 Not Found')
+            return
+
+        cors = f"Access-Control-Allow-Origin: {origin}\r\nVary: Origin\r\n" if origin in Config.CORS_ORIGINS else ''
+        connection.transport.write(
+            ("HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+             f"Connection: keep-alive\r\n{cors}\r\nretry: 5000\n\n").encode()
+            + b''.join(format_event(event[0], event[1]) for event in initial if len(event) == 2))
+        connection.open = True
+        self.channels.setdefault(connection.user_id, set()).add(connection)
+        self.stats['connections'] += 1
+        self.stats['opened'] += 1
+        for event, data, delay in (event for event in initial if len(event) == 3):
+            self._schedule(connection.user_id, delay, format_event(event, data))
+
+    def _reject(self, connection: SSEConnection, status: str):
+        """Answer a bad request and hang up"""
+        connection.transport.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        connection.transport.close()
+
+    def receive(self, message: bytes):
+        """Apply one forwarded event: [user_id, delay or null, encoded event] (hub loop)"""
+        try:
+            user_id, delay, payload = json.loads(message)
+        except ValueError:
+            metrics.inc('clearnext_sse_dropped_total', (('reason', 'bad_message'),))
+            return
+        if delay is None:
+            self._publish(user_id, payload.encode())
+        else:
+            self._schedule(user_id, delay, payload.encode())
+
+    def _forward(self, user_id: str, delay: Optional[float], payload: bytes) -> bool:
+        """Hand an event to the listening worker; dropped (and counted) if it cannot be reached"""
+        if not self._forwarding:
+            return False
+        message = json.dumps([user_id, delay, payload.decode()]).encode() + b'\n'
+        with self._forward_lock:
+            try:
+                if self._forwarder is None:
+                    host = '127.0.0.1' if self.host in ('', '0.0.0.0', '::') else self.host
+                    self._forwarder = socket.create_connection((host, self.port), timeout=1.0)
+                    self._forwarder.sendall(f"PUBLISH /api/events HTTP/1.1\r\nX-Publish-Token: {publish_token()}\r\n\r\n".encode())
+                self._forwarder.sendall(message)
+            except OSError:
+                self._close_forwarder()
+                metrics.inc('clearnext_sse_dropped_total', (('reason', 'forward_failed'),))
+                return False
+            self.stats['forwarded'] += 1
+        return True
+
+    def _close_forwarder(self):
+        """Drop the publish stream; the next forward reconnects"""
+        if self._forwarder is not None:
+            self._forwarder.close()
+            self._forwarder = None
+
+    def _is_local(self, connection: SSEConnection) -> bool:
+        """Whether a connection comes from this host (publish streams are not accepted from elsewhere)"""
+        peer = connection.transport.get_extra_info('peername')
+        local = connection.transport.get_extra_info('sockname')
+        return bool(peer) and (peer[0] in ('127.0.0.1', '::1') or (bool(local) and peer[0] == local[0]))
+
+    def _publish(self, user_id: str, payload: bytes):
+        """Count and fan out a published event (hub loop)"""
+        self.stats['published'] += 1
+        self._fanout(user_id, payload)
+
+    def _fanout(self, user_id: str, payload: bytes):
+        """Write an encoded event to a user's connections (hub loop)"""
+        for connection in list(self.channels.get(user_id, ())):
+            if connection.send(payload):
+                self.stats['delivered'] += 1
+
+    def _schedule(self, user_id: str, delay: float, payload: bytes):
+        """Arm the user's pending-event timer (hub loop)"""
+        if user_id not in self.channels:
+            return  # Nobody listening; a reconnecting tab gets the current state on connect
+        timer = self.timers.pop(user_id, None)
+        if timer:
+            timer.cancel()
+
+        def fire():
+            self.timers.pop(user_id, None)
+            self._fanout(user_id, payload)
+
+        self.timers[user_id] = self.loop.call_later(max(0.0, delay), fire)
+
+    def _heartbeat(self):
+        """Comment line to every connection so idle proxies keep them open"""
+        ping = b': ping\n\n'
+        for channel in list(self.channels.values()):
+            for connection in list(channel):
+                connection.send(ping)
+        self.loop.call_later(self.heartbeat, self._heartbeat)
+
+# Global SSE hub instance
+sse_hub = SSEHub()
@@ -1,6 +1,6 @@
 // Frontend Integration - Task Rules and Reflection Validation Client
 class TaskRulesClient {
-    constructor(baseUrl = 'http://localhost:3000') {
+    constructor(baseUrl = 'http://localhost:5000') {
         this.baseUrl = baseUrl;
         this.token = localStorage.getItem('clearnext_token');
         this.userId = localStorage.getItem('clearnext_user_id');
@@ -101,10 +101,10 @@ class TaskRulesClient {
         const status = await this.checkTaskStatus();
         
         if (!status.success) {
-            return { can_access: false, reason: 'error', message: status.error };
+            return { can_access: false, reason: 'error', message: status.error || status.message };
         }
 
-        const { can_generate_task, time_window } = status;
+        const { can_generate_task, time_window } = status.data;
         
         if (!can_generate_task.can_generate) {
             return {
@@ -138,7 +138,7 @@ class TaskRulesClient {
             };
         }
 
-        const { validation: validationResult } = validation;
+        const { validation: validationResult } = validation.data;
         
         if (!validationResult.can_submit) {
             return {
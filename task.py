@@ -1,5 +1,5 @@
-from datetime import datetime
 from typing import Dict, Any, Optional
+from utils.clock import clock
 
 class Task:
     """Task model for ClearNext"""
@@ -18,7 +18,7 @@ class Task:
         self.completed_at = None
         self.response = None
         self.response_at = None
-        self.generated_at = datetime.utcnow()
+        self.generated_at = clock.utcnow()
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert task to dictionary"""
@@ -40,9 +40,9 @@ class Task:
     def complete(self, response: str = None):
         """Mark task as completed"""
         self.completed = True
-        self.completed_at = datetime.utcnow()
+        self.completed_at = clock.utcnow()
         self.response = response
-        self.response_at = datetime.utcnow()
+        self.response_at = clock.utcnow()
     
     def is_completed(self) -> bool:
         """Check if task is completed"""
@@ -51,7 +51,7 @@ class Task:
     def update_content(self, new_content: str):
         """Update task content"""
         self.task_content = new_content
-        self.generated_at = datetime.utcnow()
+        self.generated_at = clock.utcnow()
 
 class Reflection:
     """Reflection model for ClearNext"""
@@ -71,8 +71,10 @@ class Reflection:
         self.honesty_confirmed = False
         self.word_count = len(learning.split()) + len(feeling.split()) + len(improvement.split())
         self.anti_cheat_score = 0.5
+        self.near_duplicate_of = None
+        self.near_duplicate_similarity = None
         self.micro_appreciation = ""
-        self.created_at = datetime.utcnow()
+        self.created_at = clock.utcnow()
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert reflection to dictionary"""
@@ -89,6 +91,8 @@ class Reflection:
             'honesty_confirmed': self.honesty_confirmed,
             'word_count': self.word_count,
             'anti_cheat_score': self.anti_cheat_score,
+            'near_duplicate_of': self.near_duplicate_of,
+            'near_duplicate_similarity': self.near_duplicate_similarity,
             'micro_appreciation': self.micro_appreciation,
             'created_at': self.created_at.isoformat()
         }
@@ -101,8 +105,20 @@ class Reflection:
         """Calculate reflection quality score"""
         from utils.validators import calculate_reflection_score
         
-        total_text = f"{self.learning} {self.feeling} {self.improvement}"
-        self.anti_cheat_score = calculate_reflection_score(total_text)
+        self.anti_cheat_score = calculate_reflection_score(self.full_text())
+        return self.anti_cheat_score
+    
+    def full_text(self) -> str:
+        """All reflection sections as one text"""
+        return f"{self.learning} {self.feeling} {self.improvement}"
+    
+    def flag_near_duplicate(self, match: Dict[str, Any]) -> float:
+        """Lower the anti-cheat score for text recycled from another reflection"""
+        from utils.validators import near_duplicate_penalty
+        
+        self.near_duplicate_of = match['reflection_id']
+        self.near_duplicate_similarity = match['similarity']  # Kept so re-scoring can re-apply the penalty
+        self.anti_cheat_score = near_duplicate_penalty(self.anti_cheat_score, match['similarity'])
         return self.anti_cheat_score
     
     def generate_appreciation(self, mood: str = "okay") -> str:
@@ -140,10 +156,10 @@ class Progress:
         self.total_days_completed = 0
         self.journey_completion = 0.0
         self.total_characters_written = 0
-        self.last_activity_date = datetime.utcnow()
+        self.last_activity_date = clock.utcnow()
         self.achievements = []
-        self.created_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
+        self.created_at = clock.utcnow()
+        self.updated_at = clock.utcnow()
         self.journey_days = journey_days
     
     def to_dict(self) -> Dict[str, Any]:
@@ -170,26 +186,25 @@ class Progress:
                 self.longest_streak = self.current_streak
         else:
             self.current_streak = 1
-        self.updated_at = datetime.utcnow()
+        self.updated_at = clock.utcnow()
     
     def complete_day(self, characters_written: int = 0):
         """Mark a day as completed"""
         self.total_days_completed += 1
         self.total_characters_written += characters_written
         self.journey_completion = (self.total_days_completed / self.journey_days) * 100
-        self.last_activity_date = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
+        self.last_activity_date = clock.utcnow()
+        self.updated_at = clock.utcnow()
         
         # Check achievements
         self.check_achievements()
     
     def check_achievements(self):
         """Check and award achievements"""
-        if self.current_streak >= 7 and 'first_week' not in self.achievements:
-            self.achievements.append('first_week')
+        from services.achievement_engine import achievement_engine
         
-        if self.current_streak >= 30 and 'monthly_champion' not in self.achievements:
-            self.achievements.append('monthly_champion')
-        
-        if self.journey_completion >= 100.0 and 'journey_complete' not in self.achievements:
-            self.achievements.append('journey_complete')
+        self.achievements.extend(achievement_engine.evaluate({
+            'current_streak': self.current_streak,
+            'total_days_completed': self.total_days_completed,
+            'journey_completion': self.journey_completion
+        }, self.achievements))
@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
-from models.task import Task
 from utils.database import db
-from utils.validators import validate_task_window, format_response
+from utils.validators import validate_task_window, validate_batch_ids, format_response
+from config import Config
+from utils.http_cache import conditional_response
+from utils.fields import parse_fields, projection_for, select_fields
 from services.task_service import TaskService
+from services.activity_service import ActivityService
 
 task_bp = Blueprint('tasks', __name__)
 
@@ -41,33 +43,19 @@ def complete_task(task_id):
         data = request.get_json() or {}
         response = data.get('response', '')
         
-        # Get task
-        task = db.get_task(task_id)
-        if not task:
+        result = TaskService(db).complete_task(task_id, response)
+        if result is None:
             return format_response(False, "Task not found"), 404
+        if result['already_completed']:
+            return format_response(False, "Task already completed", {
+                'task_completed': True,
+                'completed_at': result['completed_at']
+            }), 409
         
-        # Update task completion
-        task_obj = Task(
-            task_id=task['task_id'],
-            user_id=task['user_id'],
-            day_number=task['day_number'],
-            task_content=task['task_content'],
-            task_type=task.get('task_type', 'learning'),
-            difficulty=task.get('difficulty', 'medium'),
-            mood_adapted=task.get('mood_adapted', 'okay')
-        )
-        task_obj.complete(response)
-        
-        # Update in database
-        success = db.update_user(task['user_id'], {
-            'current_day': task['day_number'] + 1,
-            'last_active_date': datetime.utcnow().isoformat()
-        })
-        
-        if success:
+        if result['task_completed']:
             return format_response(True, "Task completed successfully", {
                 'task_completed': True,
-                'next_day': task['day_number'] + 1
+                'next_day': result['next_day']
             })
         else:
             return format_response(False, "Failed to update user progress"), 500
@@ -75,30 +63,101 @@ def complete_task(task_id):
     except Exception as e:
         return format_response(False, f"Error completing task: {str(e)}"), 500
 
+@task_bp.route('/complete-batch', methods=['POST'])
+def complete_tasks_batch():
+    """Complete several tasks in one request ({"completions": [{"task_id", "response"}]})"""
+    try:
+        completions = (request.get_json() or {}).get('completions')
+        if not isinstance(completions, list) or not completions:
+            return format_response(False, "completions must be a non-empty list"), 400
+        if len(completions) > Config.MAX_BATCH_SIZE:
+            return format_response(False, f"At most {Config.MAX_BATCH_SIZE} completions per request"), 400
+        if not all(isinstance(item, dict) and item.get('task_id') for item in completions):
+            return format_response(False, "Every completion needs a task_id"), 400
+        
+        results = TaskService(db).complete_tasks(completions)
+        completed = sum(1 for result in results if result['status'] == 'completed')
+        
+        return format_response(True, f"Completed {completed} of {len(results)} tasks", {
+            'results': results,
+            'completed': completed,
+            'requested': len(results)
+        })
+        
+    except Exception as e:
+        return format_response(False, f"Error completing tasks: {str(e)}"), 500
+
+@task_bp.route('/batch', methods=['GET', 'POST'])
+def get_tasks_batch():
+    """Get several tasks in one request (?ids=a,b or {"ids": [...]})"""
+    try:
+        raw_ids = request.args.get('ids') if request.method == 'GET' else (request.get_json() or {}).get('ids')
+        is_valid, message, task_ids = validate_batch_ids(raw_ids)
+        if not is_valid:
+            return format_response(False, message), 400
+        
+        tasks = {task['task_id']: task for task in db.get_tasks(task_ids)}
+        results = [{'task_id': task_id, 'status': 'ok', 'task': tasks[task_id]} if task_id in tasks
+                   else {'task_id': task_id, 'status': 'not_found'} for task_id in task_ids]
+        
+        return format_response(True, "Tasks retrieved", {
+            'results': results,
+            'found': len(tasks),
+            'requested': len(task_ids)
+        })
+        
+    except Exception as e:
+        return format_response(False, f"Error getting tasks: {str(e)}"), 500
+
 @task_bp.route('/user/<user_id>', methods=['GET'])
 def get_user_tasks(user_id):
-    """Get all tasks for a user"""
+    """Get all tasks for a user (?fields=a,b returns only those fields)"""
     try:
-        tasks = db.get_user_tasks(user_id)
+        is_valid, message, fields = parse_fields(request.args.get('fields'))
+        if not is_valid:
+            return format_response(False, message), 400
         
-        return format_response(True, "User tasks retrieved", {
-            'tasks': tasks,
+        tasks = db.get_user_tasks(user_id, projection_for('task', fields))
+        
+        return conditional_response('task_list', 'task', tasks, lambda: format_response(True, "User tasks retrieved", {
+            'tasks': select_fields('task', tasks, fields),
             'total_tasks': len(tasks)
-        })
+        }), variant=fields)
         
     except Exception as e:
         return format_response(False, f"Error getting user tasks: {str(e)}"), 500
 
 @task_bp.route('/<task_id>', methods=['GET'])
 def get_task(task_id):
-    """Get specific task by ID"""
+    """Get specific task by ID (?fields=a,b returns only those fields)"""
     try:
-        task = db.get_task(task_id)
+        is_valid, message, fields = parse_fields(request.args.get('fields'))
+        if not is_valid:
+            return format_response(False, message), 400
+        
+        task = db.get_task(task_id, projection_for('task', fields))
         
         if not task:
             return format_response(False, "Task not found"), 404
         
-        return format_response(True, "Task retrieved", {'task': task})
+        return conditional_response('task', 'task', [task],
+                                    lambda: format_response(True, "Task retrieved", {
+                                        'task': select_fields('task', [task], fields)[0]
+                                    }), variant=fields)
         
     except Exception as e:
         return format_response(False, f"Error getting task: {str(e)}"), 500
+
+@task_bp.route('/calendar/<user_id>', methods=['GET'])
+def get_activity_calendar(user_id):
+    """Get activity heatmap, streaks and missed days for a user"""
+    try:
+        calendar = ActivityService(db).get_calendar_summary(user_id)
+        
+        if calendar is None:
+            return format_response(False, "User not found"), 404
+        
+        return format_response(True, "Activity calendar retrieved", {'calendar': calendar})
+        
+    except Exception as e:
+        return format_response(False, f"Error getting activity calendar: {str(e)}"), 500
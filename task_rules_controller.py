@@ -0,0 +1,76 @@
+from flask import Blueprint, request, jsonify
+from utils.database import db
+from utils.validators import format_response
+from services.task_rules_service import TaskRulesService
+
+task_rules_bp = Blueprint('task_rules', __name__)
+
+@task_rules_bp.route('/<user_id>/status', methods=['GET'])
+def get_task_status(user_id):
+    """Get whether today's task can be taken, with the time window and lock state"""
+    try:
+        user = db.get_user(user_id)
+        if not user:
+            return format_response(False, "User not found"), 404
+        
+        return format_response(True, "Task status retrieved", TaskRulesService(db).task_status(user))
+        
+    except Exception as e:
+        return format_response(False, f"Error getting task status: {str(e)}"), 500
+
+@task_rules_bp.route('/<user_id>/lock-status', methods=['GET'])
+def get_lock_status(user_id):
+    """Get whether the user's next task is locked, and why"""
+    try:
+        user = db.get_user(user_id)
+        if not user:
+            return format_response(False, "User not found"), 404
+        
+        return format_response(True, "Lock status retrieved", TaskRulesService(db).lock_status(user))
+        
+    except Exception as e:
+        return format_response(False, f"Error getting lock status: {str(e)}"), 500
+
+@task_rules_bp.route('/<user_id>/next-available', methods=['GET'])
+def get_next_available(user_id):
+    """Get when the user's next task unlocks"""
+    try:
+        user = db.get_user(user_id)
+        if not user:
+            return format_response(False, "User not found"), 404
+        
+        return format_response(True, "Next available time retrieved", TaskRulesService(db).next_available(user))
+        
+    except Exception as e:
+        return format_response(False, f"Error getting next available time: {str(e)}"), 500
+
+@task_rules_bp.route('/<user_id>/enforce-time-window', methods=['POST'])
+def enforce_time_window(user_id):
+    """Check whether an action is allowed right now"""
+    try:
+        user = db.get_user(user_id)
+        if not user:
+            return format_response(False, "User not found"), 404
+        
+        action = (request.get_json(silent=True) or {}).get('action', 'generate')
+        result = TaskRulesService(db).enforce_time_window(user, action)
+        
+        if not result['allowed']:
+            return format_response(False, result['message'], result), 403
+        
+        return format_response(True, result['message'], result)
+        
+    except Exception as e:
+        return format_response(False, f"Error enforcing time window: {str(e)}"), 500
+
+@task_rules_bp.route('/validate', methods=['POST'])
+def validate_reflection():
+    """Check a reflection draft before it is submitted"""
+    try:
+        data = request.get_json() or {}
+        validation = TaskRulesService(db).validate_reflection(data)
+        
+        return format_response(True, validation['message'], {'validation': validation})
+        
+    except Exception as e:
+        return format_response(False, f"Error validating reflection: {str(e)}"), 500
@@ -0,0 +1,258 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from config import Config
+from utils.activity_calendar import to_date
+from utils.clock import clock as default_clock
+from utils.near_duplicates import near_duplicate_index, minhash_signature
+from utils.validators import validate_task_window, validate_reflection_data, score_reflections
+from services.reflection_service import draft_text
+
+PROFILE_FIELDS = ('status', 'confusion_area', 'struggle_type')
+
+class TaskRulesService:
+    """Daily access rules: task locks, the task window and the daily check.
+
+    Each user record carries a small `daily_state` written when today's task
+    is generated, when it is completed and when the reflection arrives:
+
+        {'day': 'YYYY-MM-DD', 'task_id': ..., 'task_completed': bool,
+         'reflection_completed': bool, 'next_available_at': ISO time}
+
+    Lock state and the next-available time are worked out at those writes,
+    so the polling endpoints only compare a few fields of the user record
+    with the clock and never scan tasks or reflections.
+
+    The task window is server local time, so the day key, window openings
+    and unlock countdowns are all local too. Times sent to clients carry
+    the UTC offset.
+    """
+
+    def __init__(self, db, clock=None):
+        self.db = db
+        self.clock = clock or default_clock
+
+    # ---------- precomputed state (written on generation, completion and reflection) ----------
+
+    def state_for_new_task(self, task_id: str) -> Dict[str, Any]:
+        """Daily state once today's task has been generated"""
+        return {'day': self.local_today().isoformat(), 'task_id': task_id, 'task_completed': False,
+                'reflection_completed': False, 'next_available_at': None}
+
+    def state_for_completion(self, task_id: str) -> Dict[str, Any]:
+        """Daily state once today's task is completed: locked until tomorrow's window opens"""
+        today = self.local_today()
+        return {'day': today.isoformat(), 'task_id': task_id, 'task_completed': True,
+                'reflection_completed': False, 'next_available_at': self.stamp(self.window_start(today + timedelta(days=1)))}
+
+    def state_for_reflection(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Daily state once today's reflection is stored"""
+        today = self.local_today()
+        state = dict(self.todays_state(user) or {'day': today.isoformat(), 'task_id': None, 'task_completed': False})
+        state['reflection_completed'] = True
+        state.setdefault('next_available_at', None)
+        return state
+
+    def record_reflection(self, user_id: str) -> bool:
+        """Mark today's reflection done on the user's daily state"""
+        user = self.db.get_user(user_id)
+        if not user:
+            return False
+        return self.db.update_user(user_id, {'daily_state': self.state_for_reflection(user)})
+
+    # ---------- constant-time reads ----------
+
+    def todays_state(self, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The user's daily state if it is about today"""
+        state = user.get('daily_state')
+        if state and state.get('day') == self.local_today().isoformat():
+            return state
+        return None
+
+    def local_today(self) -> date:
+        """Today's date in server local time, the basis of the task window"""
+        return self.clock.today()
+
+    def stamp(self, moment: datetime) -> str:
+        """ISO form of a local time with its UTC offset, so clients read it unambiguously"""
+        return moment.astimezone().isoformat()
+
+    def as_local(self, value: str) -> datetime:
+        """Naive local time from a stored ISO time (with or without an offset)"""
+        moment = datetime.fromisoformat(value)
+        return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+    def window_start(self, day: date) -> datetime:
+        """When the task window opens on a day"""
+        return datetime.combine(day, time(Config.TASK_WINDOW_START_HOUR))
+
+    def time_window(self) -> Dict[str, Any]:
+        """Whether tasks can be taken right now"""
+        now = self.clock.now()
+        is_valid, message = validate_task_window(now)
+        if is_valid:
+            return {'allowed': True, 'reason': None, 'message': "Task window is open", 'available_at': None}
+        if now.hour < Config.TASK_WINDOW_START_HOUR:
+            return {'allowed': False, 'reason': 'before_window', 'message': message,
+                    'available_at': self.stamp(self.window_start(now.date()))}
+        return {'allowed': False, 'reason': 'after_window', 'message': message,
+                'available_at': self.stamp(self.window_start(now.date() + timedelta(days=1)))}
+
+    def lock_status(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Whether the user can work on a task now, and why not"""
+        if self.is_journey_complete(user):
+            return self._lock('journey_complete', "Your journey is complete!")
+
+        window = self.time_window()
+        if not window['allowed']:
+            reason = 'too_early' if window['reason'] == 'before_window' else 'too_late'
+            return self._lock(reason, window['message'], window['available_at'])
+
+        state = self.todays_state(user)
+        if state and state.get('task_completed'):
+            if not state.get('reflection_completed'):
+                return self._lock('reflection_incomplete', "Complete today's reflection to unlock tomorrow's task.",
+                                  state.get('next_available_at'))
+            return self._lock('completed_today', "You're done for today. Come back tomorrow!",
+                              state.get('next_available_at'))
+
+        return {'locked': False, 'reason': None, 'message': "Today's task is available", 'next_available': None}
+
+    def next_available(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """When the user's next task unlocks"""
+        lock = self.lock_status(user)
+        if not lock['locked'] or not lock['next_available']:
+            return {'available_now': not lock['locked'], 'next_available_at': None, 'seconds_until': 0,
+                    'reason': lock['reason']}
+        next_at = self.as_local(lock['next_available'])
+        return {'available_now': False, 'next_available_at': lock['next_available'],
+                'seconds_until': max(0, int((next_at - self.clock.now()).total_seconds())), 'reason': lock['reason']}
+
+    def push_events(self, user: Dict[str, Any]) -> List[tuple]:
+        """Events for the user's live channel: the current state, plus the unlock if a lock will lift"""
+        action, message, data = self.daily_check(user)
+        lock = self.lock_status(user)
+        events = [('task_state', {'action': action, 'message': message, 'lock_status': lock, **data})]
+        if lock['locked'] and lock['next_available']:
+            unlock = self.next_available(user)
+            events.append(('task_unlocked', {'user_id': user.get('user_id'), 'message': "Your next task is ready!",
+                                             'available_at': unlock['next_available_at']}, unlock['seconds_until']))
+        return events
+
+    def task_status(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Everything the task page needs to decide what to show"""
+        lock = self.lock_status(user)
+        state = self.todays_state(user) or {}
+        return {
+            'can_generate_task': {
+                'can_generate': not lock['locked'],
+                'reason': lock['reason'],
+                'message': lock['message'],
+                'next_available': lock['next_available']
+            },
+            'time_window': self.time_window(),
+            'lock_status': lock,
+            'today': {
+                'task_id': state.get('task_id'),
+                'task_completed': bool(state.get('task_completed')),
+                'reflection_completed': bool(state.get('reflection_completed'))
+            },
+            'current_day': user.get('current_day', 1),
+            'journey_days': user.get('journey_days', 7)
+        }
+
+    def missed_days(self, user: Dict[str, Any]) -> int:
+        """Whole days since the user was last active (0 if active today or yesterday)"""
+        last_active = to_date(user.get('last_active_date'))
+        if last_active is None:
+            return 0
+        return max(0, (self.clock.today() - last_active).days - 1)
+
+    def is_journey_complete(self, user: Dict[str, Any]) -> bool:
+        """Whether the user finished the journey"""
+        return bool(user.get('journey_completed')) or user.get('current_day', 1) > user.get('journey_days', 7)
+
+    def daily_check(self, user: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        """Decide where the app should send the user: (action, message, data)"""
+        state = self.todays_state(user) or {}
+        data = {
+            'current_day': user.get('current_day', 1),
+            'journey_days': user.get('journey_days', 7),
+            'missed_days': self.missed_days(user),
+            'needs_task_generation': not state.get('task_id'),
+            'task_completed': bool(state.get('task_completed')),
+            'reflection_completed': bool(state.get('reflection_completed')),
+            'next_available': state.get('next_available_at')
+        }
+
+        if not user.get('ai_conversation_completed') and not all(user.get(field) for field in PROFILE_FIELDS):
+            return 'redirect_to_ai_conversation', "Let's get to know you first", data
+        if self.is_journey_complete(user):
+            return 'show_completion_dashboard', "Your journey is complete!", data
+        if data['task_completed'] and not data['reflection_completed']:
+            return 'show_reflection_page', "Reflect on today's task to finish the day", data
+        if data['task_completed']:
+            return 'show_completion_dashboard', "You're done for today. Come back tomorrow!", data
+        if data['missed_days'] > 0:
+            return 'show_pause_screen', "We missed you! Pick up where you left off.", data
+        return 'show_today_task', "Today's task is ready", data
+
+    def mark_active(self, user_id: str) -> Optional[str]:
+        """Record that the user opened the app; returns the stored time"""
+        now = self.clock.utcnow().isoformat()
+        return now if self.db.update_user(user_id, {'last_active_date': now}) else None
+
+    def enforce_time_window(self, user: Dict[str, Any], action: str = 'generate') -> Dict[str, Any]:
+        """Check an action against the time window and, for new tasks, the task lock"""
+        window = self.time_window()
+        lock = self.lock_status(user) if action == 'generate' else None
+        blocker = lock if lock and lock['locked'] else (None if window['allowed'] else window)
+        return {
+            'allowed': blocker is None,
+            'action': action,
+            'reason': blocker['reason'] if blocker else None,
+            'message': blocker['message'] if blocker else f"'{action}' is allowed now",
+            'time_window': window,
+            'lock_status': lock
+        }
+
+    # ---------- reflection pre-check ----------
+
+    def validate_reflection(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Check a reflection draft before submission: issues block it, warnings do not"""
+        is_valid, message, details = validate_reflection_data(data)
+        issues, warnings, suggestions = [], [], []
+        if not is_valid:
+            issues.append({'message': message, **details})
+            suggestions.append("Describe what you did, how it felt and what you would change next time.")
+
+        score = score_reflections([draft_text(data)])[0] if is_valid else None
+        if score is not None and score < 0.5:
+            warnings.append({'message': "Your reflection is quite short on detail."})
+            suggestions.append("Add a concrete example from today's task.")
+
+        checkable = is_valid and near_duplicate_index.built
+        match = near_duplicate_index.find(minhash_signature(draft_text(data)), data.get('user_id')) if checkable else None
+        if match:
+            warnings.append({'message': "This looks very similar to an earlier reflection."})
+
+        return {
+            'can_submit': is_valid,
+            'message': "Looks good - ready to submit!" if is_valid else message,
+            'score': round(score, 2) if score is not None else None,
+            'issues': issues,
+            'warnings': warnings,
+            'suggestions': suggestions,
+            'encouragement': self._encouragement(score) if is_valid else None
+        }
+
+    def _encouragement(self, score: float) -> str:
+        """Short note shown with an accepted reflection"""
+        if score >= 0.8:
+            return "Wonderful depth - this is real reflection! 🌟"
+        if score >= 0.5:
+            return "Nice work reflecting on today! 💪"
+        return "Every reflection counts. Keep going! 🌱"
+
+    def _lock(self, reason: str, message: str, next_available: str = None) -> Dict[str, Any]:
+        """Locked status payload"""
+        return {'locked': True, 'reason': reason, 'message': message, 'next_available': next_available}
@@ -1,36 +1,68 @@
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from config import Config
 from models.task import Task
+from prompts.task_prompts import TaskPrompts
+from services.ai_client import ai_client
+from utils.cache import LRUCache
+from utils.clock import clock as default_clock
+from utils.events import event_bus
+from utils.activity_calendar import TASK_COMPLETED, to_date
+from services.activity_service import ActivityService
+from services.task_rules_service import TaskRulesService
 from utils.validators import generate_task_id
 
+PROFILE_FIELDS = (('status', 'Student'), ('confusion_area', 'Career'), ('struggle_type', 'Motivation'))
+
+# Task text and rendered prompts depend only on the profile and the day, so
+# every user sharing both shares one entry: a cohort needs at most
+# (distinct profiles x journey days) generations however many users it has.
+task_content_cache = LRUCache('task_content', Config.TASK_CONTENT_CACHE_SIZE)
+task_prompt_cache = LRUCache('task_prompt', Config.TASK_CONTENT_CACHE_SIZE)
+
+def task_profile_key(user: Dict[str, Any], day_number: int) -> tuple:
+    """(status, confusion_area, struggle_type, day_number) of a user, as written into the task text"""
+    profile = tuple(str(user.get(field) or default) for field, default in PROFILE_FIELDS)
+    return profile + (int(day_number),)
+
+def template_key(value: str) -> str:
+    """Case- and spacing-insensitive form of a profile value, for picking a template"""
+    return ' '.join(value.split()).title()
+
 class TaskService:
     """Service for managing tasks and task generation"""
     
-    def __init__(self, db):
+    def __init__(self, db, clock=None):
         self.db = db
+        self.clock = clock or default_clock
+        self.rules = TaskRulesService(db, self.clock)
+    
+    def find_today_task(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Today's stored task document, completion fields included (never creates one)"""
+        today = self.clock.today()
+        for task in self.db.get_user_tasks(user_id):
+            if to_date(task['created_at']) == today:
+                return task
+        return None
+    
+    def get_today_task(self, user_id: str) -> Optional[Task]:
+        """Get today's task if it was already generated (never creates one)"""
+        task = self.find_today_task(user_id)
+        if task:
+            return Task(
+                task_id=task['task_id'],
+                user_id=task['user_id'],
+                day_number=task['day_number'],
+                task_content=task['task_content'],
+                task_type=task.get('task_type', 'learning'),
+                difficulty=task.get('difficulty', 'medium'),
+                mood_adapted=task.get('mood_adapted', 'okay')
+            )
+        return None
     
     def get_or_create_today_task(self, user_id: str, user: Dict[str, Any]) -> Task:
         """Get existing task for today or create new one"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        # Check if task already exists for today
-        user_tasks = self.db.get_user_tasks(user_id)
-        today_task = None
-        
-        for task in user_tasks:
-            task_date = datetime.fromisoformat(task['created_at']).strftime('%Y-%m-%d')
-            if task_date == today:
-                today_task = Task(
-                    task_id=task['task_id'],
-                    user_id=task['user_id'],
-                    day_number=task['day_number'],
-                    task_content=task['task_content'],
-                    task_type=task.get('task_type', 'learning'),
-                    difficulty=task.get('difficulty', 'medium'),
-                    mood_adapted=task.get('mood_adapted', 'okay')
-                )
-                break
-        
+        today_task = self.get_today_task(user_id)
         if today_task:
             return today_task
         
@@ -40,7 +72,7 @@ class TaskService:
             return None  # Journey complete
         
         task_content = self.generate_task_content(user, current_day)
-        task_id = generate_task_id(user_id, current_day)
+        task_id = generate_task_id()
         
         new_task = Task(
             task_id=task_id,
@@ -54,15 +86,195 @@ class TaskService:
         
         # Save to database
         self.db.create_task(new_task.to_dict())
+        self.db.update_user(user_id, {'daily_state': self.rules.state_for_new_task(task_id)})
+        
+        event_bus.publish('task_generated', {
+            'user_id': user_id,
+            'task_id': new_task.task_id,
+            'day_number': current_day,
+            'difficulty': new_task.difficulty
+        })
         
         return new_task
     
-    def generate_task_content(self, user: Dict[str, Any], day_number: int) -> str:
-        """Generate personalized task content based on user profile"""
-        status = user.get('status', 'Student')
-        confusion_area = user.get('confusion_area', 'Career')
-        struggle_type = user.get('struggle_type', 'Motivation')
+    def complete_task(self, task_id: str, response: str = '') -> Optional[Dict[str, Any]]:
+        """Mark a task completed (None if task not found).
+        
+        Today's lock is written with the completion, so it holds on the very
+        next read; the user's day advances in the `journey` event consumer
+        (see advance_journey), and the result already carries that day.
+        Completing a task twice changes nothing: the result carries
+        `already_completed` and no event is published again. The write is
+        conditional on the task not being completed yet, so of two
+        concurrent completions exactly one wins.
+        """
+        task = self.db.get_task(task_id)
+        if not task:
+            return None
+        if task.get('completed'):
+            return self._already_completed(task)
+        
+        task_obj = Task(
+            task_id=task['task_id'],
+            user_id=task['user_id'],
+            day_number=task['day_number'],
+            task_content=task['task_content'],
+            task_type=task.get('task_type', 'learning'),
+            difficulty=task.get('difficulty', 'medium'),
+            mood_adapted=task.get('mood_adapted', 'okay')
+        )
+        task_obj.complete(response)
+        
+        if not self.db.complete_task(task_id, {
+            'completed_at': task_obj.completed_at.isoformat(),
+            'response': response,
+            'response_at': task_obj.response_at.isoformat()
+        }):
+            # Another request completed it between our read and write
+            return self._already_completed(self.db.get_task(task_id) or task)
+        
+        # An old task never moves the user back
+        user = self.db.get_user(task['user_id'], ['current_day'])
+        next_day = max(task['day_number'] + 1, (user or {}).get('current_day', 1))
+        success = bool(user) and self.db.update_user(task['user_id'], {
+            'daily_state': self.rules.state_for_completion(task_id)
+        })
+        
+        if success:
+            self._publish_completed(task, response)
+        
+        return {
+            'task_completed': success,
+            'already_completed': False,
+            'user_id': task['user_id'],
+            'next_day': next_day
+        }
+    
+    def complete_tasks(self, completions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Complete many tasks with one read per collection and one bulk task write.
+        
+        Returns one result per requested item, in order, with a status of
+        'completed', 'already_completed', 'not_found', 'user_not_found' or
+        'duplicate' (the same task listed twice). Task writes are conditional,
+        so a task another request completes meanwhile is reported as
+        'already_completed' and not announced twice. Today's locks are one
+        bulk user write; days advance in the `journey` event consumer, so a user
+        with several tasks in the batch moves to the day after the latest
+        one, and never back.
+        """
+        task_ids = [item.get('task_id') for item in completions]
+        tasks = {task['task_id']: task for task in self.db.get_tasks([task_id for task_id in task_ids if task_id])}
+        users = {user['user_id']: user.get('current_day', 1)
+                 for user in self.db.get_users(list({task['user_id'] for task in tasks.values()}))}
+        
+        now = self.clock.utcnow().isoformat()
+        task_updates, results, candidates = {}, [], []
+        for item in completions:
+            task_id = item.get('task_id')
+            task = tasks.get(task_id)
+            if task is None:
+                results.append({'task_id': task_id, 'status': 'not_found'})
+                continue
+            if task_id in task_updates:
+                results.append({'task_id': task_id, 'status': 'duplicate'})
+                continue
+            if task.get('completed'):
+                results.append({'task_id': task_id, 'status': 'already_completed', 'user_id': task['user_id']})
+                continue
+            if task['user_id'] not in users:
+                results.append({'task_id': task_id, 'status': 'user_not_found'})
+                continue
+            
+            response = item.get('response', '')
+            task_updates[task_id] = {'completed_at': now, 'response': response, 'response_at': now}
+            candidates.append((len(results), task, response))
+            results.append(None)  # Filled in once the write shows whether this request won the task
+        
+        won = self.db.complete_tasks(task_updates)
+        user_tasks, completed = {}, []
+        for position, task, response in candidates:
+            task_id = task['task_id']
+            if task_id not in won:
+                results[position] = {'task_id': task_id, 'status': 'already_completed', 'user_id': task['user_id']}
+                continue
+            next_day = max(task['day_number'] + 1, users[task['user_id']])
+            latest = user_tasks.get(task['user_id'])
+            if latest is None or task['day_number'] >= tasks[latest]['day_number']:
+                user_tasks[task['user_id']] = task_id
+            completed.append((task, response))
+            results[position] = {'task_id': task_id, 'status': 'completed', 'user_id': task['user_id'], 'next_day': next_day}
         
+        self.db.update_users({
+            user_id: {'daily_state': self.rules.state_for_completion(task_id)}
+            for user_id, task_id in user_tasks.items()
+        })
+        for task, response in completed:
+            self._publish_completed(task, response)
+        return results
+    
+    def _already_completed(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Result for completing a task that is already completed"""
+        return {'task_completed': False, 'already_completed': True, 'user_id': task['user_id'],
+                'completed_at': task.get('completed_at')}
+    
+    def advance_journey(self, user_id: str, day_number: int) -> bool:
+        """Move the user to the day after a completed task (idempotent; never moves back)"""
+        user = self.db.get_user(user_id, ['current_day'])
+        if not user:
+            return False
+        return self.db.update_user(user_id, {
+            'current_day': max(day_number + 1, user.get('current_day', 1)),
+            'last_active_date': self.clock.utcnow().isoformat()
+        })
+    
+    def _publish_completed(self, task: Dict[str, Any], response: str):
+        """Announce a completed task to the event consumers"""
+        event_bus.publish('task_completed', {
+            'user_id': task['user_id'],
+            'task_id': task['task_id'],
+            'day_number': task['day_number'],
+            'response_length': len(response or '')
+        })
+    
+    def generate_task_content(self, user: Dict[str, Any], day_number: int) -> str:
+        """Generate personalized task content based on user profile (cached per profile and day)"""
+        key = task_profile_key(user, day_number)
+        task_content = task_content_cache.get(key)
+        if task_content is not None:
+            return task_content
+
+        if Config.AI_TASK_GENERATION and ai_client.enabled:
+            # Never wait on the model in a request: serve the template now and cache the
+            # model's text for the next user with this profile and day (identical prompts
+            # already in flight share one provider call)
+            future = ai_client.submit(self.get_task_prompt(user, day_number), fallback=False)
+            future.add_done_callback(lambda done: self._cache_generated(key, done))
+            return self.render_task_template(*key)
+
+        task_content = self.render_task_template(*key)
+        task_content_cache.set(key, task_content)
+        return task_content
+    
+    def _cache_generated(self, key: tuple, done) -> None:
+        """Store model-written task text; a failed call leaves the key uncached so it is retried"""
+        if done.cancelled() or done.exception() is not None:
+            return
+        task_content = done.result()
+        if task_content:
+            task_content_cache.set(key, task_content.strip())
+    
+    def get_task_prompt(self, user: Dict[str, Any], day_number: int) -> str:
+        """Get the rendered task generation prompt for a user's profile and day"""
+        key = task_profile_key(user, day_number)
+        return task_prompt_cache.get_or_compute(key, lambda: TaskPrompts.get_task_generation_prompt(
+            dict(zip((field for field, _ in PROFILE_FIELDS), key)), day_number))
+    
+    def get_generation_stats(self) -> Dict[str, Any]:
+        """Get hit rates of the task content and prompt caches"""
+        return {'task_content': task_content_cache.stats(), 'task_prompt': task_prompt_cache.stats()}
+    
+    def render_task_template(self, status: str, confusion_area: str, struggle_type: str, day_number: int) -> str:
+        """Pick the template task for a profile and day; the text keeps the user's own wording"""
         # Task templates based on user profile
         task_templates = {
             'Student': {
@@ -123,7 +335,8 @@ class TaskService:
         }
         
         # Get appropriate task template
-        user_tasks = task_templates.get(status, {}).get(confusion_area, {}).get(struggle_type, [])
+        user_tasks = task_templates.get(template_key(status), {}).get(template_key(confusion_area), {}).get(
+            template_key(struggle_type), [])
         
         if not user_tasks:
             # Fallback tasks
@@ -162,10 +375,10 @@ class TaskService:
     def is_task_window_active(self) -> bool:
         """Check if current time is within task window"""
         from config import Config
-        current_hour = datetime.now().hour
+        current_hour = self.clock.now().hour
         return Config.TASK_WINDOW_START_HOUR <= current_hour <= Config.TASK_WINDOW_END_HOUR
     
-    def get_task_status_summary(self, user_id: str) -> Dict[str, Any]:
+    def get_task_status_summary(self, user_id: str, user: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Get summary of task status for user"""
         user_tasks = self.db.get_user_tasks(user_id)
         
@@ -177,32 +390,10 @@ class TaskService:
             'total_tasks': total_tasks,
             'completed_tasks': len(completed_tasks),
             'completion_rate': round(completion_rate, 2),
-            'current_streak': self.calculate_current_streak(user_tasks),
+            'current_streak': self.calculate_current_streak(user_id, user),
             'window_active': self.is_task_window_active()
         }
     
-    def calculate_current_streak(self, tasks: List[Dict[str, Any]]) -> int:
+    def calculate_current_streak(self, user_id: str, user: Optional[Dict[str, Any]] = None) -> int:
         """Calculate current streak of completed tasks"""
-        if not tasks:
-            return 0
-        
-        # Sort tasks by creation date
-        sorted_tasks = sorted(tasks, key=lambda x: x.get('created_at', ''))
-        
-        streak = 0
-        current_date = datetime.now().date()
-        
-        for task in reversed(sorted_tasks):
-            if task.get('completed'):
-                task_date = datetime.fromisoformat(task.get('created_at', '')).date()
-                if (current_date - task_date).days == 1:
-                    streak += 1
-                    current_date = task_date
-                elif (current_date - task_date).days == 0:
-                    streak += 1
-                else:
-                    break
-            else:
-                break
-        
-        return streak
+        return ActivityService(self.db, self.clock).current_streak(user_id, TASK_COMPLETED, user)
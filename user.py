@@ -1,5 +1,5 @@
-from datetime import datetime
 from typing import Dict, Any, Optional
+from utils.clock import clock
 
 class User:
     """User model for ClearNext"""
@@ -19,9 +19,9 @@ class User:
         self.preferred_time = preferred_time
         self.ai_conversation_completed = False
         self.journey_completed = False
-        self.last_active_date = datetime.utcnow()
-        self.created_at = datetime.utcnow()
-        self.updated_at = datetime.utcnow()
+        self.last_active_date = clock.utcnow()
+        self.created_at = clock.utcnow()
+        self.updated_at = clock.utcnow()
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert user to dictionary"""
@@ -48,21 +48,21 @@ class User:
         for key, value in kwargs.items():
             if hasattr(self, key):
                 setattr(self, key, value)
-        self.updated_at = datetime.utcnow()
+        self.updated_at = clock.utcnow()
     
     def advance_day(self):
         """Advance to next day in journey"""
         if self.current_day < self.journey_days:
             self.current_day += 1
-            self.last_active_date = datetime.utcnow()
-            self.updated_at = datetime.utcnow()
+            self.last_active_date = clock.utcnow()
+            self.updated_at = clock.utcnow()
             return True
         return False
     
     def complete_journey(self):
         """Mark journey as completed"""
         self.journey_completed = True
-        self.updated_at = datetime.utcnow()
+        self.updated_at = clock.utcnow()
     
     def is_journey_complete(self) -> bool:
         """Check if journey is complete"""
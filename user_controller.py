@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify
 from models.user import User
 from utils.database import db
-from utils.validators import validate_user_data, generate_user_id, format_response
+from utils.events import event_bus
+from utils.validators import (
+    validate_user_data, validate_batch_ids, validate_preferred_time, generate_user_id, format_response, public_user
+)
+from utils.http_cache import conditional_response
+from utils.fields import parse_fields, projection_for, select_fields
 
 user_bp = Blueprint('users', __name__)
 
@@ -15,6 +20,10 @@ def create_guest_user():
         is_valid, message = validate_user_data(data)
         if not is_valid:
             return format_response(False, message), 400
+        if 'preferred_time' in data:
+            is_valid, message = validate_preferred_time(data['preferred_time'])
+            if not is_valid:
+                return format_response(False, message), 400
         
         # Create guest user
         user_id = generate_user_id('GUEST')
@@ -25,16 +34,18 @@ def create_guest_user():
             confusion_area=data['confusion_area'],
             struggle_type=data['struggle_type'],
             journey_days=data.get('journey_days', 7),
-            user_type='guest'
+            user_type='guest',
+            preferred_time=data.get('preferred_time', '09:00')
         )
         
         # Save to database
         created_user = db.create_user(user.to_dict())
+        event_bus.publish('user_created', {'user_id': user_id, 'preferred_time': user.preferred_time})
         
         return format_response(True, "Guest user created successfully", {
             'user_id': user_id,
             'user_type': 'guest',
-            'user': created_user
+            'user': public_user(created_user)
         })
         
     except Exception as e:
@@ -56,6 +67,10 @@ def register_user():
         is_valid, message = validate_user_data(data)
         if not is_valid:
             return format_response(False, message), 400
+        if 'preferred_time' in data:
+            is_valid, message = validate_preferred_time(data['preferred_time'])
+            if not is_valid:
+                return format_response(False, message), 400
         
         # Create registered user
         user_id = generate_user_id('REG')
@@ -67,7 +82,8 @@ def register_user():
             confusion_area=data['confusion_area'],
             struggle_type=data['struggle_type'],
             journey_days=data.get('journey_days', 7),
-            user_type='registered'
+            user_type='registered',
+            preferred_time=data.get('preferred_time', '09:00')
         )
         
         # In a real app, you'd hash the password here
@@ -77,11 +93,12 @@ def register_user():
         
         # Save to database
         created_user = db.create_user(user_data)
+        event_bus.publish('user_created', {'user_id': user_id, 'preferred_time': user.preferred_time})
         
         return format_response(True, "User registered successfully", {
             'user_id': user_id,
             'user_type': 'registered',
-            'user': created_user
+            'user': public_user(created_user)
         })
         
     except Exception as e:
@@ -112,22 +129,51 @@ def login_user():
         return format_response(True, "Login successful", {
             'user_id': user['user_id'],
             'user_type': user['user_type'],
-            'user': user
+            'user': public_user(user)
         })
         
     except Exception as e:
         return format_response(False, f"Error during login: {str(e)}"), 500
 
+@user_bp.route('/batch', methods=['GET', 'POST'])
+def get_users_batch():
+    """Get several users in one request (?ids=a,b or {"ids": [...]})"""
+    try:
+        raw_ids = request.args.get('ids') if request.method == 'GET' else (request.get_json() or {}).get('ids')
+        is_valid, message, user_ids = validate_batch_ids(raw_ids)
+        if not is_valid:
+            return format_response(False, message), 400
+        
+        users = {user['user_id']: user for user in db.get_users(user_ids)}
+        results = [{'user_id': user_id, 'status': 'ok', 'user': public_user(users[user_id])} if user_id in users
+                   else {'user_id': user_id, 'status': 'not_found'} for user_id in user_ids]
+        
+        return format_response(True, "Users retrieved", {
+            'results': results,
+            'found': len(users),
+            'requested': len(user_ids)
+        })
+        
+    except Exception as e:
+        return format_response(False, f"Error getting users: {str(e)}"), 500
+
 @user_bp.route('/<user_id>', methods=['GET'])
 def get_user(user_id):
-    """Get user by ID"""
+    """Get user by ID (?fields=a,b returns only those fields)"""
     try:
-        user = db.get_user(user_id)
+        is_valid, message, fields = parse_fields(request.args.get('fields'))
+        if not is_valid:
+            return format_response(False, message), 400
+        
+        user = db.get_user(user_id, projection_for('user', fields))
         
         if not user:
             return format_response(False, "User not found"), 404
         
-        return format_response(True, "User found", {'user': user})
+        return conditional_response('user', 'user', [user],
+                                    lambda: format_response(True, "User found", {
+                                        'user': select_fields('user', [user], fields)[0]
+                                    }), variant=fields)
         
     except Exception as e:
         return format_response(False, f"Error getting user: {str(e)}"), 500
@@ -142,11 +188,17 @@ def update_user(user_id):
         existing_user = db.get_user(user_id)
         if not existing_user:
             return format_response(False, "User not found"), 404
+        if 'preferred_time' in data:
+            is_valid, message = validate_preferred_time(data['preferred_time'])
+            if not is_valid:
+                return format_response(False, message), 400
         
         # Update user
         success = db.update_user(user_id, data)
         
         if success:
+            if 'preferred_time' in data:
+                event_bus.publish('user_updated', {'user_id': user_id, 'preferred_time': data['preferred_time']})
             return format_response(True, "User updated successfully")
         else:
             return format_response(False, "Failed to update user"), 500
@@ -1,5 +1,9 @@
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from utils.clock import clock
+from utils.ids import ids
+from utils.cache import LRUCache, content_hash
+from config import Config
 
 def validate_user_data(data: Dict[str, Any]) -> tuple[bool, str]:
     """Validate user registration data"""
@@ -51,10 +55,46 @@ def validate_journey_duration(days: int) -> tuple[bool, str]:
         return False, "Journey duration must be 7, 14, or 21 days"
     return True, ""
 
-def validate_task_window() -> tuple[bool, str]:
+def validate_batch_ids(raw: Any) -> tuple[bool, str, List[str]]:
+    """Parse IDs for a batch request (comma-separated string or list), keeping order and dropping repeats"""
+    items = raw.split(',') if isinstance(raw, str) else (raw or [])
+    if not isinstance(items, list):
+        return False, "ids must be a list or comma-separated string", []
+    batch_ids = list(dict.fromkeys(str(item).strip() for item in items if str(item).strip()))
+    if not batch_ids:
+        return False, "At least one id is required", []
+    if len(batch_ids) > Config.MAX_BATCH_SIZE:
+        return False, f"At most {Config.MAX_BATCH_SIZE} ids per request", []
+    return True, "", batch_ids
+
+def parse_time_of_day(value: Any) -> Optional[int]:
+    """Minute of the day for "HH:MM" or "H:MM AM/PM", None if unparseable"""
+    if not isinstance(value, str):
+        return None
+    text = value.strip().upper()
+    period = text[-2:] if text.endswith(('AM', 'PM')) else None
+    hours, _, minutes = (text[:-2].strip() if period else text).partition(':')
+    if not hours.isdigit() or not minutes.isdigit() or len(minutes) != 2:
+        return None
+    hour, minute = int(hours), int(minutes)
+    if period:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if period == 'PM' else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+def validate_preferred_time(value: Any) -> tuple[bool, str]:
+    """Validate a daily reminder time"""
+    if parse_time_of_day(value) is None:
+        return False, "preferred_time must look like 09:00 or 9:00 AM"
+    return True, ""
+
+def validate_task_window(now: datetime = None) -> tuple[bool, str]:
     """Check if current time is within task window"""
     from config import Config
-    current_hour = datetime.now().hour
+    current_hour = (now or clock.now()).hour
     
     if current_hour < Config.TASK_WINDOW_START_HOUR or current_hour > Config.TASK_WINDOW_END_HOUR:
         return False, f"Tasks are only available from {Config.TASK_WINDOW_START_HOUR}:00 to {Config.TASK_WINDOW_END_HOUR}:59"
@@ -62,22 +102,28 @@ def validate_task_window() -> tuple[bool, str]:
     return True, ""
 
 def generate_user_id(user_type: str = "GUEST") -> str:
-    """Generate unique user ID"""
-    import uuid
-    timestamp = int(datetime.now().timestamp())
-    unique_id = str(uuid.uuid4())[:8]
-    return f"{user_type}_{timestamp}_{unique_id}"
+    """Generate unique, time-ordered user ID"""
+    return ids.new_id(user_type)
 
-def generate_task_id(user_id: str, day_number: int) -> str:
-    """Generate task ID"""
-    return f"task_{user_id.split('_')[1]}_{day_number}"
+def generate_task_id() -> str:
+    """Generate unique, time-ordered task ID"""
+    return ids.new_id('task')
 
-def generate_reflection_id(user_id: str, day_number: int) -> str:
-    """Generate reflection ID"""
-    return f"ref_{user_id.split('_')[1]}_{day_number}"
+def generate_reflection_id() -> str:
+    """Generate unique, time-ordered reflection ID"""
+    return ids.new_id('ref')
 
-def calculate_reflection_score(text: str) -> float:
-    """Calculate reflection quality score (0.0 - 1.0)"""
+def generate_progress_id() -> str:
+    """Generate unique, time-ordered progress ID"""
+    return ids.new_id('prog')
+
+# Bump when the scoring rules below change so cached scores are not reused
+SCORING_VERSION = 1
+
+score_cache = LRUCache('reflection_score', Config.SCORE_CACHE_SIZE)
+
+def _score_text(text: str) -> float:
+    """Apply the scoring rules to one text (uncached)"""
     score = 0.5  # Base score
     
     # Length bonus
@@ -96,12 +142,46 @@ def calculate_reflection_score(text: str) -> float:
     
     return min(1.0, max(0.0, score))
 
+def calculate_reflection_score(text: str) -> float:
+    """Calculate reflection quality score (0.0 - 1.0), memoised by content hash"""
+    return score_cache.get_or_compute((SCORING_VERSION, content_hash(text)), lambda: _score_text(text))
+
+def score_reflections(texts: List[str], use_cache: bool = True) -> List[float]:
+    """Score many texts in one pass; identical texts are scored once.
+
+    Bulk re-scoring passes use_cache=False so a full-table pass does not
+    evict the drafts that live validation keeps hitting.
+    """
+    keys = [content_hash(text) for text in texts]
+    scores = {}
+    for key, text in zip(keys, texts):
+        if key in scores:
+            continue
+        score = score_cache.get((SCORING_VERSION, key)) if use_cache else None
+        if score is None:
+            score = _score_text(text)
+            if use_cache:
+                score_cache.set((SCORING_VERSION, key), score)
+        scores[key] = score
+    return [scores[key] for key in keys]
+
+def near_duplicate_penalty(score: float, similarity: float) -> float:
+    """Lower a score for text recycled at the given similarity"""
+    return round(score * (1 - similarity), 2)
+
+# Stored on user records but never sent to clients
+PRIVATE_USER_FIELDS = ('password', '_id')
+
+def public_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    """A user record without credentials or the Mongo _id"""
+    return {key: value for key, value in user.items() if key not in PRIVATE_USER_FIELDS}
+
 def format_response(success: bool, message: str, data: Any = None) -> Dict[str, Any]:
     """Format standard API response"""
     response = {
         'success': success,
         'message': message,
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': clock.utcnow().isoformat()
     }
     
     if data is not None:
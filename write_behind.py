@@ -0,0 +1,156 @@
+import atexit
+import signal
+import threading
+import time
+from typing import Dict, Any, Callable, Optional, Tuple
+from config import Config
+from utils.metrics import metrics
+
+class WriteBehindBuffer:
+    """Coalesces per-user `$set` updates in memory and writes them in bulk.
+
+    A burst of updates to one user (progress after every reflection, the
+    user record after every completion) collapses into a single pending
+    document per collection and user. Later fields overwrite earlier ones.
+    Pending writes are flushed with one bulk write per collection in three
+    cases:
+    - every `flush_interval` seconds, which bounds the window of
+      unflushed updates;
+    - as soon as `max_pending` users are waiting;
+    - at interpreter exit, and on SIGTERM (docker stop, systemd), which
+      skips atexit by default.
+
+    Readers see their own writes: the database manager overlays pending
+    fields on every record it returns. Anything still pending when the
+    process is killed hard is lost, which is the price of the
+    durability window.
+    """
+
+    def __init__(self, write: Callable[[str, Dict[str, Dict[str, Any]]], int],
+                 flush_interval: float = None, max_pending: int = None):
+        self.write = write
+        self.flush_interval = flush_interval or Config.WRITE_BEHIND_INTERVAL
+        self.max_pending = max_pending or Config.WRITE_BEHIND_MAX_PENDING
+        self.pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.in_flight: Dict[Tuple[str, str], Dict[str, Any]] = {}  # Taken by a flush, not yet written
+        self.stats = {'updates': 0, 'coalesced': 0, 'flushes': 0, 'written': 0, 'failed': 0}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._running = False
+        # Registered now, before the event bus starts, so it runs after the bus's final flush
+        atexit.register(self.stop)
+        self._install_sigterm_handler()
+
+    def set(self, collection: str, key: str, fields: Dict[str, Any]):
+        """Queue fields to $set on one record"""
+        with self._lock:
+            pending = self.pending.get((collection, key))
+            if pending is None:
+                self.pending[(collection, key)] = dict(fields)
+            else:
+                pending.update(fields)
+                self.stats['coalesced'] += 1
+            self.stats['updates'] += 1
+            size = len(self.pending)
+        if not self._running:
+            self.start()
+        if size >= self.max_pending:
+            if size >= 2 * self.max_pending:
+                self.flush()  # The flusher is behind: push back on writers instead of growing
+            else:
+                self._wakeup.set()
+
+    def is_pending(self, collection: str, key: str) -> bool:
+        """Whether a record has queued or in-flight fields"""
+        return (collection, key) in self.pending or (collection, key) in self.in_flight
+
+    def overlay(self, collection: str, key: str, record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """A copy of the record with pending fields applied (the record itself if none are pending)"""
+        if record is None or ((collection, key) not in self.pending and (collection, key) not in self.in_flight):
+            return record
+        with self._lock:
+            return {**record, **self.in_flight.get((collection, key), {}), **self.pending.get((collection, key), {})}
+
+    def flush(self) -> int:
+        """Write everything pending; returns records written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self.pending = self.pending, {}
+                self.in_flight = batch
+            if not batch:
+                return 0
+
+            by_collection: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (collection, key), fields in batch.items():
+                by_collection.setdefault(collection, {})[key] = fields
+
+            started = time.perf_counter()
+            written = 0
+            for collection, updates in by_collection.items():
+                try:
+                    written += self.write(collection, updates)
+                except Exception as e:
+                    self.stats['failed'] += len(updates)
+                    self._requeue(collection, updates)
+                    print(f"⚠️ Write-behind flush of {len(updates)} {collection} failed, will retry: {e}")
+            with self._lock:
+                self.in_flight = {}
+            self.stats['flushes'] += 1
+            self.stats['written'] += written
+            metrics.observe('clearnext_write_behind_flush_seconds', time.perf_counter() - started)
+            return written
+
+    def start(self):
+        """Start the background flusher"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the flusher and write anything still pending"""
+        if self._running:
+            self._running = False
+            self._wakeup.set()
+            if self._thread:
+                self._thread.join(timeout)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get buffer counts for the health check"""
+        return {**self.stats, 'pending': len(self.pending), 'flush_interval': self.flush_interval}
+
+    def _run(self):
+        """Flusher loop: every interval, or sooner when the buffer fills"""
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _install_sigterm_handler(self):
+        """Flush on SIGTERM, then hand over to whatever handled it before"""
+        if threading.current_thread() is not threading.main_thread():
+            return  # Signal handlers can only be set from the main thread
+        previous = signal.getsignal(signal.SIGTERM)
+        if previous == signal.SIG_IGN:
+            return
+
+        def on_sigterm(signum, frame):
+            self.stop()
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                raise SystemExit(128 + signum)  # Default action, but with atexit handlers run
+
+        signal.signal(signal.SIGTERM, on_sigterm)
+
+    def _requeue(self, collection: str, updates: Dict[str, Dict[str, Any]]):
+        """Put failed updates back under anything queued since (newer fields win)"""
+        with self._lock:
+            for key, fields in updates.items():
+                newer = self.pending.get((collection, key))
+                self.pending[(collection, key)] = {**fields, **newer} if newer else fields